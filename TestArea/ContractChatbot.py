@@ -18,8 +18,10 @@ class ContractChatbot:
         results = self.db.search_contracts(question, n_results=3)
 
         # Construye contexto
+        # El texto completo se lee del ContentStore solo para estos contratos
         context = "\n\n".join([
-            f"CONTRATO {i + 1}:\n{doc}\nMETADATOS: {json.dumps(meta, ensure_ascii=False)}"
+            f"CONTRATO {i + 1}:\n{self.db.get_text(meta, document=doc)}\n"
+            f"METADATOS: {json.dumps(meta, ensure_ascii=False)}"
             for i, (doc, meta) in enumerate(zip(
                 results['documents'][0],
                 results['metadatas'][0]
@@ -1,20 +1,44 @@
 # ContractDatabase.py
-import chromadb
-from sentence_transformers import SentenceTransformer
 import json
+import os
 from datetime import datetime
 
+from TestArea02.content_store import ContentStore
+from TestArea02.embedding_broker import con_broker
+from TestArea02.embeddings import crear_embedder
+from TestArea02.index_export import exportar_parquet, importar_parquet
+from TestArea02.vector_store import crear_vector_store
+
 
 class ContractDatabase:
     """Gestiona la base de datos de contratos"""
 
-    def __init__(self, db_path="./chroma_db"):
-        self.client = chromadb.PersistentClient(path=db_path)
-        self.collection = self.client.get_or_create_collection(
-            name="contratos",
-            metadata={"hnsw:space": "cosine"}
-        )
-        self.embedder = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+    # Caracteres del texto que se guardan en Chroma; el texto completo va al ContentStore
+    SNIPPET_LENGTH = 1000
+
+    def __init__(self, db_path="./chroma_db", backend=None, embedding_backend=None, shard_key=None,
+                 embedding_broker=None):
+        # backend: 'chroma' (HNSW) o 'numpy' (búsqueda exacta); None usa VECTOR_BACKEND
+        # embedding_backend: 'torch', 'onnx' u 'onnx-int8'; None usa EMBEDDING_BACKEND
+        # shard_key: particionar por un campo de metadata ('anio', 'contract_type'); None usa VECTOR_SHARD_KEY
+        # embedding_broker: 'local' (micro-lotes entre hilos) o 'host:puerto' de un broker compartido;
+        #                   None usa EMBEDDING_BROKER (ver TestArea02/embedding_broker.py)
+        self.content = ContentStore(os.path.join(db_path, "contenido"))
+        self.collection = crear_vector_store(backend, db_path, nombre="contratos", particion=shard_key)
+        # El modelo de embeddings se carga al primer uso (listar/contar no lo necesitan)
+        self.embedding_backend = embedding_backend
+        self.embedding_broker = embedding_broker
+        self._embedder = None
+
+    @property
+    def embedder(self):
+        """Modelo de embeddings (torch u ONNX), cargado la primera vez que se necesita un vector"""
+        if self._embedder is None:
+            self._embedder = con_broker(
+                lambda: crear_embedder(self.embedding_backend, 'paraphrase-multilingual-MiniLM-L12-v2'),
+                self.embedding_broker
+            )
+        return self._embedder
 
     def _sanitize_metadata(self, metadata):
         """
@@ -55,7 +79,21 @@ class ContractDatabase:
         return sanitized
 
     def add_contract(self, contract_id, text, metadata):
-        """Agrega un contrato a la base de datos"""
+        """
+        Agrega un contrato a la base de datos
+
+        text puede ser el texto completo o los segmentos de
+        DocumentProcessor.iter_segments (documentos grandes: el texto
+        entero nunca se arma en memoria)
+        """
+
+        # Texto completo comprimido fuera de Chroma (con segmentos, se guarda mientras llega)
+        if isinstance(text, str):
+            content_id = self.content.guardar(text)
+            head, text_length = text[:self.SNIPPET_LENGTH], len(text)
+        else:
+            content_id, head, text_length = self.content.guardar_segmentos(text, self.SNIPPET_LENGTH)
+            text = head  # El embedding usa el inicio del documento
 
         # Genera embedding del texto
         embedding = self.embedder.encode(text).tolist()
@@ -67,10 +105,11 @@ class ContractDatabase:
         clean_metadata['fecha_ingreso'] = datetime.now().isoformat()
 
         # Agrega el texto original como metadato para búsquedas
-        clean_metadata['texto_length'] = len(text)
+        clean_metadata['texto_length'] = text_length
+        clean_metadata['contenido_id'] = content_id
 
         # Si no hay metadatos útiles, agrega al menos uno
-        if len(clean_metadata) == 2:  # Solo fecha_ingreso y texto_length
+        if len(clean_metadata) == 3:  # Solo fecha_ingreso, texto_length y contenido_id
             clean_metadata['sin_datos_extraidos'] = True
 
         print(f"\n📊 Metadatos a guardar: {clean_metadata}")
@@ -79,20 +118,21 @@ class ContractDatabase:
         self.collection.add(
             ids=[contract_id],
             embeddings=[embedding],
-            documents=[text],
+            documents=[head],
             metadatas=[clean_metadata]
         )
 
         print(f"✓ Contrato almacenado con ID: {contract_id}")
 
-    def search_contracts(self, query, n_results=5):
-        """Busca contratos relevantes a una consulta"""
+    def search_contracts(self, query, n_results=5, where=None):
+        """Busca contratos relevantes a una consulta (where: filtro de metadata estilo Chroma)"""
 
         query_embedding = self.embedder.encode(query).tolist()
 
         results = self.collection.query(
             query_embeddings=[query_embedding],
-            n_results=n_results
+            n_results=n_results,
+            where=where
         )
 
         # Deserializa los metadatos que son JSON strings
@@ -129,7 +169,7 @@ class ContractDatabase:
 
                 return {
                     'id': result['ids'][0],
-                    'text': result['documents'][0],
+                    'text': self.get_text(metadata, document=result['documents'][0]),
                     'metadata': metadata
                 }
             return None
@@ -137,6 +177,15 @@ class ContractDatabase:
             print(f"Error obteniendo contrato: {e}")
             return None
 
+    def get_text(self, metadata, start=0, end=None, document=None):
+        """Lee el texto completo (o un rango en bytes) desde el ContentStore"""
+        content_id = metadata.get('contenido_id')
+        if content_id and content_id in self.content:
+            return self.content.leer(content_id, start, end)
+
+        # Contratos guardados antes del ContentStore: el texto está en Chroma
+        return (document or '')[start:end]
+
     def list_all_contracts(self):
         """Lista todos los contratos almacenados"""
         try:
@@ -167,6 +216,21 @@ class ContractDatabase:
             print(f"Error listando contratos: {e}")
             return []
 
+    def export_index(self, path, rows_per_group=1000, include_text=True):
+        """Exporta ids, vectores, metadata y textos a Parquet (sin cargar todo en memoria)"""
+        rows = exportar_parquet(self.collection, self.content, path, filas_por_grupo=rows_per_group,
+                                incluir_texto=include_text, modelo='paraphrase-multilingual-MiniLM-L12-v2',
+                                dim=lambda: len(self.embedder.encode("contract")))
+        print(f"✓ {rows} contratos exportados a {path}")
+        return rows
+
+    def import_index(self, path, rows_per_batch=1000):
+        """Importa un archivo de export_index sin recalcular embeddings (falla si es de otro modelo)"""
+        result = importar_parquet(path, self.collection, self.content, filas_por_lote=rows_per_batch,
+                                  modelo='paraphrase-multilingual-MiniLM-L12-v2')
+        print(f"✓ {result['importadas']} contratos importados ({result['omitidas']} ya existían)")
+        return result
+
     def delete_contract(self, contract_id):
         """Elimina un contrato de la base de datos"""
         try:
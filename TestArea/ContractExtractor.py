@@ -6,8 +6,12 @@ import ollama
 class ContractExtractor:
     """Extrae información estructurada de contratos usando IA local"""
 
-    def __init__(self, model_name="mistral:7b"):
+    def __init__(self, model_name="mistral:7b", host=None):
         self.model_name = model_name
+        # host: otro servidor de Ollama (ej: el falso de TestArea02/fake_ollama.py)
+        self.client = ollama.Client(host=host) if host else ollama
+        # Tokens usados en todas las llamadas (para comparar prompts y modelos)
+        self.tokens = {"entrada": 0, "salida": 0}
 
     def extract_contract_data(self, text):
         """Extrae campos importantes del contrato"""
@@ -40,7 +44,7 @@ Possible fields (only include those you find):
 Responde SOLO con JSON válido:"""
 
         try:
-            response = ollama.chat(
+            response = self.client.chat(
                 model=self.model_name,
                 messages=[{
                     'role': 'user',
@@ -51,6 +55,9 @@ Responde SOLO con JSON válido:"""
                 }
             )
 
+            self.tokens["entrada"] += response.get('prompt_eval_count') or 0
+            self.tokens["salida"] += response.get('eval_count') or 0
+
             content = response['message']['content']
 
             # Limpia markdown
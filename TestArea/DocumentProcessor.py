@@ -1,9 +1,7 @@
 # DocumentProcessor.py
-import fitz  # PyMuPDF
-from docx import Document
-from PIL import Image
-import pytesseract
-from pdf2image import convert_from_path
+# Las librerías de cada formato (fitz, docx, PIL, pytesseract, pdf2image) se
+# importan dentro del método que las usa, así importar este módulo es instantáneo.
+import itertools
 import os
 import platform
 
@@ -11,78 +9,329 @@ import platform
 class DocumentProcessor:
     """Procesa múltiples formatos de documentos"""
 
-    def __init__(self):
+    def __init__(self, ocr_engine=None, preprocess=True):
+        # Motor OCR opcional con recognize_batch (ver TestArea02/ocr_engines.py).
+        # Si es None se usa pytesseract directamente.
+        self.ocr_engine = ocr_engine
+
+        # Preprocesamiento de imágenes antes del OCR (se crea al primer uso)
+        self.preprocess = preprocess
+        self._preprocessor = None
+
         # Configuración de rutas para Windows
         if platform.system() == 'Windows':
-            # Configura Tesseract
-            tesseract_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-            if os.path.exists(tesseract_path):
-                pytesseract.pytesseract.tesseract_cmd = tesseract_path
+            # Tesseract (se aplica al importar pytesseract)
+            self.tesseract_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
             # Configura Poppler
             self.poppler_path = r'C:\poppler\Library\bin'
         else:
+            self.tesseract_path = None
             self.poppler_path = None
 
+    def _pytesseract(self):
+        """Importa pytesseract y configura la ruta en Windows"""
+        import pytesseract
+
+        if self.tesseract_path and os.path.exists(self.tesseract_path):
+            pytesseract.pytesseract.tesseract_cmd = self.tesseract_path
+
+        return pytesseract
+
     def extract_text(self, file_path):
         """Extrae texto según el tipo de archivo"""
+        return ''.join(segment['text'] for segment in self.iter_segments(file_path))
+
+    def iter_segments(self, file_path):
+        """
+        Extrae el texto por partes, sin armar el documento entero en memoria
+
+        Cada segmento es un dict con:
+            - text: texto del segmento (incluye el separador con el anterior)
+            - offset: posición del segmento en el texto completo (caracteres)
+            - page: número de página (PDF) o None
+            - kind: 'page', 'paragraph', 'table_row' o 'chunk'
+
+        Unir los 'text' en orden da lo mismo que extract_text().
+        """
         extension = os.path.splitext(file_path)[1].lower()
 
         if extension == '.pdf':
-            return self._extract_from_pdf(file_path)
+            parts = self._iter_pdf(file_path)
         elif extension in ['.docx', '.doc']:
-            return self._extract_from_word(file_path)
+            parts = self._iter_word(file_path)
         elif extension == '.txt':
-            return self._extract_from_txt(file_path)
+            parts = self._iter_txt(file_path)
         elif extension in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
-            return self._extract_from_image(file_path)
+            parts = iter([(self._extract_from_image(file_path), None, 'page')])
         else:
             raise ValueError(f"Formato no soportado: {extension}")
 
-    def _extract_from_pdf(self, file_path):
-        """Extrae texto de PDF (nativo o con OCR)"""
-        text = ""
+        offset = 0
+        for text, page, kind in parts:
+            yield {'text': text, 'offset': offset, 'page': page, 'kind': kind}
+            offset += len(text)
+
+    def read_head(self, file_path, length=6000):
+        """
+        Inicio del documento (para el extractor) sin perder el resto
+
+        Lee segmentos solo hasta juntar 'length' caracteres; esos segmentos
+        se guardan y se vuelven a entregar al principio del iterador, así
+        add_contract recibe el documento completo sin leerlo dos veces.
+
+        Returns:
+            tuple (inicio del texto, iterador de todos los segmentos)
+        """
+        segments = self.iter_segments(file_path)
+        read = []
+        chars = 0
+        for segment in segments:
+            read.append(segment)
+            chars += len(segment['text'])
+            if chars >= length:
+                break
+
+        head = ''.join(segment['text'] for segment in read)[:length]
+        return head, itertools.chain(read, segments)
+
+    def iter_chunks(self, file_path, size=1000, overlap=200):
+        """
+        Parte el documento en fragmentos de 'size' caracteres con solapamiento,
+        leyendo los segmentos de a uno (la memoria no depende del documento)
+
+        Yields:
+            dict con text y offset
+        """
+        if size <= 0 or not 0 <= overlap < size:
+            raise ValueError(f"Se necesita 0 <= overlap < size (size={size}, overlap={overlap})")
+
+        buffer = ''
+        start = 0  # offset de buffer[0] en el texto completo
+        end = 0    # fin del último fragmento entregado
+
+        step = size - overlap
+
+        for segment in self.iter_segments(file_path):
+            buffer += segment['text']
+            position = 0
+            while len(buffer) - position >= size:
+                yield {'text': buffer[position:position + size], 'offset': start + position}
+                end = start + position + size
+                position += step
+
+            # Se recorta una sola vez por segmento (no por fragmento)
+            buffer = buffer[position:]
+            start += position
+
+        # El resto solo si trae texto que ningún fragmento cubrió
+        if start + len(buffer) > end and buffer.strip():
+            yield {'text': buffer, 'offset': start}
+
+    def _iter_pdf(self, file_path):
+        """Texto nativo página por página; si casi no hay texto, OCR página por página"""
+        import fitz  # PyMuPDF
+
+        # Las primeras páginas se retienen hasta saber si el PDF tiene texto
+        # (menos de 50 caracteres en total = escaneado)
+        held = []
+        held_chars = 0
+        streaming = False
+        page_count = 0
 
         try:
             with fitz.open(file_path) as doc:
-                for page in doc:
+                page_count = len(doc)
+                for number, page in enumerate(doc, start=1):
                     page_text = page.get_text()
-                    text += page_text
+                    if streaming:
+                        yield page_text, number, 'page'
+                        continue
+
+                    held.append((page_text, number, 'page'))
+                    held_chars += len(page_text.strip())
+                    if held_chars >= 50:
+                        streaming = True
+                        yield from held
+                        held = []
         except Exception as e:
             print(f"Error extrayendo con PyMuPDF: {e}")
+            if streaming:
+                raise
+
+        if streaming:
+            return
 
         # Si no hay texto o es muy poco, usa OCR
-        if len(text.strip()) < 50:
-            print("Usando OCR para extraer texto del PDF...")
-            try:
-                # Usa poppler_path en Windows
-                if self.poppler_path and os.path.exists(self.poppler_path):
-                    images = convert_from_path(file_path, poppler_path=self.poppler_path)
+        print("Usando OCR para extraer texto del PDF...")
+        yield from self._iter_pdf_ocr(file_path, page_count)
+
+    def _iter_pdf_ocr(self, file_path, page_count, batch_size=4):
+        """Renderiza y reconoce de a pocas páginas (no todo el PDF en memoria)"""
+        from pdf2image import convert_from_path, pdfinfo_from_path
+
+        options = {}
+        if self.poppler_path and os.path.exists(self.poppler_path):
+            options['poppler_path'] = self.poppler_path
+
+        if not page_count:
+            page_count = pdfinfo_from_path(file_path, **options)['Pages']
+
+        pytesseract = None if self.ocr_engine is not None else self._pytesseract()
+
+        try:
+            for first in range(1, page_count + 1, batch_size):
+                last = min(first + batch_size - 1, page_count)
+                print(f"Procesando páginas {first}-{last} de {page_count}...")
+
+                images = convert_from_path(file_path, first_page=first, last_page=last, **options)
+
+                # pdf2image renderiza a 200 DPI por defecto
+                pages = [(number, image) for number, image in zip(range(first, last + 1), images)]
+                pages = [(number, image) for number, image in pages if image is not None]
+                prepared = self._preprocess([image for _, image in pages], dpi=200, keep_blank=True)
+
+                if self.ocr_engine is not None:
+                    pending = [image for image in prepared if image is not None]
+                    recognized = iter(self.ocr_engine.recognize_batch(pending) if pending else [])
+                    texts = [next(recognized)['texto'] if image is not None else '' for image in prepared]
                 else:
-                    images = convert_from_path(file_path)
-
-                text = ""
-                for i, image in enumerate(images):
-                    print(f"Procesando página {i + 1}/{len(images)}...")
-                    text += pytesseract.image_to_string(image, lang='eng')
-                    text += "\n\n"
-            except Exception as e:
-                print(f"Error en OCR: {e}")
-                raise
+                    texts = [
+                        pytesseract.image_to_string(image, lang='eng') if image is not None else ''
+                        for image in prepared
+                    ]
+
+                for (number, _), text in zip(pages, texts):
+                    yield text + "\n\n", number, 'page'
+        except Exception as e:
+            print(f"Error en OCR: {e}")
+            raise
+
+    def _iter_word(self, file_path):
+        """
+        Párrafos y filas de tablas de un .docx, en orden, leyendo
+        word/document.xml con iterparse (sin cargar el XML entero)
+        """
+        import zipfile
+        import xml.etree.ElementTree as ET
+
+        w = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+        first = True
+        table_depth = 0
+        rows = []   # Pila: celdas de la fila abierta en cada tabla
+        cells = []  # Pila: párrafos de la celda abierta
 
-        return text
+        with zipfile.ZipFile(file_path) as archive:
+            with archive.open('word/document.xml') as xml:
+                for event, element in ET.iterparse(xml, events=('start', 'end')):
+                    tag = element.tag
 
-    def _extract_from_word(self, file_path):
-        """Extrae texto de Word"""
-        doc = Document(file_path)
-        return '\n'.join([para.text for para in doc.paragraphs])
+                    if event == 'start':
+                        if tag == w + 'tbl':
+                            table_depth += 1
+                        elif tag == w + 'tr':
+                            rows.append([])
+                        elif tag == w + 'tc':
+                            cells.append([])
+                        continue
 
-    def _extract_from_txt(self, file_path):
-        """Extrae texto de TXT"""
+                    if tag == w + 'p':
+                        text = self._paragraph_text(element, w)
+                        if cells:
+                            cells[-1].append(text)
+                        elif table_depth == 0:
+                            yield ('' if first else '\n') + text, None, 'paragraph'
+                            first = False
+                        element.clear()
+                    elif tag == w + 'tc':
+                        cell = '\n'.join(cells.pop())
+                        if rows:
+                            rows[-1].append(cell)
+                        element.clear()
+                    elif tag == w + 'tr':
+                        row = ' | '.join(rows.pop())
+                        if cells:
+                            # Tabla anidada: la fila queda dentro de la celda de afuera
+                            cells[-1].append(row)
+                        else:
+                            yield ('' if first else '\n') + row, None, 'table_row'
+                            first = False
+                        element.clear()
+                    elif tag == w + 'tbl':
+                        table_depth -= 1
+                        element.clear()
+
+    @staticmethod
+    def _paragraph_text(paragraph, w):
+        """Texto de un párrafo (<w:t>, tabulaciones y saltos de línea)"""
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == w + 't':
+                parts.append(node.text or '')
+            elif node.tag == w + 'tab':
+                parts.append('\t')
+            elif node.tag in (w + 'br', w + 'cr'):
+                parts.append('\n')
+        return ''.join(parts)
+
+    def _iter_txt(self, file_path, chunk_size=1024 * 1024):
+        """Lee el archivo de a bloques, cortando en el último salto de línea"""
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
+            rest = ''
+            while True:
+                block = f.read(chunk_size)
+                if not block:
+                    break
+
+                block = rest + block
+                cut = block.rfind('\n') + 1
+                if cut == 0:
+                    # Línea más larga que el bloque: se corta igual
+                    cut = len(block)
+                rest = block[cut:]
+                yield block[:cut], None, 'chunk'
+
+            if rest:
+                yield rest, None, 'chunk'
 
     def _extract_from_image(self, file_path):
         """Extrae texto de imagen con OCR"""
-        image = Image.open(file_path)
-        return pytesseract.image_to_string(image, lang='eng')
\ No newline at end of file
+        from PIL import Image
+
+        images = self._preprocess([Image.open(file_path)])
+        if not images:
+            return ""
+
+        if self.ocr_engine is not None:
+            return self.ocr_engine.recognize(images[0])['texto']
+        return self._pytesseract().image_to_string(images[0], lang='eng')
+
+    def _preprocess(self, images, dpi=None, keep_blank=False):
+        """
+        Preprocesa imágenes para el OCR y descarta las páginas en blanco
+
+        Con keep_blank=True las páginas en blanco quedan como None (mantiene
+        la correspondencia con los números de página)
+        """
+        if not self.preprocess:
+            return images
+
+        if self._preprocessor is None:
+            from TestArea02.preprocessing import ImagePreprocessor
+
+            # Configuración recomendada del motor (DPI, grises, binarizado...)
+            motor = getattr(self.ocr_engine, 'nombre', 'tesseract')
+            self._preprocessor = ImagePreprocessor(motor=motor)
+
+        prepared = []
+        for image in images:
+            result = self._preprocessor.procesar(image, dpi_origen=dpi)
+            if result['en_blanco']:
+                print("Página en blanco, se omite")
+                if keep_blank:
+                    prepared.append(None)
+                continue
+            prepared.append(result['imagen'])
+
+        return prepared
\ No newline at end of file
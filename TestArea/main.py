@@ -1,30 +1,41 @@
 # main.py - Ejemplo de uso
 
+import argparse
+import os
 import uuid
 
 from TestArea.ContractChatbot import ContractChatbot
 from TestArea.ContractDatabase import ContractDatabase
 from TestArea.ContractExtractor import ContractExtractor
 from TestArea.DocumentProcessor import DocumentProcessor
+from TestArea02.profiler import agregar_argumentos, crear_desde_argumentos
 
 
-def process_and_store_contract(file_path):
-    """Procesa un contrato y lo almacena en la BD"""
+def process_and_store_contract(file_path, profiler=None):
+    """Procesa un contrato y lo almacena en la BD (profiler: Perfilador opcional)"""
 
-    # 1. Extrae texto
+    if profiler is None:
+        return _process_and_store_contract(file_path)
+
+    with profiler.documento(file_path, os.path.getsize(file_path)):
+        return _process_and_store_contract(file_path)
+
+
+def _process_and_store_contract(file_path):
+    # 1. Extrae el inicio del texto (el resto se lee mientras se guarda)
     processor = DocumentProcessor()
-    text = processor.extract_text(file_path)
-    print(f"✓ Texto extraído: {len(text)} caracteres")
+    head, segments = processor.read_head(file_path)
+    print(f"✓ Inicio extraído: {len(head)} caracteres")
 
-    # 2. Extrae datos estructurados con IA
+    # 2. Extrae datos estructurados con IA (el extractor solo usa el inicio)
     extractor = ContractExtractor()
-    metadata = extractor.extract_contract_data(text)
+    metadata = extractor.extract_contract_data(head)
     print(f"✓ Datos extraídos: {metadata}")
 
-    # 3. Almacena en base de datos
+    # 3. Almacena en base de datos (los segmentos van al almacén sin armar el texto entero)
     db = ContractDatabase()
     contract_id = str(uuid.uuid4())
-    db.add_contract(contract_id, text, metadata)
+    db.add_contract(contract_id, segments, metadata)
     print(f"✓ Contrato almacenado con ID: {contract_id}")
 
     return contract_id
@@ -50,8 +61,14 @@ def chat_with_contracts():
 
 # Ejemplo de uso
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Procesa un contrato y abre el chat")
+    parser.add_argument("file_path", nargs="?",
+                        default="Cardow, Inc dba Cardow Airport Store Lease and Amend No. 1 10.2014.pdf")
+    agregar_argumentos(parser)
+    args = parser.parse_args()
+
     # Procesa un contrato
-    contract_id = process_and_store_contract("Cardow, Inc dba Cardow Airport Store Lease and Amend No. 1 10.2014.pdf")
+    contract_id = process_and_store_contract(args.file_path, crear_desde_argumentos(args))
 
     # Inicia el chat
     chat_with_contracts()
@@ -0,0 +1,164 @@
+import os
+import statistics
+import threading
+import time
+
+from metrics import METRICAS, log
+
+
+class _Ventana:
+    """Llamadas terminadas desde la última decisión"""
+
+    def __init__(self):
+        self.desde = time.monotonic()
+        self.llamadas = 0
+        self.errores = 0
+        self.tokens = 0
+        self.latencias = []     # Segundos por token (solo llamadas con tokens conocidos)
+        self.saturada = False   # Alguna llamada empezó con todos los lugares ocupados
+
+
+class LimitadorAdaptativo:
+    """
+    RESPONSABILIDAD: Decidir cuántas llamadas a Ollama pueden ir en paralelo
+
+    ¿Qué hace?
+    - Cuenta las llamadas en vuelo; LLMScheduler solo arranca otra si hay lugar
+    - Cada ventana de llamadas terminadas mide tokens/s y latencia por token
+    - Sube el límite de a uno (aumento aditivo) mientras el límite se llena y
+      los tokens/s siguen creciendo
+    - Si subir no mejoró el rendimiento, vuelve un paso y espera unas
+      ventanas antes de probar de nuevo
+    - Si hay errores o la latencia por token pasa 'tolerancia' veces la
+      mejor medida, lo baja de golpe (decremento multiplicativo)
+    - Nunca pasa de 'maximo' ni baja de 'minimo'
+
+    Así la ingesta en lote encuentra sola la concurrencia que aguanta el
+    servidor: en una CPU queda en 1-2, en una GPU grande sube hasta el techo.
+    """
+
+    def __init__(self, maximo=None, minimo=1, inicial=1, muestras_minimas=10, tolerancia=2.0,
+                 mejora_minima=0.05, factor_baja=0.7, enfriamiento=5):
+        """
+        Args:
+            maximo: Techo de llamadas simultáneas (None = LLM_MAX_CONCURRENCIA o 8)
+            minimo: Piso de llamadas simultáneas
+            inicial: Límite al arrancar
+            muestras_minimas: Llamadas por ventana como mínimo (la ventana es
+                              el mayor entre esto y el doble del límite actual)
+            tolerancia: Latencia por token aceptada respecto a la mejor medida
+            mejora_minima: Mejora de tokens/s que justifica haber subido (0.05 = 5%)
+            factor_baja: Multiplicador del límite ante errores o latencia alta
+            enfriamiento: Ventanas sin probar subir después de un paso atrás
+        """
+        self.maximo = maximo or int(os.environ.get("LLM_MAX_CONCURRENCIA", "8"))
+        self.minimo = max(1, minimo)
+        self.limite = min(max(inicial, self.minimo), self.maximo)
+        self.muestras_minimas = muestras_minimas
+        self.tolerancia = tolerancia
+        self.mejora_minima = mejora_minima
+        self.factor_baja = factor_baja
+        self.enfriamiento = enfriamiento
+
+        self.en_vuelo = 0
+        self.base = None                # Mejor latencia por token (se corre de a poco si empeora)
+        self.rendimiento = None         # tokens/s (o llamadas/s) de la última ventana
+        self._subio = False
+        self._esperar = 0
+        self._ventana = _Ventana()
+        self._lock = threading.Lock()
+
+        METRICAS.fijar("llm_limite", self.limite)
+        METRICAS.fijar("llm_limite_maximo", self.maximo)
+
+    def hay_lugar(self):
+        return self.en_vuelo < self.limite
+
+    def empezar(self):
+        """Marca una llamada en vuelo (quien llama ya verificó hay_lugar)"""
+        with self._lock:
+            self.en_vuelo += 1
+            if self.en_vuelo >= self.limite:
+                self._ventana.saturada = True
+            METRICAS.fijar("llm_en_vuelo", self.en_vuelo)
+
+    def terminar(self, segundos, tokens=0, error=False, medir=True):
+        """
+        Registra una llamada terminada y, si se completó la ventana, ajusta el límite
+
+        Args:
+            segundos: Duración de la llamada
+            tokens: Tokens procesados (entrada + salida; 0 si no se sabe: la
+                    llamada cuenta para el rendimiento pero no para la latencia)
+            error: La llamada falló o venció
+            medir: False solo libera el lugar (ej: una respuesta en streaming)
+        """
+        with self._lock:
+            self.en_vuelo -= 1
+            METRICAS.fijar("llm_en_vuelo", self.en_vuelo)
+            if not medir:
+                return
+
+            ventana = self._ventana
+            ventana.llamadas += 1
+            ventana.errores += bool(error)
+            ventana.tokens += tokens
+            if not error and tokens:
+                ventana.latencias.append(segundos / tokens)
+
+            if ventana.llamadas >= max(self.muestras_minimas, 2 * self.limite):
+                self._ajustar(ventana)
+                self._ventana = _Ventana()
+
+    def _ajustar(self, ventana):
+        """Decide el límite siguiente con lo medido en la ventana; se llama con el lock tomado"""
+        duracion = max(time.monotonic() - ventana.desde, 1e-6)
+        rendimiento = (ventana.tokens or ventana.llamadas) / duracion
+        latencia = statistics.median(ventana.latencias) if ventana.latencias else None
+
+        if latencia is not None:
+            if self.base is None or latencia < self.base:
+                self.base = latencia
+            else:
+                # La mejor latencia se corre despacio: el texto de los contratos también cambia
+                self.base += 0.01 * (latencia - self.base)
+
+        anterior = self.limite
+        motivo = None
+
+        if ventana.errores:
+            self.limite = max(self.minimo, int(self.limite * self.factor_baja))
+            motivo = "errores"
+        elif latencia is not None and latencia > self.tolerancia * self.base:
+            self.limite = max(self.minimo, int(self.limite * self.factor_baja))
+            motivo = "latencia"
+        elif self._subio and rendimiento < self.rendimiento * (1 + self.mejora_minima):
+            self.limite = max(self.minimo, self.limite - 1)
+            self._esperar = self.enfriamiento
+            motivo = "sin_mejora"
+        elif self._esperar:
+            self._esperar -= 1
+        elif ventana.saturada and self.limite < self.maximo:
+            self.limite += 1
+            motivo = "sube"
+
+        self._subio = self.limite > anterior
+        self.rendimiento = rendimiento
+
+        METRICAS.observar("llm_rendimiento", rendimiento, buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000))
+        METRICAS.fijar("llm_limite", self.limite)
+        if self.limite != anterior:
+            METRICAS.incrementar("llm_ajustes_limite", motivo=motivo)
+            log(f"🎚️ Concurrencia del LLM: {anterior} → {self.limite} ({motivo}, {rendimiento:.1f}/s)",
+                evento="llm_limite", anterior=anterior, limite=self.limite, motivo=motivo,
+                rendimiento=round(rendimiento, 2))
+
+    def estado(self):
+        """Límite, techo y última medición (para /stats y benchmarks)"""
+        return {
+            "limite": self.limite,
+            "maximo": self.maximo,
+            "en_vuelo": self.en_vuelo,
+            "rendimiento": self.rendimiento,
+            "latencia_base": self.base
+        }
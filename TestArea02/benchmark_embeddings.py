@@ -0,0 +1,141 @@
+"""
+Benchmark de backends de embeddings: PyTorch contra ONNX Runtime (float32 / int8)
+
+Uso:
+    python benchmark_embeddings.py --textos 256 --batch-size 1,16,64
+    python benchmark_embeddings.py --backends onnx,onnx-int8 --hilos 4
+
+Los textos son fragmentos de contratos sintéticos (el mismo largo que se
+guarda en la base) y preguntas cortas. Cada backend corre en su propio proceso
+para que el tiempo de carga y el pico de memoria sean solo suyos.
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmark_utils import MedidorMemoria, formatear_tabla, guardar_json, info_maquina, percentil, pico_rss_mb
+
+
+PREGUNTAS = [
+    "¿Cuál es el monto total del contrato?",
+    "When does the service agreement expire?",
+    "¿Quiénes son las partes del contrato de arrendamiento?",
+    "What penalties apply for late delivery?",
+]
+
+
+def _textos(n, semilla, largo=1000):
+    """Fragmentos de contratos sintéticos (como los que se embeben al guardar)"""
+    from synthetic_pages import generar_contrato
+
+    return [generar_contrato(semilla + i)[0][:largo] for i in range(n)]
+
+
+def _medir_backend(nombre, textos, tamanos_lote, consultas, hilos):
+    """
+    Mide un backend (corre en un proceso aparte)
+
+    Returns:
+        list de dicts, uno por tamaño de lote
+    """
+    from embeddings import crear_embedder
+
+    opciones = {"hilos": hilos} if hilos and nombre != "torch" else {}
+
+    inicio = time.perf_counter()
+    embedder = crear_embedder(nombre, **opciones)
+    carga_s = time.perf_counter() - inicio
+
+    # La primera llamada inicializa kernels: no se mide
+    embedder.encode(textos[:2])
+
+    # Latencia de una consulta suelta (el caso de buscar_contratos)
+    latencias = []
+    for i in range(consultas):
+        inicio = time.perf_counter()
+        embedder.encode(PREGUNTAS[i % len(PREGUNTAS)])
+        latencias.append(time.perf_counter() - inicio)
+
+    filas = []
+    for tamano in tamanos_lote:
+        with MedidorMemoria() as memoria:
+            inicio = time.perf_counter()
+            embedder.encode(textos, batch_size=tamano)
+            segundos = time.perf_counter() - inicio
+
+        filas.append({
+            "backend": nombre,
+            "batch_size": tamano,
+            "textos": len(textos),
+            "textos_por_segundo": len(textos) / segundos,
+            "consulta_p50_ms": percentil(latencias, 50) * 1000,
+            "consulta_p95_ms": percentil(latencias, 95) * 1000,
+            "carga_s": carga_s,
+            "memoria_mb": memoria.pico_mb,
+            "pico_rss_mb": pico_rss_mb(),
+            "torch_cargado": "torch" in sys.modules
+        })
+
+    return filas
+
+
+def _lista(tipo):
+    """Convierte '1,16,64' en [1, 16, 64]"""
+    return lambda valor: [tipo(v) for v in valor.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de embeddings")
+    parser.add_argument("--backends", type=_lista(str), default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--textos", type=int, default=128, help="Fragmentos a embeber por medición")
+    parser.add_argument("--batch-size", type=_lista(int), default=[1, 16, 64])
+    parser.add_argument("--consultas", type=int, default=50, help="Consultas sueltas para la latencia")
+    parser.add_argument("--hilos", type=int, default=None, help="Hilos de ONNX Runtime")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default="benchmark_embeddings.json")
+    args = parser.parse_args()
+
+    textos = _textos(args.textos, args.semilla)
+    print(f"📊 Benchmark de embeddings: {len(args.backends)} backends × {len(textos)} textos")
+
+    filas = []
+    errores = {}
+    contexto = multiprocessing.get_context("spawn")
+
+    for nombre in args.backends:
+        print(f"🔍 Midiendo {nombre}...")
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            futuro = pool.submit(_medir_backend, nombre, textos, args.batch_size, args.consultas, args.hilos)
+            try:
+                filas.extend(futuro.result())
+            except Exception as e:
+                print(f"⚠️ {nombre} no disponible: {e}")
+                errores[nombre] = str(e)
+
+    guardar_json(args.salida, {
+        "maquina": info_maquina(),
+        "parametros": vars(args),
+        "resultados": filas,
+        "errores": errores
+    })
+
+    print()
+    print(formatear_tabla(filas, [
+        ("backend", "Backend", "{}"),
+        ("batch_size", "Lote", "{}"),
+        ("textos_por_segundo", "Textos/s", "{:.1f}"),
+        ("consulta_p50_ms", "Consulta p50 ms", "{:.1f}"),
+        ("consulta_p95_ms", "Consulta p95 ms", "{:.1f}"),
+        ("carga_s", "Carga s", "{:.2f}"),
+        ("memoria_mb", "+MB lote", "{:.0f}"),
+        ("pico_rss_mb", "RSS pico proceso MB", "{:.0f}"),
+        ("torch_cargado", "Torch", "{}")
+    ]))
+    print(f"\n✅ Resultados guardados en: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
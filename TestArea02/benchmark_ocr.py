@@ -0,0 +1,154 @@
+"""
+Benchmark de motores OCR sobre páginas de contratos sintéticas
+
+Uso:
+    python benchmark_ocr.py --motores paddle,tesseract,easyocr --paginas 20
+    python benchmark_ocr.py --dpi 150,300 --ruido 0,0.08 --inclinacion 0,2 --salida ocr.json
+
+Las páginas se generan con PIL a partir de contratos sintéticos con texto
+conocido, así que los resultados son repetibles en cualquier máquina.
+Cada motor corre en su propio proceso para que el pico de memoria sea suyo.
+"""
+import argparse
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmark_utils import (
+    formatear_tabla,
+    guardar_json,
+    info_maquina,
+    MedidorMemoria,
+    pico_rss_mb,
+    tasa_error_caracteres,
+    tasa_error_palabras
+)
+
+
+def _medir_motor(nombre, lang, configuraciones, n_paginas, batch_size, semilla):
+    """
+    Mide un motor sobre todas las configuraciones (corre en un proceso aparte)
+
+    Returns:
+        list de dicts, uno por configuración
+    """
+    from ocr_engines import crear_motor
+    from synthetic_pages import generar_paginas
+
+    inicio = time.perf_counter()
+    motor = crear_motor(nombre, lang=lang)
+    carga_s = time.perf_counter() - inicio
+
+    filas = []
+    calentado = False
+
+    for configuracion in configuraciones:
+        paginas = generar_paginas(n_paginas, semilla=semilla, **configuracion)
+        imagenes = [imagen for imagen, _ in paginas]
+
+        # La primera llamada carga pesos y compila: no se mide
+        if not calentado:
+            motor.recognize_batch(imagenes[:1])
+            calentado = True
+
+        resultados = []
+        with MedidorMemoria() as memoria:
+            inicio = time.perf_counter()
+            for i in range(0, len(imagenes), batch_size):
+                resultados.extend(motor.recognize_batch(imagenes[i:i + batch_size]))
+            segundos = time.perf_counter() - inicio
+
+        cer = [tasa_error_caracteres(real, r["texto"]) for (_, real), r in zip(paginas, resultados)]
+        wer = [tasa_error_palabras(real, r["texto"]) for (_, real), r in zip(paginas, resultados)]
+
+        filas.append({
+            "motor": nombre,
+            **configuracion,
+            "paginas": len(imagenes),
+            "segundos": segundos,
+            "paginas_por_segundo": len(imagenes) / segundos if segundos else None,
+            "cer": sum(cer) / len(cer),
+            "wer": sum(wer) / len(wer),
+            "carga_s": carga_s,
+            "memoria_mb": memoria.pico_mb,
+            "pico_rss_mb": pico_rss_mb()
+        })
+
+    return filas
+
+
+def _lista(tipo):
+    """Convierte '150,300' en [150, 300]"""
+    return lambda valor: [tipo(v) for v in valor.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de motores OCR con páginas sintéticas")
+    parser.add_argument("--motores", type=_lista(str), default=["paddle", "tesseract", "easyocr"])
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--paginas", type=int, default=10, help="Páginas por configuración")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--dpi", type=_lista(int), default=[300])
+    parser.add_argument("--tamano-fuente", type=_lista(int), default=[11])
+    parser.add_argument("--fuente", type=_lista(str), default=[None])
+    parser.add_argument("--ruido", type=_lista(float), default=[0.0])
+    parser.add_argument("--inclinacion", type=_lista(float), default=[0.0])
+    parser.add_argument("--salida", default="benchmark_ocr.json")
+    args = parser.parse_args()
+
+    # Todas las combinaciones de parámetros
+    configuraciones = [
+        {"dpi": dpi, "tamano_fuente": tamano, "fuente": fuente, "ruido": ruido, "inclinacion": inclinacion}
+        for dpi, tamano, fuente, ruido, inclinacion in itertools.product(
+            args.dpi, args.tamano_fuente, args.fuente, args.ruido, args.inclinacion
+        )
+    ]
+
+    print(f"📊 Benchmark OCR: {len(args.motores)} motores × {len(configuraciones)} configuraciones "
+          f"× {args.paginas} páginas")
+
+    filas = []
+    errores = {}
+    contexto = multiprocessing.get_context("spawn")
+
+    for nombre in args.motores:
+        print(f"🔍 Midiendo {nombre}...")
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            futuro = pool.submit(
+                _medir_motor, nombre, args.lang, configuraciones, args.paginas, args.batch_size, args.semilla
+            )
+            try:
+                filas.extend(futuro.result())
+            except Exception as e:
+                print(f"⚠️ {nombre} no disponible: {e}")
+                errores[nombre] = str(e)
+
+    guardar_json(args.salida, {
+        "maquina": info_maquina(),
+        "parametros": vars(args),
+        "resultados": filas,
+        "errores": errores
+    })
+
+    print()
+    print(formatear_tabla(filas, [
+        ("motor", "Motor", "{}"),
+        ("dpi", "DPI", "{}"),
+        ("tamano_fuente", "Pt", "{}"),
+        ("ruido", "Ruido", "{:.2f}"),
+        ("inclinacion", "Incl.", "{:.1f}"),
+        ("paginas_por_segundo", "Pág/s", "{:.2f}"),
+        ("cer", "CER", "{:.2%}"),
+        ("wer", "WER", "{:.2%}"),
+        ("carga_s", "Carga s", "{:.1f}"),
+        ("memoria_mb", "+MB corrida", "{:.0f}"),
+        ("pico_rss_mb", "RSS pico proceso MB", "{:.0f}")
+    ]))
+    print(f"\n✅ Resultados guardados en: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
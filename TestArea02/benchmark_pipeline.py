@@ -0,0 +1,224 @@
+"""
+Benchmark de punta a punta del sistema de contratos
+
+Uso:
+    python benchmark_pipeline.py --docs 50 --preguntas 100
+    python benchmark_pipeline.py --ocr --motor tesseract --docs 10
+    python benchmark_pipeline.py --latencia 0.5 --tokens-por-segundo 20 --salida pipeline.json
+
+Levanta un Ollama falso (fake_ollama.py), genera un corpus sintético y mide
+cada etapa de ContractSystem: OCR, extracción con LLM, guardado en la base
+(embedding + Chroma), ficha del contrato, búsqueda, armado de contexto
+y respuesta del LLM. Con --sin-fichas el contexto es el texto de siempre.
+"""
+import argparse
+import contextlib
+import io
+import random
+import tempfile
+import time
+
+from benchmark_utils import MedidorMemoria, formatear_tabla, guardar_json, info_maquina, percentil, pico_rss_mb
+from fake_ollama import FakeOllamaServer
+from llm_extractor import VERSION_FICHA
+from metrics import METRICAS
+from synthetic_corpus import generar_corpus
+
+
+_PREGUNTAS = [
+    "What is the total amount of the contract between {0} and {1}?",
+    "When does the agreement between {0} and {1} end?",
+    "Which penalties apply to {0}?",
+    "What is the object of the contract signed by {1}?",
+    "Which contracts are lease agreements?",
+]
+
+
+class _Etapas:
+    """Acumula tiempos por etapa"""
+
+    def __init__(self):
+        self.tiempos = {}
+
+    @contextlib.contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tiempos.setdefault(etapa, []).append(time.perf_counter() - inicio)
+
+    def resumen(self, grupo):
+        filas = []
+        for etapa, valores in self.tiempos.items():
+            total = sum(valores)
+            filas.append({
+                "grupo": grupo,
+                "etapa": etapa,
+                "n": len(valores),
+                "total_s": total,
+                "por_segundo": len(valores) / total if total else None,
+                "p50_ms": percentil(valores, 50) * 1000,
+                "p95_ms": percentil(valores, 95) * 1000,
+                "p99_ms": percentil(valores, 99) * 1000
+            })
+        return filas
+
+
+def _silencio(verbose):
+    """Oculta los prints del sistema salvo en modo verbose"""
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+
+def ingerir(sistema, corpus, usar_ocr, verbose=False):
+    """Procesa el corpus etapa por etapa, igual que ContractSystem.procesar_contrato"""
+    etapas = _Etapas()
+
+    for documento in corpus:
+        with _silencio(verbose), etapas.medir("total"):
+            if usar_ocr:
+                with etapas.medir("ocr"):
+                    resultado_ocr = sistema.ocr.extraer_texto(documento["imagen"])
+                texto, confianza = resultado_ocr["texto_completo"], resultado_ocr["confianza"]
+            else:
+                texto, confianza = documento["texto"], 1.0
+
+            with etapas.medir("llm_extraccion"):
+                datos = sistema.llm.extract_contract_data(texto)
+
+            ficha = None
+            if sistema.fichas:
+                with etapas.medir("llm_ficha"):
+                    ficha = sistema.llm.generar_ficha(texto, datos)
+
+            with etapas.medir("bd_guardar"):
+                sistema.db.guardar_contrato(
+                    archivo=documento["imagen"] or documento["id"],
+                    texto_ocr=texto,
+                    datos_estructurados=datos,
+                    confianza_ocr=confianza,
+                    ficha=ficha,
+                    version_ficha=VERSION_FICHA
+                )
+
+    return etapas
+
+
+def consultar(sistema, preguntas, verbose=False):
+    """Responde preguntas etapa por etapa, igual que ContractSystem.responder_pregunta"""
+    etapas = _Etapas()
+
+    for pregunta in preguntas:
+        with _silencio(verbose), etapas.medir("total"):
+            # Con fichas se busca y se arma el contexto igual que preparar_contexto
+            with etapas.medir("busqueda"):
+                buscar = sistema.db.buscar_fichas if sistema.fichas else sistema.db.buscar_contratos
+                resultados = buscar(pregunta, n_results=3)
+
+            if not resultados["ids"][0]:
+                continue
+
+            with etapas.medir("contexto"):
+                if sistema.fichas:
+                    contexto = sistema._construir_contexto_fichas(pregunta, resultados)
+                else:
+                    contexto = sistema._construir_contexto(resultados)
+
+            with etapas.medir("llm_respuesta"):
+                sistema.llm.responder_pregunta(pregunta, contexto)
+
+    return etapas
+
+
+def generar_preguntas(corpus, n, semilla=0):
+    """Arma preguntas sobre las partes de los contratos del corpus"""
+    rng = random.Random(semilla)
+    preguntas = []
+
+    for _ in range(n):
+        partes = rng.choice(corpus)["datos"]["parties"]
+        preguntas.append(rng.choice(_PREGUNTAS).format(*partes))
+
+    return preguntas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta con Ollama falso")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--preguntas", type=int, default=50)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--ocr", action="store_true", help="Renderizar páginas y pasar por OCR")
+    parser.add_argument("--motor", default=None, help="Motor OCR (por defecto OCR_ENGINE)")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Latencia del Ollama falso (s)")
+    parser.add_argument("--tokens-por-segundo", type=float, default=200.0)
+    parser.add_argument("--ollama-url", default=None, help="Usar un Ollama real en vez del falso")
+    parser.add_argument("--modelo", default="mistral:7b")
+    parser.add_argument("--salida", default="benchmark_pipeline.json")
+    parser.add_argument("--sin-fichas", action="store_true", help="No generar fichas (contexto con texto crudo)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    from contract_system import ContractSystem
+
+    servidor = None
+    if not args.ollama_url:
+        servidor = FakeOllamaServer(latencia=args.latencia, tokens_por_segundo=args.tokens_por_segundo).start()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        print(f"📄 Generando {args.docs} contratos sintéticos...")
+        corpus = generar_corpus(f"{carpeta}/corpus", args.docs, semilla=args.semilla, imagenes=args.ocr)
+        preguntas = generar_preguntas(corpus, args.preguntas, semilla=args.semilla)
+
+        inicio = time.perf_counter()
+        with _silencio(args.verbose):
+            sistema = ContractSystem(
+                db_path=f"{carpeta}/chroma_db",
+                llm_model=args.modelo,
+                ocr_engine=args.motor,
+                llm_url=args.ollama_url or servidor.url,
+                fichas=not args.sin_fichas
+            )
+        arranque_s = time.perf_counter() - inicio
+
+        print("📥 Ingiriendo...")
+        with MedidorMemoria() as memoria:
+            ingesta = ingerir(sistema, corpus, args.ocr, args.verbose)
+        rss_ingesta = pico_rss_mb()
+
+        print("❓ Consultando...")
+        consultas = consultar(sistema, preguntas, args.verbose)
+
+    if servidor:
+        servidor.stop()
+
+    filas = ingesta.resumen("ingesta") + consultas.resumen("consulta")
+    resultado = {
+        "maquina": info_maquina(),
+        "parametros": vars(args),
+        "arranque_s": arranque_s,
+        "memoria_ingesta_mb": memoria.pico_mb,  # Lo que creció el RSS durante la ingesta
+        "pico_rss_ingesta_mb": rss_ingesta,     # Pico del proceso (arranque incluido)
+        "pico_rss_mb": pico_rss_mb(),
+        "etapas": filas,
+        "metricas": METRICAS.exportar_json()  # Incluye embedding vs. escritura en Chroma
+    }
+    guardar_json(args.salida, resultado)
+
+    print()
+    print(formatear_tabla(filas, [
+        ("grupo", "Grupo", "{}"),
+        ("etapa", "Etapa", "{}"),
+        ("n", "N", "{}"),
+        ("por_segundo", "Ops/s", "{:.2f}"),
+        ("p50_ms", "p50 ms", "{:.1f}"),
+        ("p95_ms", "p95 ms", "{:.1f}"),
+        ("p99_ms", "p99 ms", "{:.1f}")
+    ]))
+    pico = resultado["pico_rss_mb"]
+    print(f"\n🚀 Arranque: {arranque_s:.2f}s | 💾 Pico RSS del proceso: "
+          f"{'-' if pico is None else f'{pico:.0f} MB'}")
+    print(f"✅ Resultados guardados en: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
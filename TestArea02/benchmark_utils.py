@@ -0,0 +1,213 @@
+import json
+import os
+import platform
+import sys
+import threading
+
+
+def pico_rss_mb():
+    """
+    Memoria residente máxima del proceso actual desde que arrancó
+
+    Es el pico de toda la vida del proceso (incluye cargar modelos, generar
+    páginas, etc.): para lo que usa una corrida puntual ver MedidorMemoria.
+
+    Returns:
+        float: Pico de RSS en MB (None si la plataforma no lo informa)
+    """
+    try:
+        import resource
+    except ImportError:
+        # Windows: no hay 'resource'; psutil informa el pico del working set
+        try:
+            import psutil
+        except ImportError:
+            return None
+        memoria = psutil.Process().memory_info()
+        return getattr(memoria, "peak_wset", memoria.rss) / (1024 * 1024)
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reporta KB, macOS reporta bytes
+    if sys.platform == "darwin":
+        return pico / (1024 * 1024)
+    return pico / 1024
+
+
+def rss_mb():
+    """
+    Memoria residente actual del proceso
+
+    Returns:
+        float: RSS en MB (None si no hay psutil ni /proc)
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class MedidorMemoria:
+    """
+    Pico de memoria de un bloque de código, no del proceso entero
+
+    Un hilo mide el RSS cada 'intervalo' segundos mientras dura el bloque;
+    pico_mb es lo que creció por encima del RSS al entrar. Incluye memoria
+    nativa (modelos, ONNX Runtime, Paddle), que tracemalloc no ve.
+
+        with MedidorMemoria() as memoria:
+            correr()
+        memoria.pico_mb
+    """
+
+    def __init__(self, intervalo=0.01):
+        self.intervalo = intervalo
+        self.inicial = None
+        self.maximo = None
+        self._fin = threading.Event()
+        self._hilo = None
+
+    def __enter__(self):
+        self.inicial = rss_mb()
+        self.maximo = self.inicial
+        if self.inicial is not None:
+            self._hilo = threading.Thread(target=self._medir, daemon=True)
+            self._hilo.start()
+        return self
+
+    def _medir(self):
+        while not self._fin.wait(self.intervalo):
+            self.maximo = max(self.maximo, rss_mb())
+
+    def __exit__(self, *_):
+        self._fin.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self.maximo = max(self.maximo, rss_mb())
+        return False
+
+    @property
+    def pico_mb(self):
+        """MB por encima del RSS inicial (None si no se puede medir)"""
+        if self.inicial is None:
+            return None
+        return self.maximo - self.inicial
+
+
+def percentil(valores, p):
+    """
+    Percentil p (0-100) con interpolación lineal
+
+    Args:
+        valores: Lista de números
+        p: Percentil a calcular (ej: 95)
+
+    Returns:
+        float: Valor del percentil (0 si no hay valores)
+    """
+    if not valores:
+        return 0.0
+
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p / 100
+    abajo = int(posicion)
+    arriba = min(abajo + 1, len(ordenados) - 1)
+
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def levenshtein(a, b):
+    """
+    Distancia de edición entre dos secuencias (strings o listas de palabras)
+
+    Usa rapidfuzz si está instalado; si no, programación dinámica en Python.
+    """
+    try:
+        from rapidfuzz.distance import Levenshtein
+        return Levenshtein.distance(a, b)
+    except ImportError:
+        pass
+
+    # Quitar prefijo y sufijo comunes (lo habitual en OCR bueno)
+    inicio = 0
+    while inicio < len(a) and inicio < len(b) and a[inicio] == b[inicio]:
+        inicio += 1
+    fin_a, fin_b = len(a), len(b)
+    while fin_a > inicio and fin_b > inicio and a[fin_a - 1] == b[fin_b - 1]:
+        fin_a -= 1
+        fin_b -= 1
+    a, b = a[inicio:fin_a], b[inicio:fin_b]
+
+    if len(a) < len(b):
+        a, b = b, a
+
+    anterior = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        actual = [i]
+        for j, y in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (x != y)))
+        anterior = actual
+
+    return anterior[-1]
+
+
+def tasa_error_caracteres(referencia, hipotesis):
+    """CER: distancia de edición por carácter (espacios normalizados)"""
+    referencia = " ".join(referencia.split())
+    hipotesis = " ".join(hipotesis.split())
+    return levenshtein(referencia, hipotesis) / max(len(referencia), 1)
+
+
+def tasa_error_palabras(referencia, hipotesis):
+    """WER: distancia de edición por palabra"""
+    referencia = referencia.split()
+    return levenshtein(referencia, hipotesis.split()) / max(len(referencia), 1)
+
+
+def formatear_tabla(filas, columnas):
+    """
+    Formatea una lista de dicts como tabla de texto alineada
+
+    Args:
+        filas: Lista de dicts
+        columnas: Lista de (clave, titulo, formato) ej: ("cer", "CER", "{:.2%}")
+
+    Returns:
+        str: Tabla lista para imprimir
+    """
+    celdas = [[titulo for _, titulo, _ in columnas]]
+    for fila in filas:
+        celdas.append([
+            formato.format(fila[clave]) if fila.get(clave) is not None else "-"
+            for clave, _, formato in columnas
+        ])
+
+    anchos = [max(len(celda[i]) for celda in celdas) for i in range(len(columnas))]
+    lineas = ["  ".join(celda.ljust(ancho) for celda, ancho in zip(fila, anchos)) for fila in celdas]
+    lineas.insert(1, "  ".join("-" * ancho for ancho in anchos))
+
+    return "\n".join(lineas)
+
+
+def info_maquina():
+    """Datos de la máquina para que los resultados sean comparables"""
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count()
+    }
+
+
+def guardar_json(ruta, datos):
+    """Guarda resultados de benchmark en JSON"""
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
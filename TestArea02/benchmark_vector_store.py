@@ -0,0 +1,161 @@
+"""
+Benchmark de backends de vectores: NumPy (float32 / int8) contra Chroma HNSW
+
+Uso:
+    python benchmark_vector_store.py --n 50000 --consultas 200
+    python benchmark_vector_store.py --n 200000 --backends numpy,numpy-int8 --filtro
+
+Genera vectores sintéticos agrupados (como los embeddings de contratos
+parecidos), calcula el top-k exacto como referencia y mide para cada backend:
+tiempo de carga, tiempo de apertura en frío, latencia por consulta y recall@k.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark_utils import MedidorMemoria, formatear_tabla, guardar_json, info_maquina, percentil, pico_rss_mb
+from vector_store import ChromaVectorStore, NumpyVectorStore
+
+
+_BACKENDS = {
+    "numpy": lambda carpeta: NumpyVectorStore(carpeta, dtype="float32"),
+    "numpy-int8": lambda carpeta: NumpyVectorStore(carpeta, dtype="int8"),
+    "chroma": lambda carpeta: ChromaVectorStore(carpeta),
+}
+
+
+def generar_vectores(n, dim, grupos=200, semilla=0):
+    """Vectores agrupados alrededor de centros aleatorios (normalizados)"""
+    rng = np.random.default_rng(semilla)
+    centros = rng.normal(size=(grupos, dim)).astype(np.float32)
+    asignacion = rng.integers(0, grupos, n)
+    vectores = centros[asignacion] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    vectores /= np.linalg.norm(vectores, axis=1, keepdims=True)
+    anios = 2010 + asignacion % 15
+    return vectores, anios
+
+
+def top_k_exacto(vectores, consultas, k, mascara=None):
+    """Referencia: top-k por fuerza bruta en float64"""
+    similitudes = consultas.astype(np.float64) @ vectores.astype(np.float64).T
+    if mascara is not None:
+        similitudes[:, ~mascara] = -np.inf
+    return np.argsort(-similitudes, axis=1)[:, :k]
+
+
+def _tamano_mb(carpeta):
+    total = 0
+    for raiz, _, archivos in os.walk(carpeta):
+        total += sum(os.path.getsize(os.path.join(raiz, a)) for a in archivos)
+    return total / (1024 * 1024)
+
+
+def medir_backend(nombre, vectores, anios, consultas, referencia, k, filtro, lote=5000):
+    carpeta = tempfile.mkdtemp(prefix=f"bench_{nombre}_")
+    try:
+        ids = [f"c{i}" for i in range(len(vectores))]
+        metadatas = [{"anio": int(a)} for a in anios]
+
+        # Carga
+        store = _BACKENDS[nombre](carpeta)
+        inicio = time.perf_counter()
+        for i in range(0, len(vectores), lote):
+            store.add(ids=ids[i:i + lote], embeddings=vectores[i:i + lote].tolist(),
+                      documents=None, metadatas=metadatas[i:i + lote])
+        carga_s = time.perf_counter() - inicio
+        del store
+
+        # Apertura en frío (lo que paga cada comando al arrancar) y consultas:
+        # la memoria se mide solo acá, todos los backends corren en este proceso
+        with MedidorMemoria() as memoria:
+            inicio = time.perf_counter()
+            store = _BACKENDS[nombre](carpeta)
+            apertura_s = time.perf_counter() - inicio
+
+            where = {"anio": {"$gte": 2020}} if filtro else None
+            latencias = []
+            aciertos = 0
+            for consulta, esperados in zip(consultas, referencia):
+                inicio = time.perf_counter()
+                resultado = store.query(query_embeddings=[consulta.tolist()], n_results=k, where=where,
+                                        include=["distances"])
+                latencias.append(time.perf_counter() - inicio)
+
+                encontrados = {int(i[1:]) for i in resultado["ids"][0]}
+                aciertos += len(encontrados & set(esperados.tolist()))
+
+        return {
+            "backend": nombre,
+            "n": len(vectores),
+            "carga_s": carga_s,
+            "apertura_s": apertura_s,
+            "p50_ms": percentil(latencias, 50) * 1000,
+            "p95_ms": percentil(latencias, 95) * 1000,
+            "qps": len(latencias) / sum(latencias),
+            "recall": aciertos / (len(consultas) * k),
+            "disco_mb": _tamano_mb(carpeta),
+            "memoria_mb": memoria.pico_mb,
+            "pico_rss_mb": pico_rss_mb()
+        }
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NumPy vs Chroma")
+    parser.add_argument("--n", type=int, default=20000, help="Cantidad de vectores")
+    parser.add_argument("--dim", type=int, default=384, help="Dimensión (MiniLM-L12 = 384)")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backends", default="numpy,numpy-int8,chroma")
+    parser.add_argument("--filtro", action="store_true", help="Filtrar por metadata (anio >= 2020)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default="benchmark_vector_store.json")
+    args = parser.parse_args()
+
+    print(f"📊 Generando {args.n} vectores de dimensión {args.dim}...")
+    vectores, anios = generar_vectores(args.n, args.dim, semilla=args.semilla)
+
+    rng = np.random.default_rng(args.semilla + 1)
+    consultas = vectores[rng.integers(0, args.n, args.consultas)]
+    consultas = consultas + 0.3 * rng.normal(size=consultas.shape).astype(np.float32)
+    consultas /= np.linalg.norm(consultas, axis=1, keepdims=True)
+
+    mascara = anios >= 2020 if args.filtro else None
+    referencia = top_k_exacto(vectores, consultas, args.k, mascara)
+
+    filas = []
+    errores = {}
+    for nombre in args.backends.split(","):
+        print(f"🔍 Midiendo {nombre}...")
+        try:
+            filas.append(medir_backend(nombre, vectores, anios, consultas, referencia, args.k, args.filtro))
+        except ImportError as e:
+            print(f"⚠️ {nombre} no disponible: {e}")
+            errores[nombre] = str(e)
+
+    guardar_json(args.salida, {"maquina": info_maquina(), "parametros": vars(args),
+                               "resultados": filas, "errores": errores})
+
+    print()
+    print(formatear_tabla(filas, [
+        ("backend", "Backend", "{}"),
+        ("n", "N", "{}"),
+        ("carga_s", "Carga s", "{:.2f}"),
+        ("apertura_s", "Apertura s", "{:.3f}"),
+        ("p50_ms", "p50 ms", "{:.2f}"),
+        ("p95_ms", "p95 ms", "{:.2f}"),
+        ("qps", "Consultas/s", "{:.0f}"),
+        ("recall", f"Recall@{args.k}", "{:.3f}"),
+        ("disco_mb", "Disco MB", "{:.1f}"),
+        ("memoria_mb", "+MB abrir/consultar", "{:.0f}")
+    ]))
+    print(f"\n✅ Resultados guardados en: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
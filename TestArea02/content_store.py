@@ -0,0 +1,375 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class ContentStore:
+    """
+    RESPONSABILIDAD: Guardar el texto completo de los contratos fuera de Chroma
+
+    ¿Qué hace?
+    - Guarda cada texto una sola vez, identificado por su hash (sha256)
+    - Comprime con zstd (o zlib si zstandard no está instalado)
+    - Escribe todo en un único archivo empaquetado (paquete.bin) que solo crece
+    - Mantiene un índice (indice.jsonl) con el offset de cada bloque
+    - Lee con mmap y descomprime solo los bloques del rango pedido
+    - Varios procesos pueden escribir el mismo almacén: cada escritura toma
+      un lock del sistema operativo (paquete.lock), relee lo que los otros
+      agregaron al índice y escribe al final real del archivo
+
+    El texto se parte en bloques de tamano_bloque bytes antes de comprimir, así
+    leer los primeros 2000 caracteres de un contrato de 10 MB solo descomprime
+    el primer bloque.
+    """
+
+    ARCHIVO_PAQUETE = "paquete.bin"
+    ARCHIVO_INDICE = "indice.jsonl"
+    ARCHIVO_LOCK = "paquete.lock"
+
+    def __init__(self, carpeta, nivel=3, tamano_bloque=64 * 1024):
+        """
+        Args:
+            carpeta: Carpeta del almacén (se crea si no existe)
+            nivel: Nivel de compresión
+            tamano_bloque: Bytes de texto por bloque comprimido
+        """
+        os.makedirs(carpeta, exist_ok=True)
+
+        self.carpeta = carpeta
+        self.nivel = nivel
+        self.tamano_bloque = tamano_bloque
+        self.codec = "zstd" if zstandard else "zlib"
+
+        self._ruta_paquete = os.path.join(carpeta, self.ARCHIVO_PAQUETE)
+        self._ruta_indice = os.path.join(carpeta, self.ARCHIVO_INDICE)
+        self._lock = threading.Lock()
+        self._mapa = None
+
+        # Índice en memoria: contenido_id → entrada
+        self.indice = {}
+        self._leido = 0  # Bytes del índice en disco ya cargados
+        self._recargar()
+
+        self._paquete = open(self._ruta_paquete, "ab")
+        self._archivo_lock = open(os.path.join(carpeta, self.ARCHIVO_LOCK), "a+b")
+
+    def _recargar(self):
+        """Carga las entradas que otros procesos agregaron al índice desde la última lectura"""
+        if not os.path.exists(self._ruta_indice):
+            return
+
+        with open(self._ruta_indice, "rb") as f:
+            f.seek(self._leido)
+            for linea in f:
+                # Una línea sin \n es una escritura a medias (o cortada): se relee la próxima vez
+                if not linea.endswith(b"\n"):
+                    break
+                self._leido += len(linea)
+                if linea.strip():
+                    entrada = json.loads(linea)
+                    self.indice[entrada["id"]] = entrada
+
+    @contextmanager
+    def _escribiendo(self):
+        """
+        Lock entre hilos y entre procesos para agregar al paquete
+
+        Dentro del bloque el índice en memoria ya incluye lo que escribieron
+        los demás, y el final del paquete es el del archivo en disco.
+        """
+        with self._lock:
+            fd = self._archivo_lock.fileno()
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            try:
+                self._recargar()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    @staticmethod
+    def calcular_id(texto):
+        """ID de contenido: sha256 del texto en UTF-8"""
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    def _comprimir(self, datos):
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.nivel).compress(datos)
+        return zlib.compress(datos, self.nivel)
+
+    def _descomprimir(self, datos, codec):
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("Este almacén usa zstd: instala el paquete 'zstandard'")
+            return zstandard.ZstdDecompressor().decompress(datos)
+        return zlib.decompress(datos)
+
+    def guardar(self, texto):
+        """
+        Guarda un texto (si ya existe no lo vuelve a escribir)
+
+        Args:
+            texto: Texto completo
+
+        Returns:
+            str: ID de contenido
+        """
+        return self.guardar_datos(texto.encode("utf-8"))
+
+    def guardar_datos(self, datos):
+        """
+        Guarda bytes tal cual (ej: el blob de un ResultadoOCR)
+
+        El ID es el sha256 de los bytes, así un texto guardado con guardar()
+        y sus bytes UTF-8 comparten el mismo ID. Se leen con leer_bytes().
+
+        Args:
+            datos: bytes
+
+        Returns:
+            str: ID de contenido
+        """
+        contenido_id = hashlib.sha256(datos).hexdigest()
+        if contenido_id in self.indice:
+            return contenido_id
+
+        bloques = [
+            self._comprimir(datos[i:i + self.tamano_bloque])
+            for i in range(0, len(datos), self.tamano_bloque)
+        ]
+
+        with self._escribiendo():
+            if contenido_id in self.indice:
+                return contenido_id
+
+            offset = os.fstat(self._paquete.fileno()).st_size
+            for bloque in bloques:
+                self._paquete.write(bloque)
+            self._paquete.flush()
+
+            self._registrar({
+                "id": contenido_id,
+                "offset": offset,
+                "bytes": len(datos),
+                "bloques": [len(bloque) for bloque in bloques],
+                "tamano_bloque": self.tamano_bloque,
+                "codec": self.codec
+            })
+
+        return contenido_id
+
+    def guardar_stream(self, partes):
+        """
+        Guarda un texto que llega por partes, sin tenerlo entero en memoria
+
+        Calcula el hash y comprime bloque a bloque mientras lee; los bloques
+        comprimidos esperan en un archivo temporal hasta conocer el ID.
+
+        Args:
+            partes: Iterable de str (ej: segmentos de DocumentProcessor)
+
+        Returns:
+            tuple (contenido_id, bytes del texto en UTF-8)
+        """
+        hash_texto = hashlib.sha256()
+        largos = []
+        total = 0
+        pendiente = bytearray()
+
+        with tempfile.TemporaryFile(dir=self.carpeta) as temporal:
+            def volcar(bloque):
+                comprimido = self._comprimir(bloque)
+                temporal.write(comprimido)
+                largos.append(len(comprimido))
+
+            for parte in partes:
+                datos = parte.encode("utf-8")
+                hash_texto.update(datos)
+                total += len(datos)
+                pendiente += datos
+
+                # Se comprimen los bloques completos sin copiarlos y se descartan
+                # de una sola vez: queda menos de un bloque pendiente
+                completos = len(pendiente) - len(pendiente) % self.tamano_bloque
+                if completos:
+                    with memoryview(pendiente) as vista:
+                        for i in range(0, completos, self.tamano_bloque):
+                            volcar(vista[i:i + self.tamano_bloque])
+                    del pendiente[:completos]
+
+            if pendiente:
+                volcar(pendiente)
+
+            contenido_id = hash_texto.hexdigest()
+
+            with self._escribiendo():
+                if contenido_id in self.indice:
+                    return contenido_id, total
+
+                offset = os.fstat(self._paquete.fileno()).st_size
+                temporal.seek(0)
+                shutil.copyfileobj(temporal, self._paquete)
+                self._paquete.flush()
+
+                self._registrar({
+                    "id": contenido_id,
+                    "offset": offset,
+                    "bytes": total,
+                    "bloques": largos,
+                    "tamano_bloque": self.tamano_bloque,
+                    "codec": self.codec
+                })
+
+        return contenido_id, total
+
+    def guardar_segmentos(self, segmentos, largo_inicio=1000):
+        """
+        Guarda un texto que llega como segmentos y devuelve también su inicio
+        (lo que se usa para el embedding y el fragmento de Chroma)
+
+        Args:
+            segmentos: Iterable de str o de dicts con 'text' (DocumentProcessor.iter_segments)
+            largo_inicio: Caracteres del inicio que se devuelven
+
+        Returns:
+            tuple (contenido_id, inicio del texto, largo en caracteres)
+        """
+        inicio = []
+        caracteres = 0
+
+        def partes():
+            nonlocal caracteres
+            for segmento in segmentos:
+                texto = segmento["text"] if isinstance(segmento, dict) else segmento
+                if caracteres < largo_inicio:
+                    inicio.append(texto[:largo_inicio - caracteres])
+                caracteres += len(texto)
+                yield texto
+
+        contenido_id, _ = self.guardar_stream(partes())
+        return contenido_id, "".join(inicio), caracteres
+
+    def _registrar(self, entrada):
+        """Agrega una entrada al índice (en disco y en memoria); se llama dentro de _escribiendo"""
+        # El índice se escribe después de los datos: si el proceso se corta
+        # a mitad, el bloque queda huérfano pero el índice sigue consistente
+        linea = (json.dumps(entrada) + "\n").encode("utf-8")
+        with open(self._ruta_indice, "ab") as f:
+            # Restos de una línea que otro proceso no terminó de escribir
+            if f.tell() > self._leido:
+                f.truncate(self._leido)
+            f.write(linea)
+
+        self._leido += len(linea)
+        self.indice[entrada["id"]] = entrada
+
+    def _vista(self, fin):
+        """mmap de solo lectura del paquete; se vuelve a mapear si el archivo creció"""
+        with self._lock:
+            if self._mapa is None or len(self._mapa) < fin:
+                # El mapa anterior no se cierra: otro hilo puede estar leyéndolo
+                with open(self._ruta_paquete, "rb") as f:
+                    self._mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._mapa
+
+    def leer_bytes(self, contenido_id, inicio=0, fin=None):
+        """
+        Lee un rango del texto original en bytes UTF-8
+
+        Args:
+            contenido_id: ID devuelto por guardar()
+            inicio: Primer byte
+            fin: Byte final (exclusivo, None = hasta el final)
+
+        Returns:
+            bytes
+        """
+        entrada = self.indice.get(contenido_id)
+        if entrada is None:
+            # Puede haberlo escrito otro proceso después de abrir el almacén
+            with self._lock:
+                self._recargar()
+            entrada = self.indice.get(contenido_id)
+        if entrada is None:
+            raise KeyError(f"Contenido no encontrado: {contenido_id}")
+
+        fin = entrada["bytes"] if fin is None else min(fin, entrada["bytes"])
+        if inicio >= fin:
+            return b""
+
+        # Bloques que cubren [inicio, fin)
+        tamano_bloque = entrada["tamano_bloque"]
+        primero = inicio // tamano_bloque
+        ultimo = (fin - 1) // tamano_bloque
+
+        offset = entrada["offset"] + sum(entrada["bloques"][:primero])
+        final = entrada["offset"] + sum(entrada["bloques"][:ultimo + 1])
+        mapa = self._vista(final)
+
+        partes = []
+        for largo in entrada["bloques"][primero:ultimo + 1]:
+            partes.append(self._descomprimir(mapa[offset:offset + largo], entrada["codec"]))
+            offset += largo
+
+        datos = b"".join(partes)
+        base = primero * tamano_bloque
+        return datos[inicio - base:fin - base]
+
+    def leer(self, contenido_id, inicio=0, fin=None):
+        """
+        Lee un rango del texto
+
+        El rango es en bytes UTF-8; si corta un carácter multibyte, ese
+        carácter se descarta.
+
+        Returns:
+            str
+        """
+        return self.leer_bytes(contenido_id, inicio, fin).decode("utf-8", errors="ignore")
+
+    def largo(self, contenido_id):
+        """Tamaño del texto en bytes UTF-8"""
+        if contenido_id not in self:
+            raise KeyError(f"Contenido no encontrado: {contenido_id}")
+        return self.indice[contenido_id]["bytes"]
+
+    def __contains__(self, contenido_id):
+        if contenido_id not in self.indice:
+            with self._lock:
+                self._recargar()
+        return contenido_id in self.indice
+
+    def __len__(self):
+        return len(self.indice)
+
+    def cerrar(self):
+        with self._lock:
+            self._paquete.close()
+            self._archivo_lock.close()
+            if self._mapa is not None:
+                self._mapa.close()
+                self._mapa = None
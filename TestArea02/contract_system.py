@@ -1,4 +1,88 @@
+import contextlib
 import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICAS, log
+
+
+# Caracteres del inicio del contrato que lee el LLM (datos y ficha)
+LARGO_LLM = 6000
+
+# Caracteres del inicio de cada contrato en el contexto sin ficha
+LARGO_CONTEXTO = 2000
+
+# Campos extraídos que se le pasan al LLM al regenerar una ficha
+CAMPOS_CONTRATO = ("contract_type", "parties", "signature_date", "start_date", "end_date", "total_amount",
+                   "currency", "subject_matter", "key_clauses")
+
+# Palabras de las preguntas que no sirven para buscar en el texto
+_PALABRAS_VACIAS = {
+    "what", "which", "when", "where", "does", "have", "with", "that", "this", "there", "their", "from",
+    "about", "contract", "contracts", "agreement", "cual", "cuál", "cuales", "cuáles", "cuando", "cuándo",
+    "donde", "dónde", "tiene", "tienen", "este", "esta", "estos", "para", "como", "cómo", "sobre", "contrato",
+    "contratos", "entre", "hay", "qué", "quién", "quien"
+}
+
+
+def _terminos(pregunta):
+    """Palabras de la pregunta que vale la pena buscar en la ficha o en el texto"""
+    palabras = re.findall(r"\w+", pregunta.lower())
+    return list(dict.fromkeys(p for p in palabras if len(p) >= 4 and p not in _PALABRAS_VACIAS))
+
+
+def _seleccionar(resultados, indices):
+    """Resultados de una búsqueda (una consulta) con solo las posiciones pedidas"""
+    return {
+        clave: [[resultados[clave][0][i] for i in indices]]
+        for clave in ("ids", "documents", "metadatas", "distances")
+    }
+
+
+def _intercalar(listas, limite):
+    """
+    Une resultados de varias búsquedas tomando uno de cada una por turno
+
+    Cada lista conserva su orden; no se comparan distancias entre
+    colecciones distintas (no están en la misma escala).
+    """
+    indices = [(j, i) for i in range(max(len(lista['ids'][0]) for lista in listas))
+               for j, lista in enumerate(listas) if i < len(lista['ids'][0])][:limite]
+    return {
+        clave: [[listas[j][clave][0][i] for j, i in indices]]
+        for clave in ("ids", "documents", "metadatas", "distances")
+    }
+
+
+def _fragmentos(texto, terminos, largo=500, maximo=2):
+    """
+    Ventanas del texto alrededor de los términos, las que más términos juntan primero
+
+    Returns:
+        list de str (en el orden del texto, sin solaparse)
+    """
+    bajo = texto.lower()
+    candidatos = []
+    for termino in terminos:
+        posicion = bajo.find(termino)
+        apariciones = 0
+        while posicion != -1 and apariciones < 20:
+            inicio = max(0, posicion - largo // 2)
+            ventana = bajo[inicio:inicio + largo]
+            candidatos.append((sum(t in ventana for t in terminos), inicio))
+            posicion = bajo.find(termino, posicion + 1)
+            apariciones += 1
+
+    elegidos = []
+    for _, inicio in sorted(candidatos, key=lambda c: (-c[0], c[1])):
+        if all(abs(inicio - otro) >= largo for otro in elegidos):
+            elegidos.append(inicio)
+        if len(elegidos) == maximo:
+            break
+
+    return [" ".join(texto[inicio:inicio + largo].split()) for inicio in sorted(elegidos)]
 
 
 class ContractSystem:
@@ -8,11 +92,22 @@ class ContractSystem:
     ¿Qué hace?
     - Usa OCRProcessor para extraer texto
     - Usa LLMExtractor para obtener datos estructurados
+    - Al ingerir genera una ficha por contrato (resumen, partes, vigencia,
+      montos, obligaciones, penalidades) que después es el contexto de las
+      preguntas, en lugar de reenviar el texto del OCR cada vez
     - Usa DatabaseManager para guardar y buscar
     - Proporciona interfaz simple para el usuario
+
+    Los componentes se crean recién cuando se usan por primera vez: el OCR
+    al procesar un archivo, el LLM al extraer o responder, y la base al
+    listar o buscar. Así 'listar' y 'stats' arrancan sin cargar modelos.
     """
 
-    def __init__(self, db_path="./chroma_db", llm_model="mistral:7b", ocr_lang="en"):
+    def __init__(self, db_path="./chroma_db", llm_model="mistral:7b", ocr_lang="en", ocr_engine=None,
+                 llm_url="http://localhost:11434", vector_backend=None, embedding_backend=None,
+                 rerank=False, contratos_por_pregunta=3, candidatos_rerank=20, presupuesto_rerank_ms=300,
+                 llm_trabajadores=1, llm_max_cola=32, vector_particion=None, perfil=None,
+                 llm_adaptativo=None, llm_concurrencia_max=None, fichas=True):
         """
         Inicializa el sistema completo
 
@@ -20,27 +115,122 @@ class ContractSystem:
             db_path: Ruta de la base de datos
             llm_model: Modelo de Ollama a usar
             ocr_lang: Idioma para OCR
+            ocr_engine: Motor OCR ('paddle', 'tesseract', 'easyocr', 'keras');
+                        None usa la variable de entorno OCR_ENGINE
+            llm_url: URL de Ollama
+            vector_backend: 'chroma' o 'numpy' (None = variable VECTOR_BACKEND)
+            embedding_backend: 'torch', 'onnx' u 'onnx-int8' (None = variable EMBEDDING_BACKEND)
+            rerank: Reordenar los candidatos con un cross-encoder antes de armar el contexto
+            contratos_por_pregunta: Contratos que se mandan al LLM como contexto
+            candidatos_rerank: Candidatos que se traen de la base para reordenar
+            presupuesto_rerank_ms: Tiempo máximo del reordenamiento (si se pasa,
+                                   se usa el orden de la búsqueda vectorial)
+            llm_trabajadores: Llamadas simultáneas a Ollama
+            llm_max_cola: Pedidos al LLM que pueden esperar turno
+            vector_particion: Campo para particionar la base ('anio', 'contract_type');
+                              None = variable VECTOR_SHARD_KEY o sin particiones
+            perfil: Perfilador (profiler.py) para perfilar cada contrato procesado;
+                    True = todos los contratos en ./perfiles
+            llm_adaptativo: Ajustar solas las llamadas simultáneas a Ollama según
+                            tokens/s y latencia (None = variable LLM_ADAPTATIVO=1)
+            llm_concurrencia_max: Techo del ajuste adaptativo (None = variable
+                                  LLM_MAX_CONCURRENCIA o 8)
+            fichas: Generar al ingerir un resumen y una ficha de cada contrato
+                    y usarlos como contexto de las preguntas
         """
-        print("🚀 Inicializando sistema de contratos...")
-        print()
-
-        # Importar las clases
-        from ocr_processor import OCRProcessor
-        from llm_extractor import LLMExtractor
-        from database_manager import DatabaseManager
-
-        # Inicializar componentes
-        self.ocr = OCRProcessor(lang=ocr_lang)
-        self.llm = LLMExtractor(model_name=llm_model)
-        self.db = DatabaseManager(db_path=db_path)
+        log("🚀 Inicializando sistema de contratos...", evento="sistema_inicio")
+
+        # Configuración de componentes (se crean bajo demanda)
+        self.db_path = db_path
+        self.llm_model = llm_model
+        self.llm_url = llm_url
+        self.ocr_lang = ocr_lang
+        self.ocr_engine = ocr_engine
+        self.vector_backend = vector_backend
+        self.embedding_backend = embedding_backend
+        self.rerank = rerank
+        self.contratos_por_pregunta = contratos_por_pregunta
+        self.candidatos_rerank = candidatos_rerank
+        self.presupuesto_rerank_ms = presupuesto_rerank_ms
+        self.llm_trabajadores = llm_trabajadores
+        self.llm_max_cola = llm_max_cola
+        self.vector_particion = vector_particion
+        if llm_adaptativo is None:
+            llm_adaptativo = os.environ.get("LLM_ADAPTATIVO") == "1"
+        self.llm_adaptativo = llm_adaptativo
+        self.llm_concurrencia_max = llm_concurrencia_max
+        self.fichas = fichas
+
+        if perfil is True:
+            from profiler import Perfilador
+            perfil = Perfilador()
+        self.perfil = perfil
+
+        self._ocr = None
+        self._llm = None
+        self._db = None
+        self._reranker = None
+        self._lock_ocr = threading.Lock()  # El OCR va de a un archivo aunque se ingiera en paralelo
+
+        log("✅ Sistema listo para usar", evento="sistema_listo")
+
+    @property
+    def ocr(self):
+        """OCRProcessor, creado al procesar el primer archivo"""
+        if self._ocr is None:
+            with METRICAS.span("carga_ocr"):
+                from ocr_processor import OCRProcessor
+                self._ocr = OCRProcessor(lang=self.ocr_lang, engine=self.ocr_engine)
+        return self._ocr
+
+    @property
+    def llm(self):
+        """
+        LLMExtractor detrás de un LLMScheduler, creado en la primera extracción o pregunta
 
-        print()
-        print("✅ Sistema listo para usar")
-        print("=" * 60)
+        Las preguntas pasan antes que la extracción y los pedidos idénticos
+        en vuelo se responden con una sola llamada. Con llm_adaptativo, un
+        LimitadorAdaptativo decide cuántas llamadas van en paralelo.
+        """
+        if self._llm is None:
+            from llm_extractor import LLMExtractor
+            from llm_scheduler import LLMScheduler
+
+            limitador = None
+            if self.llm_adaptativo:
+                from adaptive_limiter import LimitadorAdaptativo
+                limitador = LimitadorAdaptativo(maximo=self.llm_concurrencia_max, inicial=self.llm_trabajadores)
+
+            self._llm = LLMScheduler(
+                LLMExtractor(model_name=self.llm_model, base_url=self.llm_url),
+                trabajadores=self.llm_trabajadores,
+                max_cola=self.llm_max_cola,
+                limitador=limitador
+            )
+        return self._llm
+
+    @property
+    def db(self):
+        """DatabaseManager, creado al primer acceso a la base"""
+        if self._db is None:
+            with METRICAS.span("carga_bd"):
+                from database_manager import DatabaseManager
+                self._db = DatabaseManager(db_path=self.db_path, backend=self.vector_backend,
+                                           embedding_backend=self.embedding_backend,
+                                           shard_key=self.vector_particion)
+        return self._db
+
+    @property
+    def reranker(self):
+        """Reranker (cross-encoder), creado en la primera pregunta si rerank está activo"""
+        if self._reranker is None and self.rerank:
+            from reranker import Reranker
+            self._reranker = Reranker(presupuesto_ms=self.presupuesto_rerank_ms)
+        return self._reranker
 
     def procesar_contrato(self, ruta_imagen):
         """
-        FLUJO COMPLETO: Imagen → Texto → Datos → Base de datos
+        FLUJO COMPLETO: Imagen → Texto → Datos (+ ficha) → Base de datos
 
         Args:
             ruta_imagen: Ruta al archivo de imagen
@@ -48,37 +238,117 @@ class ContractSystem:
         Returns:
             str: ID del contrato guardado
         """
-        print("\n" + "=" * 60)
-        print(f"📄 PROCESANDO CONTRATO: {ruta_imagen}")
-        print("=" * 60)
+        log(f"📄 PROCESANDO CONTRATO: {ruta_imagen}", evento="contrato_inicio", archivo=str(ruta_imagen))
+
+        perfil = contextlib.nullcontext()
+        if self.perfil is not None:
+            tamano = os.path.getsize(ruta_imagen) if os.path.isfile(ruta_imagen) else None
+            perfil = self.perfil.documento(ruta_imagen, tamano)
+
+        with perfil, METRICAS.span("procesar_contrato"):
+            # ==========================================
+            # PASO 1: OCR - Extraer texto
+            # ==========================================
+            with self._lock_ocr, METRICAS.span("ocr"):
+                resultado_ocr = self.ocr.extraer_resultado([ruta_imagen])
+            confianza = resultado_ocr.confianza
+
+            # El LLM solo lee el inicio: el texto completo no se arma, va
+            # página por página del resultado OCR al almacén de contenido
+            inicio_texto = resultado_ocr.inicio(LARGO_LLM)
+
+            # ==========================================
+            # PASO 2: LLM - Extraer datos estructurados
+            # ==========================================
+            datos_estructurados = self.llm.extract_contract_data(inicio_texto)
+
+            # ==========================================
+            # PASO 3: LLM - Ficha (el costo queda en la ingesta, no en cada pregunta)
+            # ==========================================
+            ficha, version_ficha = None, None
+            if self.fichas:
+                from llm_extractor import VERSION_FICHA
+                ficha = self.llm.generar_ficha(inicio_texto, datos_estructurados)
+                version_ficha = VERSION_FICHA
+
+            # ==========================================
+            # PASO 4: BD - Guardar todo
+            # ==========================================
+            with METRICAS.span("bd_guardar"):
+                contrato_id = self.db.guardar_contrato(
+                    archivo=ruta_imagen,
+                    texto_ocr=resultado_ocr.segmentos(),
+                    datos_estructurados=datos_estructurados,
+                    confianza_ocr=confianza,
+                    resultado_ocr=resultado_ocr,
+                    ficha=ficha,
+                    version_ficha=version_ficha
+                )
+
+        METRICAS.incrementar("contratos_procesados")
+        log(f"✅ CONTRATO PROCESADO: {contrato_id}", evento="contrato_procesado", contrato_id=contrato_id)
 
-        # ==========================================
-        # PASO 1: OCR - Extraer texto
-        # ==========================================
-        resultado_ocr = self.ocr.extraer_texto(ruta_imagen)
-        texto_completo = resultado_ocr['texto_completo']
-        confianza = resultado_ocr['confianza']
-
-        # ==========================================
-        # PASO 2: LLM - Extraer datos estructurados
-        # ==========================================
-        datos_estructurados = self.llm.extract_contract_data(texto_completo)
-
-        # ==========================================
-        # PASO 3: BD - Guardar todo
-        # ==========================================
-        contrato_id = self.db.guardar_contrato(
-            archivo=ruta_imagen,
-            texto_ocr=texto_completo,
-            datos_estructurados=datos_estructurados,
-            confianza_ocr=confianza
-        )
+        return contrato_id
 
-        print("=" * 60)
-        print(f"✅ CONTRATO PROCESADO: {contrato_id}")
-        print("=" * 60)
+    def procesar_contratos(self, rutas):
+        """
+        Ingesta en lote: mientras un archivo pasa por el OCR, las extracciones
+        de los anteriores esperan o corren en el LLM
 
-        return contrato_id
+        Cuántas extracciones corren a la vez lo decide el LLMScheduler (fijo
+        en llm_trabajadores, o adaptativo hasta llm_concurrencia_max).
+
+        Args:
+            rutas: Rutas de los archivos
+
+        Returns:
+            dict ruta → ID del contrato (o la excepción si falló)
+        """
+        # Las propiedades perezosas no son seguras entre hilos: se resuelven acá
+        llm = self.llm
+        self.db
+
+        hilos = (llm.limitador.maximo if llm.limitador is not None else self.llm_trabajadores) + 1
+        resultados = {}
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="ingesta") as pool:
+            futuros = {pool.submit(self.procesar_contrato, ruta): ruta for ruta in rutas}
+            for futuro, ruta in futuros.items():
+                try:
+                    resultados[ruta] = futuro.result()
+                except Exception as e:
+                    log(f"❌ Error procesando {ruta}: {e}", evento="contrato_error", archivo=str(ruta), error=str(e))
+                    resultados[ruta] = e
+
+        return resultados
+
+    def regenerar_fichas(self):
+        """
+        Genera las fichas que faltan o que son de otra versión del prompt
+        (contratos de antes de las fichas, o después de cambiar PROMPT_FICHA)
+
+        Returns:
+            int: Fichas generadas
+        """
+        from llm_extractor import VERSION_FICHA
+
+        llm = self.llm
+        pendientes = self.db.contratos_sin_ficha(VERSION_FICHA)
+        log(f"🗂️ {len(pendientes)} contratos sin ficha {VERSION_FICHA}", evento="fichas_pendientes",
+            pendientes=len(pendientes), version=VERSION_FICHA)
+
+        def regenerar(pendiente):
+            contrato_id, metadata, documento = pendiente
+            # Solo el inicio (en bytes UTF-8 alcanza con 4 por carácter)
+            texto = self.db.leer_texto(metadata, fin=4 * LARGO_LLM, documento=documento)[:LARGO_LLM]
+            datos = {clave: metadata[clave] for clave in CAMPOS_CONTRATO if metadata.get(clave)}
+            ficha = llm.generar_ficha(texto, datos)
+            return self.db.guardar_ficha(contrato_id, ficha, VERSION_FICHA,
+                                         archivo=metadata.get('archivo_original', ''),
+                                         contenido_id=metadata.get('contenido_id'))
+
+        hilos = llm.limitador.maximo if llm.limitador is not None else self.llm_trabajadores
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="fichas") as pool:
+            return sum(ficha_id is not None for ficha_id in pool.map(regenerar, pendientes))
 
     def responder_pregunta(self, pregunta):
         """
@@ -90,30 +360,167 @@ class ContractSystem:
         Returns:
             str: Respuesta del LLM
         """
-        print("\n" + "=" * 60)
-        print(f"❓ PREGUNTA: {pregunta}")
-        print("=" * 60)
-
-        # ==========================================
-        # PASO 1: Buscar contratos relevantes
-        # ==========================================
-        resultados = self.db.buscar_contratos(pregunta, n_results=3)
+        log(f"❓ PREGUNTA: {pregunta}", evento="pregunta")
+        METRICAS.incrementar("preguntas")
 
-        if not resultados['ids'][0]:
-            return "❌ No encontré contratos relacionados con tu pregunta."
+        with METRICAS.span("responder_pregunta"):
+            # ==========================================
+            # PASO 1 y 2: Buscar contratos y construir contexto
+            # ==========================================
+            contexto = self.preparar_contexto(pregunta)
 
-        # ==========================================
-        # PASO 2: Construir contexto
-        # ==========================================
-        contexto = self._construir_contexto(resultados)
+            if contexto is None:
+                return "❌ No encontré contratos relacionados con tu pregunta."
 
-        # ==========================================
-        # PASO 3: LLM genera respuesta
-        # ==========================================
-        respuesta = self.llm.responder_pregunta(pregunta, contexto)
+            # ==========================================
+            # PASO 3: LLM genera respuesta
+            # ==========================================
+            respuesta = self.llm.responder_pregunta(pregunta, contexto)
 
         return respuesta
 
+    def responder_pregunta_stream(self, pregunta):
+        """
+        Igual que responder_pregunta, pero la respuesta llega por partes
+
+        Args:
+            pregunta: Pregunta del usuario
+
+        Yields:
+            str: Fragmentos de la respuesta
+        """
+        log(f"❓ PREGUNTA: {pregunta}", evento="pregunta", stream=True)
+        METRICAS.incrementar("preguntas")
+
+        contexto = self.preparar_contexto(pregunta)
+
+        if contexto is None:
+            yield "❌ No encontré contratos relacionados con tu pregunta."
+            return
+
+        yield from self.llm.responder_pregunta_stream(pregunta, contexto)
+
+    def preparar_contexto(self, pregunta):
+        """
+        Busca los contratos relevantes y arma el contexto para el LLM
+
+        Con fichas, el contexto son las fichas más parecidas a la pregunta
+        y solo se leen fragmentos del texto original si la pregunta nombra
+        algo que la ficha no tiene. Si hay contratos sin ficha (la ficha
+        vino vacía, o son de antes de las fichas y todavía no se corrió
+        --regenerar-fichas) se buscan también en la colección de contratos
+        y entran con los datos extraídos y el inicio del texto.
+
+        Las dos listas se intercalan en su orden; con reranker, el
+        cross-encoder ordena la mezcla una sola vez (un solo presupuesto
+        por pregunta).
+
+        Args:
+            pregunta: Pregunta del usuario
+
+        Returns:
+            str con el contexto, o None si no hay contratos relacionados
+        """
+        if not self.fichas or not self.db.fichas.count():
+            with METRICAS.span("busqueda"):
+                resultados = self.db.buscar_contratos(
+                    pregunta,
+                    n_results=self.contratos_por_pregunta,
+                    reranker=self.reranker,
+                    candidatos=self.candidatos_rerank
+                )
+
+            if not resultados['ids'][0]:
+                METRICAS.incrementar("preguntas_sin_resultados")
+                return None
+
+            with METRICAS.span("contexto"):
+                return self._construir_contexto(resultados)
+
+        # Las búsquedas traen candidatos sin reordenar: el reranker se pasa al final sobre la mezcla
+        reranker = self.reranker
+        cantidad = max(self.contratos_por_pregunta, self.candidatos_rerank) if reranker \
+            else self.contratos_por_pregunta
+
+        with METRICAS.span("busqueda", coleccion="fichas"):
+            listas = [self.db.buscar_fichas(pregunta, n_results=cantidad)]
+
+        if self.db.hay_contratos_sin_ficha():
+            with METRICAS.span("busqueda"):
+                resultados = self.db.buscar_contratos(pregunta, n_results=cantidad)
+
+            # Del resultado directo solo cuentan los contratos que no tienen ficha
+            con_ficha = self.db.contratos_con_ficha(resultados['ids'][0])
+            listas.append(_seleccionar(resultados, [
+                i for i, doc_id in enumerate(resultados['ids'][0]) if doc_id not in con_ficha
+            ]))
+
+        candidatos = _intercalar(listas, cantidad)
+        if not candidatos['ids'][0]:
+            METRICAS.incrementar("preguntas_sin_resultados")
+            return None
+
+        if reranker:
+            candidatos = reranker.reordenar(pregunta, candidatos, self.contratos_por_pregunta)
+
+        contexto = ""
+        with METRICAS.span("contexto", fuente="fichas"):
+            for i, doc_id in enumerate(candidatos['ids'][0]):
+                uno = _seleccionar(candidatos, [i])
+                if doc_id.endswith("_ficha"):
+                    contexto += self._construir_contexto_fichas(pregunta, uno)
+                else:
+                    METRICAS.incrementar("contexto_sin_ficha")
+                    contexto += self._construir_contexto(uno)
+
+        return contexto
+
+    def _construir_contexto_fichas(self, pregunta, fichas, largo_fragmento=500, max_fragmentos=2):
+        """
+        Contexto compacto: la ficha de cada contrato, más fragmentos del
+        texto original solo para los términos de la pregunta que la ficha
+        no menciona
+
+        Args:
+            pregunta: Pregunta del usuario
+            fichas: Resultados de buscar_fichas
+            largo_fragmento: Caracteres por fragmento del texto original
+            max_fragmentos: Fragmentos por contrato como máximo
+
+        Returns:
+            str: Contexto formateado
+        """
+        contexto = ""
+        terminos = _terminos(pregunta)
+
+        for texto_ficha, metadata, distancia in zip(fichas['documents'][0], fichas['metadatas'][0],
+                                                    fichas['distances'][0]):
+            contexto += f"""
+{'=' * 60}
+CONTRACT ID: {metadata.get('contrato_id', 'N/A')}
+RELEVANCE: {1 - distancia:.2%}
+FILE: {metadata.get('archivo_original', 'N/A')}
+{'=' * 60}
+
+INDEX CARD:
+{texto_ficha}
+"""
+
+            # El texto original solo se lee si la ficha no alcanza
+            faltantes = [termino for termino in terminos if termino not in texto_ficha.lower()]
+            fragmentos = []
+            if faltantes:
+                with METRICAS.span("contenido_lectura", uso="fragmentos"):
+                    fragmentos = _fragmentos(self.db.leer_texto(metadata), faltantes, largo_fragmento,
+                                             max_fragmentos)
+
+            METRICAS.incrementar("contexto_fragmentos", len(fragmentos))
+            if fragmentos:
+                contexto += "\nRELEVANT EXCERPTS FROM THE FULL TEXT:\n"
+                contexto += "".join(f"...{fragmento}...\n" for fragmento in fragmentos)
+
+        return contexto
+
     def _construir_contexto(self, resultados):
         """
         Construye contexto rico para el LLM
@@ -133,7 +540,10 @@ class ContractSystem:
 
         for i, doc_id in enumerate(ids):
             metadata = metadatas[i]
-            texto_ocr = documentos[i]
+            # El almacén lee por bytes: 4 por carácter alcanzan en UTF-8, y leer()
+            # descarta un carácter cortado al final del rango
+            texto_ocr = self.db.leer_texto(metadata, 0, 4 * LARGO_CONTEXTO,
+                                           documento=documentos[i])[:LARGO_CONTEXTO]
             relevancia = 1 - distancias[i]
 
             # Deserializar listas JSON
@@ -160,8 +570,8 @@ STRUCTURED DATA:
 - Subject: {metadata.get('subject_matter', 'N/A')}
 - Clauses: {', '.join(key_clauses) if key_clauses else 'N/A'}
 
-FULL TEXT (first 2000 chars):
-{texto_ocr[:2000]}...
+FULL TEXT (first {LARGO_CONTEXTO} chars):
+{texto_ocr}...
 
 """
 
@@ -201,6 +611,7 @@ FULL TEXT (first 2000 chars):
         print("  - Escribe una pregunta sobre tus contratos")
         print("  - 'listar' para ver todos los contratos")
         print("  - 'stats' para ver estadísticas")
+        print("  - 'metricas' para ver tiempos por etapa (formato Prometheus)")
         print("  - 'salir' para terminar")
         print("=" * 60)
 
@@ -218,10 +629,23 @@ FULL TEXT (first 2000 chars):
                 total = self.db.contar_contratos()
                 print(f"\n📊 Total de contratos: {total}")
 
+            elif comando.lower() == 'metricas':
+                print(METRICAS.exportar_prometheus())
+
             else:
                 # Es una pregunta
                 respuesta = self.responder_pregunta(comando)
                 print("\n💬 Respuesta:")
                 print("-" * 60)
                 print(respuesta)
-                print("-" * 60)
\ No newline at end of file
+                print("-" * 60)
+
+    def exportar_metricas(self, ruta):
+        """
+        Guarda las métricas acumuladas (tiempos por etapa, contadores)
+
+        Args:
+            ruta: Archivo de salida (.json para JSON, otro para formato Prometheus)
+        """
+        METRICAS.guardar(ruta)
+        log(f"📊 Métricas guardadas en: {ruta}", evento="metricas_exportadas", ruta=ruta)
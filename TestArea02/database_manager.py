@@ -1,8 +1,15 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
 import json
+import os
 from datetime import datetime
 
+from content_store import ContentStore
+from embedding_broker import con_broker
+from embeddings import crear_embedder
+from index_export import exportar_parquet, importar_parquet
+from metrics import METRICAS, log
+from ocr_result import ResultadoOCR
+from vector_store import crear_vector_store
+
 
 class DatabaseManager:
     """
@@ -12,30 +19,77 @@ class DatabaseManager:
     - Guarda contratos con embeddings vectoriales
     - Busca contratos por similitud semántica
     - Gestiona metadata estructurada
+
+    El modelo de embeddings se carga recién al guardar o buscar;
+    listar y contar solo abren ChromaDB.
+
+    El texto completo va a un ContentStore comprimido (db_path/contenido);
+    Chroma solo guarda el fragmento que se usa para recuperar.
+
+    Las fichas de cada contrato (resumen, partes, vigencia, montos...) van a
+    su propia colección ('fichas'), con su propio embedding: se buscan
+    aparte y sirven de contexto compacto para las preguntas.
     """
 
-    def __init__(self, db_path="./chroma_db"):
+    MODELO_EMBEDDINGS = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+    # Caracteres del texto que se guardan en Chroma como documento
+    LARGO_FRAGMENTO = 1000
+
+    # Campos de la ficha, en el orden en que se escriben
+    CAMPOS_FICHA = (("summary", "SUMMARY"), ("parties", "PARTIES"), ("term", "TERM"), ("amounts", "AMOUNTS"),
+                    ("obligations", "OBLIGATIONS"), ("penalties", "PENALTIES"))
+
+    def __init__(self, db_path="./chroma_db", backend=None, embedding_backend=None, shard_key=None,
+                 embedding_broker=None):
         """
         Inicializa ChromaDB y modelo de embeddings
 
         Args:
             db_path: Ruta donde guardar la base de datos
+            backend: Backend de vectores: 'chroma' (HNSW) o 'numpy' (búsqueda
+                     exacta en memoria); None usa VECTOR_BACKEND o 'chroma'
+            embedding_backend: 'torch', 'onnx' u 'onnx-int8'; None usa
+                               EMBEDDING_BACKEND o 'torch'
+            shard_key: Particionar la colección por un campo de metadata
+                       ('anio', 'contract_type', ...); None usa VECTOR_SHARD_KEY
+                       o una sola colección
+            embedding_broker: 'local' junta en micro-lotes los vectores que
+                              piden varios hilos; 'host:puerto' usa un broker
+                              compartido sin cargar el modelo; None usa
+                              EMBEDDING_BROKER o el modelo directo
         """
-        print("💾 Inicializando base de datos...")
+        log("💾 Inicializando base de datos...", evento="bd_inicio")
 
-        # Cliente de ChromaDB
-        self.client = chromadb.PersistentClient(path=db_path)
+        # Colección para contratos (misma interfaz que una colección de Chroma)
+        self.collection = crear_vector_store(backend, db_path, nombre="contratos", particion=shard_key)
 
-        # Colección para contratos
-        self.collection = self.client.get_or_create_collection(
-            name="contratos",
-            metadata={"hnsw:space": "cosine"}
-        )
+        # Fichas (tipo="ficha"), una por contrato
+        self.fichas = crear_vector_store(backend, db_path, nombre="fichas")
 
-        # Modelo para convertir texto a vectores
-        self.embedder = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+        # Texto completo, comprimido fuera de Chroma
+        self.contenido = ContentStore(os.path.join(db_path, "contenido"))
 
-        print(f"✅ Base de datos lista en: {db_path}")
+        # Modelo para convertir texto a vectores (se carga al primer uso)
+        self.embedding_backend = embedding_backend
+        self.embedding_broker = embedding_broker
+        self._embedder = None
+
+        # contrato_id sin ninguna ficha (se arma al primer uso, ver hay_contratos_sin_ficha)
+        self._sin_ficha = None
+
+        log(f"✅ Base de datos lista en: {db_path}", evento="bd_lista", ruta=db_path)
+
+    @property
+    def embedder(self):
+        """Modelo de embeddings (torch u ONNX), cargado la primera vez que se necesita un vector"""
+        if self._embedder is None:
+            with METRICAS.span("carga_embedder", backend=self.embedding_backend):
+                self._embedder = con_broker(
+                    lambda: crear_embedder(self.embedding_backend, self.MODELO_EMBEDDINGS),
+                    self.embedding_broker
+                )
+        return self._embedder
 
     def _sanitize_metadata(self, metadata):
         """
@@ -72,20 +126,37 @@ class DatabaseManager:
 
         return sanitized
 
-    def guardar_contrato(self, archivo, texto_ocr, datos_estructurados, confianza_ocr):
+    def guardar_contrato(self, archivo, texto_ocr, datos_estructurados, confianza_ocr, resultado_ocr=None,
+                         ficha=None, version_ficha=None):
         """
         Guarda un contrato en ChromaDB
 
         Args:
             archivo: Nombre del archivo original
-            texto_ocr: Texto completo extraído por OCR
+            texto_ocr: Texto completo extraído por OCR, o un iterable de segmentos
+                       (str o dicts con 'text') para documentos grandes: se
+                       guardan sin armar el texto entero en memoria
             datos_estructurados: dict con campos extraídos por LLM
             confianza_ocr: Score de confianza del OCR (0-1)
+            resultado_ocr: ResultadoOCR con cajas y confianzas por línea; se
+                           guarda como blob en el almacén (ver leer_resultado_ocr)
+            ficha: dict de LLMExtractor.generar_ficha (se guarda con guardar_ficha)
+            version_ficha: Versión del prompt de la ficha
 
         Returns:
             str: ID del contrato guardado
         """
-        print("💾 Guardando contrato en base de datos...")
+        log("💾 Guardando contrato en base de datos...", evento="bd_guardar_inicio")
+
+        # Con segmentos, el texto va directo al almacén y solo queda el inicio
+        contenido_id = None
+        if isinstance(texto_ocr, str):
+            inicio_texto, largo_texto = texto_ocr[:self.LARGO_FRAGMENTO], len(texto_ocr)
+        else:
+            with METRICAS.span("contenido_escritura", stream=True):
+                contenido_id, inicio_texto, largo_texto = self.contenido.guardar_segmentos(
+                    texto_ocr, self.LARGO_FRAGMENTO
+                )
 
         # ==========================================
         # PASO 1: Generar embedding (vector semántico)
@@ -95,10 +166,11 @@ class DatabaseManager:
         Tipo: {datos_estructurados.get('contract_type', '')}
         Partes: {', '.join(datos_estructurados.get('parties', []))}
         Objeto: {datos_estructurados.get('subject_matter', '')}
-        Contenido: {texto_ocr[:1000]}
+        Contenido: {inicio_texto}
         """
 
-        embedding = self.embedder.encode(texto_para_embedding).tolist()
+        with METRICAS.span("embedding", uso="guardar"):
+            embedding = self.embedder.encode(texto_para_embedding).tolist()
 
         # ==========================================
         # PASO 2: Preparar metadata
@@ -115,7 +187,8 @@ class DatabaseManager:
             "subject_matter": datos_estructurados.get('subject_matter', ''),
             "parties": datos_estructurados.get('parties', []),
             "key_clauses": datos_estructurados.get('key_clauses', []),
-            "confianza_ocr": float(confianza_ocr)
+            "confianza_ocr": float(confianza_ocr),
+            "texto_length": largo_texto
         }
 
         # Sanitizar metadata
@@ -127,51 +200,349 @@ class DatabaseManager:
         doc_id = f"contrato_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
 
         # ==========================================
-        # PASO 4: Guardar en ChromaDB
+        # PASO 4: Texto completo al almacén de contenido
+        # ==========================================
+        if contenido_id is None:
+            with METRICAS.span("contenido_escritura"):
+                contenido_id = self.contenido.guardar(texto_ocr)
+        metadata_limpio["contenido_id"] = contenido_id
+
+        if resultado_ocr is not None:
+            with METRICAS.span("contenido_escritura", tipo="ocr"):
+                metadata_limpio["ocr_id"] = self.contenido.guardar_datos(resultado_ocr.a_bytes())
+
+        # ==========================================
+        # PASO 5: Guardar en ChromaDB
         # ==========================================
-        self.collection.add(
-            ids=[doc_id],
-            embeddings=[embedding],
-            documents=[texto_ocr],  # Texto completo
-            metadatas=[metadata_limpio]
-        )
-
-        print(f"✅ Contrato guardado: {doc_id}")
+        with METRICAS.span("bd_escritura"):
+            self.collection.add(
+                ids=[doc_id],
+                embeddings=[embedding],
+                documents=[inicio_texto],  # Solo el fragmento para recuperar
+                metadatas=[metadata_limpio]
+            )
+
+        METRICAS.incrementar("contratos_guardados")
+        log(f"✅ Contrato guardado: {doc_id}", evento="bd_guardado", contrato_id=doc_id)
+
+        if self._sin_ficha is not None:
+            self._sin_ficha.add(doc_id)  # guardar_ficha lo saca si la ficha no viene vacía
+
+        if ficha:
+            self.guardar_ficha(doc_id, ficha, version_ficha, archivo=archivo, contenido_id=contenido_id)
+
         return doc_id
 
-    def buscar_contratos(self, consulta, n_results=3):
+    def buscar_contratos(self, consulta, n_results=3, reranker=None, candidatos=20, where=None):
         """
         Busca contratos por similitud semántica
 
         ¿Cómo funciona?
         1. Convierte la consulta en un vector
         2. Busca los vectores más similares en la BD
-        3. Devuelve los contratos más relevantes
+        3. (Opcional) Reordena los candidatos con un cross-encoder
+        4. Devuelve los contratos más relevantes
 
         Args:
             consulta: Texto de búsqueda (ej: "contratos sobre cloud")
             n_results: Cuántos resultados devolver
+            reranker: Reranker para la segunda etapa (None = solo bi-encoder)
+            candidatos: Cuántos candidatos traer de la base si hay reranker
+            where: Filtro de metadata estilo Chroma (ej: {"anio": {"$gte": 2020}});
+                   con particiones, descarta las que no pueden cumplirlo
 
         Returns:
             dict con ids, documents, metadatas, distances
+            (y 'rerank' si se usó reranker)
         """
-        print(f"🔍 Buscando: '{consulta}'")
+        log(f"🔍 Buscando: '{consulta}'", evento="bd_busqueda_inicio")
+
+        resultados = self._buscar(self.collection, consulta, n_results, reranker, candidatos, where)
 
+        num_encontrados = len(resultados['ids'][0])
+        log(f"✅ Encontrados {num_encontrados} contratos relevantes", evento="bd_busqueda",
+            resultados=num_encontrados)
+
+        return resultados
+
+    def buscar_fichas(self, consulta, n_results=3, reranker=None, candidatos=20):
+        """
+        Busca las fichas de contratos más parecidas a la consulta
+
+        Args:
+            consulta: Texto de búsqueda
+            n_results: Cuántas fichas devolver
+            reranker: Reranker para la segunda etapa (None = solo bi-encoder)
+            candidatos: Cuántas fichas traer de la base si hay reranker
+
+        Returns:
+            dict con ids, documents (texto de la ficha), metadatas (con
+            contrato_id) y distances; vacío si todavía no hay fichas
+        """
+        if not self.fichas.count():
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+        return self._buscar(self.fichas, consulta, n_results, reranker, candidatos)
+
+    def _buscar(self, coleccion, consulta, n_results, reranker=None, candidatos=20, where=None):
+        """Embedding de la consulta → búsqueda vectorial → (opcional) cross-encoder"""
         # Convertir consulta a vector
-        query_embedding = self.embedder.encode(consulta).tolist()
+        with METRICAS.span("embedding", uso="consulta"):
+            query_embedding = self.embedder.encode(consulta).tolist()
 
         # Buscar en ChromaDB
-        resultados = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            include=["documents", "metadatas", "distances"]
-        )
-
-        num_encontrados = len(resultados['ids'][0])
-        print(f"✅ Encontrados {num_encontrados} contratos relevantes")
+        with METRICAS.span("bd_consulta"):
+            resultados = coleccion.query(
+                query_embeddings=[query_embedding],
+                n_results=max(n_results, candidatos) if reranker else n_results,
+                where=where,
+                include=["documents", "metadatas", "distances"]
+            )
+
+        # Segunda etapa: el cross-encoder elige los mejores entre los candidatos
+        if reranker and resultados['ids'][0]:
+            resultados = reranker.reordenar(consulta, resultados, n_results)
 
         return resultados
 
+    # ==========================================
+    # FICHAS
+    # ==========================================
+
+    @classmethod
+    def texto_ficha(cls, ficha):
+        """
+        Texto normalizado de una ficha (lo que se embebe y va al contexto)
+
+        Args:
+            ficha: dict de LLMExtractor.generar_ficha
+
+        Returns:
+            str
+        """
+        lineas = []
+        for clave, titulo in cls.CAMPOS_FICHA:
+            valor = ficha.get(clave)
+            if isinstance(valor, (list, tuple)):
+                items = [str(item) for item in valor if item]
+                if items:
+                    lineas.append(f"{titulo}:")
+                    lineas.extend(f"- {item}" for item in items)
+            elif valor:
+                lineas.append(f"{titulo}: {valor}")
+
+        return "\n".join(lineas)
+
+    def guardar_ficha(self, contrato_id, ficha, version, archivo="", contenido_id=None):
+        """
+        Guarda (o reemplaza) la ficha de un contrato con su propio embedding
+
+        Args:
+            contrato_id: ID devuelto por guardar_contrato
+            ficha: dict de LLMExtractor.generar_ficha
+            version: Versión del prompt que generó la ficha (VERSION_FICHA)
+            archivo: Archivo original del contrato
+            contenido_id: Texto completo en el almacén (para leer fragmentos desde la ficha)
+
+        Returns:
+            str: ID de la ficha (None si la ficha vino vacía)
+        """
+        texto = self.texto_ficha(ficha)
+        if not texto:
+            return None
+
+        with METRICAS.span("embedding", uso="ficha"):
+            embedding = self.embedder.encode(texto).tolist()
+
+        ficha_id = f"{contrato_id}_ficha"
+        with METRICAS.span("bd_escritura", tipo="ficha"):
+            self.fichas.delete([ficha_id])  # Regenerar reemplaza la anterior
+            self.fichas.add(
+                ids=[ficha_id],
+                embeddings=[embedding],
+                documents=[texto],
+                metadatas=[self._sanitize_metadata({
+                    "tipo": "ficha",
+                    "contrato_id": contrato_id,
+                    "version_prompt": version,
+                    "archivo_original": archivo,
+                    "contenido_id": contenido_id
+                })]
+            )
+
+        if self._sin_ficha is not None:
+            self._sin_ficha.discard(contrato_id)
+
+        METRICAS.incrementar("fichas_guardadas")
+        log(f"🗂️ Ficha guardada: {ficha_id}", evento="bd_ficha", contrato_id=contrato_id, version=version)
+        return ficha_id
+
+    def contratos_sin_ficha(self, version):
+        """
+        Contratos sin ficha o con una ficha de otra versión del prompt
+
+        Args:
+            version: Versión actual (VERSION_FICHA)
+
+        Returns:
+            list de (contrato_id, metadata, documento) de cada contrato
+        """
+        actuales = set()
+        for pagina in self.fichas.iterar(include=("metadatas",)):
+            actuales.update(metadata["contrato_id"] for metadata in pagina["metadatas"]
+                            if metadata.get("version_prompt") == version)
+
+        pendientes = []
+        for pagina in self.collection.iterar(include=("metadatas", "documents")):
+            pendientes.extend(
+                fila for fila in zip(pagina["ids"], pagina["metadatas"], pagina["documents"])
+                if fila[0] not in actuales
+            )
+        return pendientes
+
+    def hay_contratos_sin_ficha(self):
+        """
+        Si algún contrato no tiene ficha (de ninguna versión)
+
+        La primera vez recorre las dos colecciones; después el conjunto se
+        mantiene con guardar_contrato y guardar_ficha (importar lo vuelve a armar).
+
+        Returns:
+            bool
+        """
+        if self._sin_ficha is None:
+            con_ficha = set()
+            for pagina in self.fichas.iterar(include=("metadatas",)):
+                con_ficha.update(metadata["contrato_id"] for metadata in pagina["metadatas"])
+
+            sin_ficha = set()
+            for pagina in self.collection.iterar(include=()):
+                sin_ficha.update(contrato_id for contrato_id in pagina["ids"] if contrato_id not in con_ficha)
+            self._sin_ficha = sin_ficha
+
+        return bool(self._sin_ficha)
+
+    def contratos_con_ficha(self, contrato_ids):
+        """
+        Cuáles de estos contratos tienen ficha (de cualquier versión)
+
+        Args:
+            contrato_ids: IDs devueltos por guardar_contrato
+
+        Returns:
+            set de contrato_id
+        """
+        if not contrato_ids:
+            return set()
+
+        ficha_ids = self.fichas.get(ids=[f"{contrato_id}_ficha" for contrato_id in contrato_ids], include=[])["ids"]
+        return {ficha_id[:-len("_ficha")] for ficha_id in ficha_ids}
+
+    def leer_texto(self, metadata, inicio=0, fin=None, documento=None):
+        """
+        Lee el texto completo (o un rango) de un contrato desde el almacén
+
+        Args:
+            metadata: Metadata del contrato (con contenido_id)
+            inicio: Primer byte del rango
+            fin: Byte final (None = hasta el final)
+            documento: Documento de Chroma, para contratos guardados antes
+                       del almacén de contenido
+
+        Returns:
+            str: Texto del rango pedido
+        """
+        contenido_id = metadata.get('contenido_id')
+        if contenido_id and contenido_id in self.contenido:
+            with METRICAS.span("contenido_lectura"):
+                return self.contenido.leer(contenido_id, inicio, fin)
+
+        return (documento or '')[inicio:fin]
+
+    def leer_resultado_ocr(self, metadata):
+        """
+        Lee el ResultadoOCR guardado con un contrato
+
+        Args:
+            metadata: Metadata del contrato (con ocr_id)
+
+        Returns:
+            ResultadoOCR, o None si el contrato se guardó sin él
+        """
+        ocr_id = metadata.get('ocr_id')
+        if not ocr_id or ocr_id not in self.contenido:
+            return None
+
+        with METRICAS.span("contenido_lectura", tipo="ocr"):
+            return ResultadoOCR.desde_bytes(self.contenido.leer_bytes(ocr_id))
+
+    @staticmethod
+    def ruta_fichas(ruta):
+        """Archivo de las fichas que acompaña a una exportación (indice.parquet → indice.fichas.parquet)"""
+        base, extension = os.path.splitext(ruta)
+        return f"{base}.fichas{extension or '.parquet'}"
+
+    def exportar(self, ruta, filas_por_grupo=1000, incluir_texto=True):
+        """
+        Exporta ids, vectores, metadata y textos a Parquet (por grupos de filas)
+
+        Las fichas van a un segundo archivo al lado (ver ruta_fichas), con
+        sus propios vectores: al importar no hay que regenerarlas con el LLM.
+
+        Args:
+            ruta: Archivo .parquet de salida
+            filas_por_grupo: Filas por row group
+            incluir_texto: Incluir el texto completo y el resultado OCR del almacén de contenido
+
+        Returns:
+            int: Filas exportadas
+        """
+        with METRICAS.span("exportar_indice"):
+            filas = exportar_parquet(self.collection, self.contenido, ruta, filas_por_grupo=filas_por_grupo,
+                                     incluir_texto=incluir_texto, modelo=self.MODELO_EMBEDDINGS,
+                                     dim=lambda: len(self.embedder.encode("contrato")))
+
+            # La ficha es su propio documento; su contenido_id apunta al texto del contrato
+            fichas = 0
+            if self.fichas.count():
+                fichas = exportar_parquet(self.fichas, None, self.ruta_fichas(ruta), filas_por_grupo=filas_por_grupo,
+                                          incluir_texto=False, modelo=self.MODELO_EMBEDDINGS)
+
+        log(f"📦 {filas} contratos y {fichas} fichas exportados a {ruta}", evento="bd_exportar", filas=filas,
+            fichas=fichas, ruta=ruta)
+        return filas
+
+    def importar(self, ruta, filas_por_lote=1000):
+        """
+        Importa un archivo de exportar() sin recalcular embeddings
+
+        Si está el archivo de fichas que lo acompaña (ver ruta_fichas), las
+        fichas se importan también.
+
+        Args:
+            ruta: Archivo .parquet
+            filas_por_lote: Filas por escritura en la base
+
+        Returns:
+            dict con importadas y omitidas (ids que ya existían), y fichas importadas
+
+        Raises:
+            ValueError: El archivo es de otro modelo de embeddings o de otra dimensión
+        """
+        with METRICAS.span("importar_indice"):
+            resultado = importar_parquet(ruta, self.collection, self.contenido, filas_por_lote=filas_por_lote,
+                                         modelo=self.MODELO_EMBEDDINGS)
+
+            self._sin_ficha = None
+            resultado["fichas"] = 0
+            if os.path.exists(self.ruta_fichas(ruta)):
+                resultado["fichas"] = importar_parquet(self.ruta_fichas(ruta), self.fichas, None,
+                                                       filas_por_lote=filas_por_lote,
+                                                       modelo=self.MODELO_EMBEDDINGS)["importadas"]
+
+        log(f"📦 {resultado['importadas']} contratos importados desde {ruta}", evento="bd_importar", **resultado)
+        return resultado
+
     def listar_todos(self):
         """
         Lista todos los contratos en la base de datos
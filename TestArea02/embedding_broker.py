@@ -0,0 +1,459 @@
+"""
+Broker de embeddings: junta los pedidos de varios hilos (o procesos) en micro-lotes
+
+Uso (servidor compartido, un solo modelo en memoria):
+    export EMBEDDING_BROKER_KEY=<secreto>
+    python embedding_broker.py --direccion 127.0.0.1:8765 --backend onnx
+
+Los procesos que definan EMBEDDING_BROKER=127.0.0.1:8765 (y la misma
+EMBEDDING_BROKER_KEY) usan ese servidor en lugar de cargar su propio modelo;
+EMBEDDING_BROKER=local junta en lotes solo los pedidos de los hilos del
+mismo proceso.
+
+Los mensajes viajan con pickle: quien pasa la autenticación puede ejecutar
+código en el broker. Por eso no hay clave por defecto y solo se escucha en
+loopback o en un socket Unix.
+"""
+import argparse
+import ipaddress
+import itertools
+import os
+import secrets
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturoTimeout
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+
+VARIABLE_CLAVE = "EMBEDDING_BROKER_KEY"
+
+
+class _Pedido:
+    """Textos de un llamador esperando su lote"""
+
+    def __init__(self, textos, un_texto):
+        self.textos = textos
+        self.un_texto = un_texto
+        self.futuro = Future()
+        self.llegada = time.monotonic()
+
+
+class EmbeddingBroker:
+    """
+    RESPONSABILIDAD: Compartir un modelo de embeddings entre llamadores concurrentes
+
+    ¿Qué hace?
+    - Cada llamador envía sus textos y recibe un Future
+    - Un hilo junta los pedidos hasta max_lote textos o hasta que el más
+      viejo esperó espera_ms, y hace un único encode para todos
+    - Reparte los vectores a cada Future
+    - Con servir() atiende también a otros procesos por un socket local
+      (ClienteEmbeddings), así hay una sola copia del modelo
+
+    Tiene la misma interfaz encode() que los embedders: se puede usar donde
+    se usaba el modelo directamente.
+    """
+
+    def __init__(self, embedder, max_lote=32, espera_ms=5):
+        """
+        Args:
+            embedder: Objeto con encode(textos, batch_size) (ver embeddings.crear_embedder)
+            max_lote: Textos por encode como máximo
+            espera_ms: Cuánto puede esperar un pedido a que se llene el lote
+        """
+        self.embedder = embedder
+        self.nombre = getattr(embedder, "nombre", "embedder")
+        self.max_lote = max_lote
+        self.espera = espera_ms / 1000
+
+        self._cola = deque()
+        self._textos_en_cola = 0
+        self._condicion = threading.Condition()
+        self._cerrado = False
+
+        # Estadísticas (para benchmarks y el informe de arranque)
+        self.lotes = 0
+        self.textos = 0
+
+        self._hilo = threading.Thread(target=self._trabajar, name="embeddings-lotes", daemon=True)
+        self._hilo.start()
+        self._listener = None
+
+    # ==========================================
+    # INTERFAZ DE LOS EMBEDDERS
+    # ==========================================
+
+    def encode(self, textos, batch_size=None):
+        """Igual que embedder.encode, pasando por los micro-lotes"""
+        return self.enviar(textos).result()
+
+    def enviar(self, textos):
+        """
+        Encola textos para el próximo lote
+
+        Args:
+            textos: str o lista de str
+
+        Returns:
+            Future con np.ndarray (1D para un str, 2D para una lista)
+        """
+        un_texto = isinstance(textos, str)
+        pedido = _Pedido([textos] if un_texto else list(textos), un_texto)
+
+        if not pedido.textos:
+            pedido.futuro.set_result(np.zeros((0, 0), dtype=np.float32))
+            return pedido.futuro
+
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El broker de embeddings está cerrado")
+            self._cola.append(pedido)
+            self._textos_en_cola += len(pedido.textos)
+            self._condicion.notify()
+
+        return pedido.futuro
+
+    # ==========================================
+    # LOTES
+    # ==========================================
+
+    def _juntar(self):
+        """Espera un lote lleno (o vencido) y lo saca de la cola (None si se cerró)"""
+        with self._condicion:
+            while not self._cola:
+                if self._cerrado:
+                    return None
+                self._condicion.wait()
+
+            # El lote sale cuando se llena o cuando el pedido más viejo cumplió su espera
+            limite = self._cola[0].llegada + self.espera
+            while self._textos_en_cola < self.max_lote and not self._cerrado:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._condicion.wait(restante)
+
+            # Un pedido más grande que max_lote va solo (el embedder lo parte)
+            lote = [self._cola.popleft()]
+            cantidad = len(lote[0].textos)
+            while self._cola and cantidad + len(self._cola[0].textos) <= self.max_lote:
+                pedido = self._cola.popleft()
+                lote.append(pedido)
+                cantidad += len(pedido.textos)
+            self._textos_en_cola -= cantidad
+
+        return lote
+
+    def _trabajar(self):
+        while True:
+            lote = self._juntar()
+            if lote is None:
+                return
+
+            # Los pedidos cancelados mientras esperaban no se calculan
+            lote = [pedido for pedido in lote if pedido.futuro.set_running_or_notify_cancel()]
+            if not lote:
+                continue
+
+            textos = [texto for pedido in lote for texto in pedido.textos]
+            try:
+                vectores = np.asarray(self.embedder.encode(textos, batch_size=max(len(textos), 1)))
+            except Exception as e:
+                for pedido in lote:
+                    pedido.futuro.set_exception(e)
+                continue
+
+            self.lotes += 1
+            self.textos += len(textos)
+
+            inicio = 0
+            for pedido in lote:
+                fin = inicio + len(pedido.textos)
+                pedido.futuro.set_result(vectores[inicio] if pedido.un_texto else vectores[inicio:fin])
+                inicio = fin
+
+    # ==========================================
+    # SERVIDOR PARA OTROS PROCESOS
+    # ==========================================
+
+    def servir(self, direccion, clave=None):
+        """
+        Atiende pedidos de otros procesos (ClienteEmbeddings) en segundo plano
+
+        Sin clave (ni EMBEDDING_BROKER_KEY) se genera una al azar y se deja
+        en EMBEDDING_BROKER_KEY, así la heredan los procesos hijos.
+
+        Args:
+            direccion: "host:puerto" en loopback o ruta de un socket Unix
+            clave: Clave de autenticación compartida con los clientes (str o bytes)
+
+        Returns:
+            Dirección real donde escucha (útil con puerto 0)
+
+        Raises:
+            ValueError: Si la dirección no es loopback
+        """
+        direccion = _parsear_direccion(direccion)
+
+        if clave is None and not os.environ.get(VARIABLE_CLAVE):
+            os.environ[VARIABLE_CLAVE] = secrets.token_hex(32)
+            print(f"🔑 Sin {VARIABLE_CLAVE}: se generó una clave para este proceso y sus hijos")
+        self._listener = Listener(direccion, authkey=_clave(clave))
+        if isinstance(direccion, str):
+            # El socket Unix queda solo para el usuario dueño del broker
+            os.chmod(direccion, 0o600)
+        threading.Thread(target=self._aceptar, name="embeddings-servidor", daemon=True).start()
+
+        real = self._listener.address
+        texto = f"{real[0]}:{real[1]}" if isinstance(real, tuple) else real
+        print(f"📡 Broker de embeddings escuchando en {texto}")
+        return texto
+
+    def _aceptar(self):
+        while True:
+            try:
+                conexion = self._listener.accept()
+            except (OSError, EOFError):
+                return  # Listener cerrado
+            except Exception as e:
+                print(f"⚠️ Conexión rechazada: {e}")
+                continue
+            threading.Thread(target=self._atender, args=(conexion,), name="embeddings-cliente", daemon=True).start()
+
+    def _atender(self, conexion):
+        """Un cliente puede tener varios pedidos en vuelo; cada respuesta lleva su número"""
+        envio = threading.Lock()
+
+        def responder(numero, futuro):
+            try:
+                mensaje = (numero, futuro.result(), None)
+            except Exception as e:
+                mensaje = (numero, None, f"{type(e).__name__}: {e}")
+            try:
+                with envio:
+                    conexion.send(mensaje)
+            except OSError:
+                pass  # El cliente se fue
+
+        with conexion:
+            while True:
+                try:
+                    numero, textos = conexion.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    futuro = self.enviar(textos)
+                except Exception as e:
+                    futuro = Future()
+                    futuro.set_exception(e)
+                futuro.add_done_callback(lambda f, n=numero: responder(n, f))
+
+    def cerrar(self):
+        """Termina los pedidos en cola y detiene el hilo (y el servidor)"""
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+        self._hilo.join()
+        if self._listener is not None:
+            self._listener.close()
+
+
+class ClienteEmbeddings:
+    """
+    Embedder que le pide los vectores a un EmbeddingBroker de otro proceso
+
+    Es seguro entre hilos: los pedidos de varios hilos viajan por la misma
+    conexión y el broker los junta en sus lotes.
+    """
+
+    nombre = "broker"
+
+    def __init__(self, direccion, clave=None, timeout=60):
+        """
+        Args:
+            direccion: "host:puerto" en loopback o ruta del socket Unix del broker
+            clave: Clave de autenticación del broker (None = EMBEDDING_BROKER_KEY)
+            timeout: Segundos máximos esperando un vector
+
+        Raises:
+            ValueError: Si no hay clave o la dirección no es loopback
+        """
+        self.direccion = direccion
+        self.clave = _clave(clave)
+        _parsear_direccion(direccion)
+        self.timeout = timeout
+
+        self._numeros = itertools.count()
+        self._pendientes = {}  # número → (conexión por la que salió, Future)
+        self._lock = threading.Lock()
+        self._conexion = None
+
+    def _conectar(self):
+        """Conexión abierta (se reconecta si el broker se reinició); se llama con el lock tomado"""
+        if self._conexion is None:
+            self._conexion = Client(_parsear_direccion(self.direccion), authkey=self.clave)
+            threading.Thread(target=self._leer, args=(self._conexion,), name="embeddings-respuestas",
+                             daemon=True).start()
+        return self._conexion
+
+    def _leer(self, conexion):
+        while True:
+            try:
+                numero, vectores, error = conexion.recv()
+            except (EOFError, OSError, TypeError):  # TypeError: cerrar() desde otro hilo
+                break
+
+            with self._lock:
+                _, futuro = self._pendientes.pop(numero, (None, None))
+            if futuro is None:
+                continue  # Ya venció del lado del llamador
+            if error is not None:
+                futuro.set_exception(RuntimeError(f"Broker de embeddings: {error}"))
+            else:
+                futuro.set_result(vectores)
+
+        # Conexión perdida: fallan los pedidos que salieron por ella (no los de
+        # una conexión nueva) y el próximo pedido reconecta
+        with self._lock:
+            if self._conexion is conexion:
+                self._conexion = None
+            perdidos = [numero for numero, (origen, _) in self._pendientes.items() if origen is conexion]
+            pendientes = [self._pendientes.pop(numero)[1] for numero in perdidos]
+        for futuro in pendientes:
+            futuro.set_exception(ConnectionError(f"Se perdió la conexión con el broker en {self.direccion}"))
+
+    def enviar(self, textos):
+        """Igual que EmbeddingBroker.enviar, a través del socket"""
+        return self._enviar(textos)[1]
+
+    def _enviar(self, textos):
+        """Manda un pedido; devuelve (número, Future)"""
+        futuro = Future()
+        with self._lock:
+            conexion = self._conectar()
+            numero = next(self._numeros)
+            self._pendientes[numero] = (conexion, futuro)
+            try:
+                conexion.send((numero, textos))
+            except OSError:
+                self._pendientes.pop(numero, None)
+                self._conexion = None
+                raise
+        return numero, futuro
+
+    def encode(self, textos, batch_size=None):
+        """Misma interfaz que los embedders locales"""
+        numero, futuro = self._enviar(textos)
+        try:
+            return futuro.result(timeout=self.timeout)
+        except FuturoTimeout:
+            # La respuesta que llegue tarde se descarta en _leer
+            with self._lock:
+                self._pendientes.pop(numero, None)
+            raise
+
+    def cerrar(self):
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
+
+
+def _clave(clave):
+    """Clave explícita o la de EMBEDDING_BROKER_KEY, en bytes (no hay clave por defecto)"""
+    clave = clave or os.environ.get(VARIABLE_CLAVE)
+    if not clave:
+        raise ValueError(f"El broker de embeddings necesita una clave: define {VARIABLE_CLAVE}")
+    return clave.encode("utf-8") if isinstance(clave, str) else clave
+
+
+def _parsear_direccion(direccion):
+    """
+    'host:puerto' → tupla para TCP; cualquier otra cosa es la ruta de un socket Unix
+
+    Raises:
+        ValueError: Si el host TCP no resuelve solo a direcciones de loopback
+    """
+    if isinstance(direccion, tuple):
+        host, puerto = direccion
+    else:
+        host, separador, puerto = direccion.rpartition(":")
+        if not (separador and puerto.isdigit()):
+            return direccion
+        host, puerto = host.strip("[]") or "127.0.0.1", int(puerto)
+
+    try:
+        resueltas = {info[4][0] for info in socket.getaddrinfo(host, puerto, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror as e:
+        raise ValueError(f"No se pudo resolver el host del broker '{host}': {e}")
+    if not all(ipaddress.ip_address(ip.split("%")[0]).is_loopback for ip in resueltas):
+        raise ValueError(f"El broker de embeddings solo escucha en loopback o en un socket Unix, no en '{host}'")
+    return host, puerto
+
+
+def con_broker(crear, broker=None, max_lote=32, espera_ms=5):
+    """
+    Embedder según el modo de broker
+
+    Args:
+        crear: Función sin argumentos que carga el embedder local
+        broker: None usa EMBEDDING_BROKER; '' = modelo directo, 'local' =
+                micro-lotes entre los hilos de este proceso, otra cosa =
+                dirección de un broker compartido (no carga el modelo)
+        max_lote, espera_ms: Opciones del broker local
+
+    Returns:
+        Objeto con encode(textos, batch_size)
+    """
+    broker = os.environ.get("EMBEDDING_BROKER", "") if broker is None else broker
+
+    if not broker:
+        return crear()
+    if broker == "local":
+        return EmbeddingBroker(crear(), max_lote=max_lote, espera_ms=espera_ms)
+    return ClienteEmbeddings(broker)
+
+
+def main():
+    from embeddings import BACKENDS, MODELO_DEFAULT, crear_embedder
+
+    parser = argparse.ArgumentParser(description="Servidor de embeddings compartido entre procesos")
+    parser.add_argument("--direccion", default="127.0.0.1:8765",
+                        help="host:puerto en loopback o ruta de socket Unix")
+    parser.add_argument("--backend", choices=BACKENDS, default=None)
+    parser.add_argument("--modelo", default=MODELO_DEFAULT)
+    parser.add_argument("--max-lote", type=int, default=32)
+    parser.add_argument("--espera-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    # Los clientes son otros procesos: tienen que conocer la clave de antemano
+    if not os.environ.get(VARIABLE_CLAVE):
+        parser.error(f"define {VARIABLE_CLAVE} con la clave compartida con los clientes")
+    try:
+        _parsear_direccion(args.direccion)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("🧠 Cargando modelo de embeddings...")
+    broker = EmbeddingBroker(crear_embedder(args.backend, args.modelo), max_lote=args.max_lote,
+                             espera_ms=args.espera_ms)
+    broker.servir(args.direccion)
+
+    try:
+        while True:
+            time.sleep(60)
+            if broker.lotes:
+                print(f"📊 {broker.textos} textos en {broker.lotes} lotes "
+                      f"({broker.textos / broker.lotes:.1f} por lote)")
+    except KeyboardInterrupt:
+        print("\n👋 Cerrando broker")
+        broker.cerrar()
+
+
+if __name__ == "__main__":
+    main()
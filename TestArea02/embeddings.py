@@ -0,0 +1,190 @@
+import os
+
+import numpy as np
+
+
+MODELO_DEFAULT = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# Carpeta donde se guardan los modelos exportados a ONNX
+CARPETA_ONNX = os.environ.get("EMBEDDING_ONNX_DIR", os.path.join(os.path.expanduser("~"), ".cache", "contratos_onnx"))
+
+
+class SentenceTransformerEmbedder:
+    """Backend original: SentenceTransformer sobre PyTorch"""
+
+    nombre = "torch"
+
+    def __init__(self, modelo=MODELO_DEFAULT):
+        from sentence_transformers import SentenceTransformer
+
+        self.modelo = SentenceTransformer(modelo)
+
+    def encode(self, textos, batch_size=32):
+        """
+        Convierte texto(s) en vector(es)
+
+        Args:
+            textos: str o lista de str
+            batch_size: Textos por lote
+
+        Returns:
+            np.ndarray (1D para un str, 2D para una lista)
+        """
+        return self.modelo.encode(textos, batch_size=batch_size)
+
+
+class OnnxEmbedder:
+    """
+    RESPONSABILIDAD: Embeddings en CPU con ONNX Runtime, sin cargar PyTorch
+
+    ¿Qué hace?
+    - La primera vez exporta el modelo de Hugging Face a ONNX (esto sí usa torch)
+    - Opcionalmente lo cuantiza a int8 (cuantización dinámica de pesos)
+    - Tokeniza con la librería 'tokenizers' y promedia los tokens (mean pooling),
+      igual que SentenceTransformer para este modelo
+    """
+
+    nombre = "onnx"
+
+    def __init__(self, modelo=MODELO_DEFAULT, cuantizar=False, carpeta=CARPETA_ONNX, max_tokens=128, hilos=None):
+        """
+        Args:
+            modelo: Nombre del modelo de sentence-transformers
+            cuantizar: Usar la versión int8
+            carpeta: Carpeta de caché de los modelos exportados
+            max_tokens: Largo máximo de secuencia (128 en MiniLM-L12)
+            hilos: Hilos de ONNX Runtime (None = los que elija ONNX Runtime)
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.carpeta = os.path.join(carpeta, modelo.replace("/", "__"))
+        ruta_modelo = exportar_onnx(modelo, self.carpeta)
+        if cuantizar:
+            ruta_modelo = cuantizar_onnx(ruta_modelo)
+            self.nombre = "onnx-int8"
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.carpeta, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        self.tokenizer.enable_padding()
+
+        opciones = onnxruntime.SessionOptions()
+        opciones.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if hilos:
+            opciones.intra_op_num_threads = hilos
+
+        self.sesion = onnxruntime.InferenceSession(ruta_modelo, opciones, providers=["CPUExecutionProvider"])
+        self.entradas = {entrada.name for entrada in self.sesion.get_inputs()}
+
+    def encode(self, textos, batch_size=32):
+        """Misma interfaz que SentenceTransformer.encode"""
+        un_texto = isinstance(textos, str)
+        if un_texto:
+            textos = [textos]
+
+        vectores = []
+        for inicio in range(0, len(textos), batch_size):
+            codificados = self.tokenizer.encode_batch(textos[inicio:inicio + batch_size])
+            ids = np.array([c.ids for c in codificados], dtype=np.int64)
+            mascara = np.array([c.attention_mask for c in codificados], dtype=np.int64)
+
+            alimentacion = {"input_ids": ids, "attention_mask": mascara}
+            if "token_type_ids" in self.entradas:
+                alimentacion["token_type_ids"] = np.zeros_like(ids)
+
+            tokens = self.sesion.run(None, alimentacion)[0]
+
+            # Mean pooling sobre los tokens reales (sin padding)
+            peso = mascara[:, :, None].astype(np.float32)
+            vectores.append((tokens * peso).sum(axis=1) / np.maximum(peso.sum(axis=1), 1e-9))
+
+        resultado = np.concatenate(vectores) if vectores else np.zeros((0, 0), dtype=np.float32)
+        return resultado[0] if un_texto else resultado
+
+
+def exportar_onnx(modelo, carpeta):
+    """
+    Exporta el transformer del modelo a ONNX (solo la primera vez)
+
+    Returns:
+        str: Ruta del model.onnx
+    """
+    ruta = os.path.join(carpeta, "model.onnx")
+    if os.path.exists(ruta):
+        return ruta
+
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    print(f"📦 Exportando {modelo} a ONNX (solo la primera vez)...")
+    os.makedirs(carpeta, exist_ok=True)
+
+    nombre_hf = modelo if "/" in modelo else f"sentence-transformers/{modelo}"
+    tokenizer = AutoTokenizer.from_pretrained(nombre_hf)
+    transformer = AutoModel.from_pretrained(nombre_hf).eval()
+    tokenizer.save_pretrained(carpeta)
+
+    ejemplo = tokenizer(["contrato de ejemplo"], return_tensors="pt")
+    nombres = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in ejemplo]
+    ejes = {n: {0: "lote", 1: "secuencia"} for n in nombres}
+    ejes["last_hidden_state"] = {0: "lote", 1: "secuencia"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(ejemplo[n] for n in nombres),
+            ruta + ".tmp",
+            input_names=nombres,
+            output_names=["last_hidden_state"],
+            dynamic_axes=ejes,
+            opset_version=14
+        )
+    os.replace(ruta + ".tmp", ruta)
+
+    return ruta
+
+
+def cuantizar_onnx(ruta):
+    """
+    Cuantización dinámica a int8 de los pesos (solo la primera vez)
+
+    Returns:
+        str: Ruta del model.int8.onnx
+    """
+    destino = ruta.replace(".onnx", ".int8.onnx")
+    if not os.path.exists(destino):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print("📦 Cuantizando modelo a int8...")
+        quantize_dynamic(ruta, destino + ".tmp", weight_type=QuantType.QInt8)
+        os.replace(destino + ".tmp", destino)
+
+    return destino
+
+
+# Backends disponibles por nombre
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def crear_embedder(backend=None, modelo=MODELO_DEFAULT, **kwargs):
+    """
+    Crea el backend de embeddings
+
+    Args:
+        backend: 'torch', 'onnx' u 'onnx-int8' (None = variable EMBEDDING_BACKEND o 'torch')
+        modelo: Nombre del modelo
+        **kwargs: Opciones de OnnxEmbedder (carpeta, hilos, max_tokens)
+
+    Returns:
+        Objeto con encode(textos, batch_size)
+    """
+    backend = backend or os.environ.get("EMBEDDING_BACKEND", "torch")
+
+    if backend == "torch":
+        return SentenceTransformerEmbedder(modelo)
+    if backend == "onnx":
+        return OnnxEmbedder(modelo, **kwargs)
+    if backend == "onnx-int8":
+        return OnnxEmbedder(modelo, cuantizar=True, **kwargs)
+
+    raise ValueError(f"Backend de embeddings no soportado: {backend} (opciones: {', '.join(BACKENDS)})")
@@ -0,0 +1,387 @@
+"""
+Evaluación de la extracción con LLM: precisión contra latencia
+
+Uso:
+    python eval_extraction.py --fake --docs 50
+    python eval_extraction.py --corpus ./corpus --config llm:mistral:7b --config es:mistral:7b
+    python eval_extraction.py --corpus ./corpus --config llm:llama3:8b --concurrencia 4 --por-campo
+
+Corre una o más configuraciones de extractor sobre un corpus con datos reales
+(contrato.txt + contrato.json, como los de synthetic_corpus.py) y reporta en
+una sola tabla: precisión y recall por campo, acierto exacto de fechas y
+montos, tokens de entrada y salida, y percentiles de latencia.
+
+Configuraciones (--config TIPO[:MODELO]):
+    llm   LLMExtractor (prompt en inglés, /api/generate)
+    es    ContractExtractor de TestArea (prompt en español, /api/chat)
+
+Con --fake todo corre contra fake_ollama.py, sin red ni modelo.
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmark_utils import formatear_tabla, guardar_json, info_maquina, percentil
+from metrics import METRICAS
+from synthetic_corpus import cargar_corpus, generar_corpus
+
+
+CAMPOS_FECHA = ["signature_date", "start_date", "end_date"]
+CAMPOS_LISTA = ["parties", "key_clauses"]
+CAMPOS = ["contract_type", "parties"] + CAMPOS_FECHA + ["total_amount", "currency", "subject_matter",
+                                                        "key_clauses", "penalties"]
+
+# Campos de texto libre: se aceptan con solapamiento de palabras (el LLM resume)
+CAMPOS_LIBRES = {"subject_matter", "penalties"}
+
+MODELO_DEFAULT = "mistral:7b"
+
+
+# ==========================================
+# EXTRACTORES
+# ==========================================
+
+def crear_extractor(config, url):
+    """
+    Crea el extractor de una configuración
+
+    Args:
+        config: 'llm' o 'es', opcionalmente con ':modelo' (ej: 'llm:llama3:8b')
+        url: URL de Ollama
+
+    Returns:
+        Objeto con extract_contract_data(texto)
+    """
+    tipo, _, modelo = config.partition(":")
+    modelo = modelo or MODELO_DEFAULT
+
+    if tipo == "llm":
+        from llm_extractor import LLMExtractor
+        return LLMExtractor(model_name=modelo, base_url=url)
+
+    if tipo == "es":
+        # TestArea es un paquete hermano: se importa desde la raíz del repo
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if raiz not in sys.path:
+            sys.path.insert(0, raiz)
+        from TestArea.ContractExtractor import ContractExtractor
+        return ContractExtractor(model_name=modelo, host=url)
+
+    raise ValueError(f"Configuración desconocida: {config} (tipos: llm, es)")
+
+
+def _tokens(extractor):
+    """Tokens (entrada, salida) usados hasta ahora por un extractor"""
+    if hasattr(extractor, "tokens"):
+        return extractor.tokens["entrada"], extractor.tokens["salida"]
+
+    # LLMExtractor los cuenta en las métricas globales
+    contadores = METRICAS.contadores
+    return (contadores.get(("tokens", (("tipo", "entrada"),)), 0),
+            contadores.get(("tokens", (("tipo", "salida"),)), 0))
+
+
+# ==========================================
+# COMPARACIÓN CON LOS DATOS REALES
+# ==========================================
+
+def _normalizar_texto(valor):
+    texto = unicodedata.normalize("NFKD", str(valor)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^\w\s]", " ", texto.lower()).split())
+
+
+def _normalizar_fecha(valor):
+    texto = str(valor).strip()
+    for formato in ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%B %d, %Y", "%d %B %Y"):
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            continue
+    return texto
+
+
+def _normalizar_monto(valor):
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = re.sub(r"[^\d.,-]", "", str(valor))
+    # 1.234.567,89 → 1234567.89 ; 1,234,567.89 → 1234567.89
+    if "," in texto and texto.rfind(",") > texto.rfind("."):
+        texto = texto.replace(".", "").replace(",", ".")
+    else:
+        texto = texto.replace(",", "")
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+def _parecidos(a, b, umbral):
+    """Solapamiento de palabras (F1) entre dos textos libres"""
+    palabras_a, palabras_b = set(a.split()), set(b.split())
+    if not palabras_a or not palabras_b:
+        return a == b
+    comunes = len(palabras_a & palabras_b)
+    return 2 * comunes / (len(palabras_a) + len(palabras_b)) >= umbral
+
+
+def comparar_campo(campo, predicho, real, umbral=0.8):
+    """
+    Compara un campo predicho con el real
+
+    Los campos lista (parties, key_clauses) se cuentan por elemento.
+
+    Returns:
+        tuple (verdaderos positivos, falsos positivos, falsos negativos)
+    """
+    if campo in CAMPOS_LISTA:
+        predichos = {_normalizar_texto(v) for v in _como_lista(predicho)}
+        reales = {_normalizar_texto(v) for v in _como_lista(real)}
+        aciertos = len(predichos & reales)
+        return aciertos, len(predichos) - aciertos, len(reales) - aciertos
+
+    if predicho is None or real is None:
+        return 0, int(predicho is not None), int(real is not None)
+
+    if campo in CAMPOS_FECHA:
+        correcto = _normalizar_fecha(predicho) == _normalizar_fecha(real)
+    elif campo == "total_amount":
+        monto = _normalizar_monto(predicho)
+        correcto = monto is not None and abs(monto - float(real)) < 0.005
+    elif campo in CAMPOS_LIBRES:
+        correcto = _parecidos(_normalizar_texto(predicho), _normalizar_texto(real), umbral)
+    else:
+        correcto = _normalizar_texto(predicho) == _normalizar_texto(real)
+
+    # Un valor equivocado es a la vez un falso positivo y un falso negativo
+    return (1, 0, 0) if correcto else (0, 1, 1)
+
+
+def _como_lista(valor):
+    if valor is None:
+        return []
+    if isinstance(valor, str):
+        return [v for v in re.split(r"[;\n]", valor) if v.strip()]
+    return list(valor)
+
+
+def evaluar_documento(predicho, real, umbral=0.8):
+    """
+    Compara la extracción de un contrato con sus datos reales
+
+    Returns:
+        dict {campo: (vp, fp, fn)}
+    """
+    predicho = {k: v for k, v in (predicho or {}).items() if v not in (None, "", [], {})}
+    return {
+        campo: comparar_campo(campo, predicho.get(campo), real.get(campo), umbral)
+        for campo in CAMPOS
+        if campo in predicho or campo in real
+    }
+
+
+# ==========================================
+# CORRIDA
+# ==========================================
+
+def evaluar_config(config, corpus, url, concurrencia=1, umbral=0.8, verbose=False):
+    """
+    Corre una configuración sobre todo el corpus
+
+    Returns:
+        tuple (fila resumen, {campo: (vp, fp, fn)})
+    """
+    extractor = crear_extractor(config, url)
+    entrada_antes, salida_antes = _tokens(extractor)
+
+    def extraer(documento):
+        inicio = time.perf_counter()
+        try:
+            predicho = extractor.extract_contract_data(documento["texto"])
+        except Exception as e:
+            predicho = None
+            print(f"⚠️ {documento['id']}: {e}", file=sys.stderr)
+        return predicho, time.perf_counter() - inicio
+
+    # redirect_stdout cambia sys.stdout para todos los hilos: se aplica una vez afuera del pool
+    silencio = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    inicio = time.perf_counter()
+    with silencio, ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        resultados = list(pool.map(extraer, corpus))
+    segundos = time.perf_counter() - inicio
+
+    entrada_despues, salida_despues = _tokens(extractor)
+
+    # ==========================================
+    # Acumular por campo
+    # ==========================================
+    por_campo = {campo: [0, 0, 0] for campo in CAMPOS}
+    fechas = [0, 0]   # (correctas, reales)
+    montos = [0, 0]
+    vacios = 0
+
+    for documento, (predicho, _) in zip(corpus, resultados):
+        if not predicho:
+            vacios += 1
+
+        comparacion = evaluar_documento(predicho, documento["datos"], umbral)
+        for campo, (vp, fp, fn) in comparacion.items():
+            for i, valor in enumerate((vp, fp, fn)):
+                por_campo[campo][i] += valor
+
+        for campo in CAMPOS_FECHA:
+            if campo in documento["datos"]:
+                fechas[0] += comparacion[campo][0]
+                fechas[1] += 1
+
+        # Monto exacto: importe y moneda correctos
+        if "total_amount" in documento["datos"]:
+            moneda_ok = "currency" not in comparacion or comparacion["currency"][0] == 1
+            montos[0] += int(comparacion["total_amount"][0] == 1 and moneda_ok)
+            montos[1] += 1
+
+    vp = sum(v[0] for v in por_campo.values())
+    fp = sum(v[1] for v in por_campo.values())
+    fn = sum(v[2] for v in por_campo.values())
+    precision = vp / (vp + fp) if vp + fp else 0.0
+    recall = vp / (vp + fn) if vp + fn else 0.0
+    latencias = [latencia for _, latencia in resultados]
+    n = len(corpus)
+
+    fila = {
+        "config": config,
+        "docs": n,
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "fechas_exactas": fechas[0] / fechas[1] if fechas[1] else None,
+        "montos_exactos": montos[0] / montos[1] if montos[1] else None,
+        "vacios": vacios,
+        "tokens_entrada_doc": (entrada_despues - entrada_antes) / n if n else 0,
+        "tokens_salida_doc": (salida_despues - salida_antes) / n if n else 0,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "docs_por_segundo": n / segundos if segundos else None
+    }
+    return fila, {campo: tuple(valores) for campo, valores in por_campo.items()}
+
+
+def filas_por_campo(config, por_campo):
+    filas = []
+    for campo, (vp, fp, fn) in por_campo.items():
+        if not vp + fp + fn:
+            continue
+        filas.append({
+            "config": config,
+            "campo": campo,
+            "vp": vp,
+            "fp": fp,
+            "fn": fn,
+            "precision": vp / (vp + fp) if vp + fp else None,
+            "recall": vp / (vp + fn) if vp + fn else None
+        })
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluación de extracción: precisión contra latencia")
+    parser.add_argument("--corpus", default=None, help="Carpeta con .txt + .json (None = generar uno)")
+    parser.add_argument("--docs", type=int, default=30, help="Contratos a generar si no hay --corpus")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--config", action="append", default=None,
+                        help="TIPO[:MODELO], se puede repetir (default: llm y es con mistral:7b)")
+    parser.add_argument("--url", default="http://localhost:11434", help="URL de Ollama")
+    parser.add_argument("--fake", action="store_true", help="Usar el Ollama falso (sin modelo)")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Latencia del Ollama falso")
+    parser.add_argument("--tokens-por-segundo", type=float, default=0.0, help="Velocidad del Ollama falso")
+    parser.add_argument("--concurrencia", type=int, default=1, help="Extracciones simultáneas")
+    parser.add_argument("--umbral-texto", type=float, default=0.8,
+                        help="Solapamiento mínimo de palabras en subject_matter y penalties")
+    parser.add_argument("--por-campo", action="store_true", help="Mostrar también la tabla por campo")
+    parser.add_argument("--salida", default="eval_extraction.json")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    configs = args.config or [f"llm:{MODELO_DEFAULT}", f"es:{MODELO_DEFAULT}"]
+
+    with contextlib.ExitStack() as pila:
+        if args.corpus:
+            corpus = [d for d in cargar_corpus(args.corpus) if d["datos"]]
+        else:
+            carpeta = pila.enter_context(tempfile.TemporaryDirectory())
+            corpus = generar_corpus(carpeta, args.docs, semilla=args.semilla)
+
+        url = args.url
+        if args.fake:
+            from fake_ollama import FakeOllamaServer
+            servidor = pila.enter_context(FakeOllamaServer(latencia=args.latencia,
+                                                           tokens_por_segundo=args.tokens_por_segundo))
+            url = servidor.url
+
+        print(f"📊 Evaluación de extracción: {len(configs)} configuraciones × {len(corpus)} contratos")
+
+        filas = []
+        detalle = []
+        errores = {}
+        for config in configs:
+            print(f"🔍 Evaluando {config}...")
+            try:
+                fila, por_campo = evaluar_config(config, corpus, url, args.concurrencia, args.umbral_texto,
+                                                 args.verbose)
+            except ImportError as e:
+                print(f"⚠️ {config} no disponible: {e}")
+                errores[config] = str(e)
+                continue
+            filas.append(fila)
+            detalle.extend(filas_por_campo(config, por_campo))
+
+    guardar_json(args.salida, {
+        "maquina": info_maquina(),
+        "parametros": vars(args),
+        "resultados": filas,
+        "por_campo": detalle,
+        "errores": errores
+    })
+
+    print()
+    print(formatear_tabla(filas, [
+        ("config", "Config", "{}"),
+        ("precision", "Precisión", "{:.1%}"),
+        ("recall", "Recall", "{:.1%}"),
+        ("f1", "F1", "{:.1%}"),
+        ("fechas_exactas", "Fechas EM", "{:.1%}"),
+        ("montos_exactos", "Montos EM", "{:.1%}"),
+        ("vacios", "Vacíos", "{}"),
+        ("tokens_entrada_doc", "Tok in/doc", "{:.0f}"),
+        ("tokens_salida_doc", "Tok out/doc", "{:.0f}"),
+        ("p50_ms", "p50 ms", "{:.0f}"),
+        ("p95_ms", "p95 ms", "{:.0f}"),
+        ("p99_ms", "p99 ms", "{:.0f}"),
+        ("docs_por_segundo", "Docs/s", "{:.2f}")
+    ]))
+
+    if args.por_campo and detalle:
+        print()
+        print(formatear_tabla(detalle, [
+            ("config", "Config", "{}"),
+            ("campo", "Campo", "{}"),
+            ("vp", "VP", "{}"),
+            ("fp", "FP", "{}"),
+            ("fn", "FN", "{}"),
+            ("precision", "Precisión", "{:.1%}"),
+            ("recall", "Recall", "{:.1%}")
+        ]))
+
+    print(f"\n✅ Resultados guardados en: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Servidor local que imita la API de Ollama para pruebas y benchmarks
+
+Uso:
+    python fake_ollama.py --puerto 11435 --latencia 0.2 --tokens-por-segundo 40
+
+Implementa /api/generate y /api/chat (con y sin streaming) y /api/tags.
+Las respuestas son deterministas: los prompts de extracción (y de ficha)
+reciben un JSON armado con expresiones regulares sobre el texto del
+contrato, y las preguntas reciben una respuesta de relleno con el número de
+tokens pedido.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+_FECHA = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_MONTO = re.compile(r"\b(\d[\d,.]*)\s+(USD|EUR|GBP)\b")
+_PARTES = re.compile(r"between (.+?) and (.+?)(?:,|\.\s)")
+_TIPO = re.compile(r"^([A-Z][A-Z ]+?) No\.", re.MULTILINE)
+_CLAUSULA = re.compile(r"^([A-Z]+ CLAUSE - [A-Z ]+)$", re.MULTILINE)
+_OBJETO = re.compile(r"object of this agreement is the (.+?)\.")
+
+
+def extraer_campos(texto):
+    """
+    Extracción "de mentira" con regex para los prompts de extracción
+
+    Entiende el formato de los contratos de synthetic_pages.generar_contrato.
+
+    Args:
+        texto: Texto del prompt
+
+    Returns:
+        dict con los campos encontrados
+    """
+    datos = {}
+
+    tipo = _TIPO.search(texto)
+    if tipo:
+        datos["contract_type"] = tipo.group(1).strip().lower()
+
+    partes = _PARTES.search(texto)
+    if partes:
+        datos["parties"] = [partes.group(1).strip(), partes.group(2).strip()]
+
+    fechas = _FECHA.findall(texto)
+    for campo, fecha in zip(["signature_date", "start_date", "end_date"], fechas):
+        datos[campo] = fecha
+
+    monto = _MONTO.search(texto)
+    if monto:
+        datos["total_amount"] = float(monto.group(1).replace(",", ""))
+        datos["currency"] = monto.group(2)
+
+    objeto = _OBJETO.search(texto)
+    if objeto:
+        datos["subject_matter"] = objeto.group(1)
+
+    clausulas = _CLAUSULA.findall(texto)
+    if clausulas:
+        datos["key_clauses"] = clausulas
+
+    return datos
+
+
+def armar_ficha(texto):
+    """
+    Ficha "de mentira" (prompt de LLMExtractor.generar_ficha) a partir de extraer_campos
+
+    Returns:
+        dict con summary, parties, term, amounts, obligations, penalties
+    """
+    datos = extraer_campos(texto)
+    partes = datos.get("parties", [])
+    ficha = {
+        "summary": f"{datos.get('contract_type', 'contract')} between {' and '.join(partes) or 'the parties'}"
+                   f" for the {datos.get('subject_matter', 'agreed services')}.",
+        "parties": partes
+    }
+
+    if datos.get("start_date") or datos.get("end_date"):
+        ficha["term"] = f"{datos.get('start_date', '?')} to {datos.get('end_date', '?')}"
+    if datos.get("total_amount"):
+        ficha["amounts"] = [f"{datos['total_amount']:.2f} {datos.get('currency', '')} - total price"]
+
+    clausulas = datos.get("key_clauses", [])
+    ficha["obligations"] = [c for c in clausulas if "PENALT" not in c]
+    ficha["penalties"] = [c for c in clausulas if "PENALT" in c]
+    return ficha
+
+
+def _contar_tokens(texto):
+    """Aproximación de tokens: palabras"""
+    return len(texto.split())
+
+
+class FakeOllamaServer:
+    """
+    RESPONSABILIDAD: Hacerse pasar por Ollama en benchmarks y pruebas
+
+    ¿Qué hace?
+    - Atiende /api/generate y /api/chat en un hilo aparte
+    - Simula latencia inicial y velocidad de generación (tokens/seg)
+    - Soporta streaming (NDJSON, igual que Ollama)
+    - Devuelve JSON de extracción o respuestas de relleno
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latencia=0.05, tokens_por_segundo=200.0,
+                 tokens_respuesta=60, respuesta_json=None):
+        """
+        Args:
+            host: Interfaz donde escuchar
+            port: Puerto (0 = cualquiera libre)
+            latencia: Segundos hasta el primer token
+            tokens_por_segundo: Velocidad de generación simulada (0 = instantáneo)
+            tokens_respuesta: Largo de las respuestas a preguntas
+            respuesta_json: dict fijo para los prompts de extracción (None = regex)
+        """
+        self.latencia = latencia
+        self.tokens_por_segundo = tokens_por_segundo
+        self.tokens_respuesta = tokens_respuesta
+        self.respuesta_json = respuesta_json
+        self.peticiones = 0
+
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._servidor = ThreadingHTTPServer((host, port), self._crear_handler())
+        self._servidor.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._servidor.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Arranca el servidor en segundo plano"""
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def stop(self):
+        """Detiene el servidor"""
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def serve_forever(self):
+        """Atiende peticiones en el hilo actual (uso por línea de comandos)"""
+        self._servidor.serve_forever()
+
+    def generar_texto(self, prompt):
+        """
+        Decide la respuesta para un prompt
+
+        Returns:
+            list de tokens (se unen con espacios)
+        """
+        if "index card" in prompt and self.respuesta_json is None:
+            return json.dumps(armar_ficha(prompt), ensure_ascii=False).split(" ")
+
+        if "JSON" in prompt:
+            datos = self.respuesta_json if self.respuesta_json is not None else extraer_campos(prompt)
+            return json.dumps(datos, ensure_ascii=False).split(" ")
+
+        ids = re.findall(r"CONTRACT ID: (\S+)", prompt)
+        inicio = f"According to {', '.join(ids)}," if ids else "According to the available contracts,"
+        relleno = ["the", "contract", "states", "that", "the", "parties", "agreed", "on", "these", "terms."]
+        return inicio.split(" ") + [relleno[i % len(relleno)] for i in range(self.tokens_respuesta)]
+
+    def _crear_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, formato, *args):
+                pass  # Sin logs por petición
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._enviar_json({"models": [{"name": "fake:latest"}]})
+                else:
+                    self._enviar_json({"error": "not found"}, estado=404)
+
+            def do_POST(self):
+                largo = int(self.headers.get("Content-Length", 0))
+                cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+
+                with servidor._lock:
+                    servidor.peticiones += 1
+
+                if self.path == "/api/generate":
+                    prompt = cuerpo.get("prompt", "")
+                    self._responder(cuerpo, prompt, chat=False)
+                elif self.path == "/api/chat":
+                    prompt = "\n".join(m.get("content", "") for m in cuerpo.get("messages", []))
+                    self._responder(cuerpo, prompt, chat=True)
+                else:
+                    self._enviar_json({"error": "not found"}, estado=404)
+
+            def _responder(self, cuerpo, prompt, chat):
+                tokens = servidor.generar_texto(prompt)
+                modelo = cuerpo.get("model", "fake")
+                stream = cuerpo.get("stream", True)  # Ollama hace streaming por defecto
+                inicio = time.perf_counter()
+                pausa = 1 / servidor.tokens_por_segundo if servidor.tokens_por_segundo else 0
+
+                time.sleep(servidor.latencia)
+
+                final = {
+                    "model": modelo,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "done": True,
+                    "prompt_eval_count": _contar_tokens(prompt),
+                    "eval_count": len(tokens)
+                }
+
+                if not stream:
+                    time.sleep(pausa * len(tokens))
+                    texto = " ".join(tokens)
+                    final["total_duration"] = int((time.perf_counter() - inicio) * 1e9)
+                    self._enviar_json({**final, **self._contenido(texto, chat)})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                for i, token in enumerate(tokens):
+                    time.sleep(pausa)
+                    texto = token if i == 0 else " " + token
+                    self._enviar_chunk({
+                        "model": modelo,
+                        "created_at": datetime.now(timezone.utc).isoformat(),
+                        "done": False,
+                        **self._contenido(texto, chat)
+                    })
+
+                final["created_at"] = datetime.now(timezone.utc).isoformat()
+                final["total_duration"] = int((time.perf_counter() - inicio) * 1e9)
+                self._enviar_chunk({**final, **self._contenido("", chat)})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _contenido(self, texto, chat):
+                if chat:
+                    return {"message": {"role": "assistant", "content": texto}}
+                return {"response": texto}
+
+            def _enviar_chunk(self, datos):
+                linea = (json.dumps(datos, ensure_ascii=False) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(linea):X}\r\n".encode("ascii") + linea + b"\r\n")
+                self.wfile.flush()
+
+            def _enviar_json(self, datos, estado=200):
+                cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor falso de Ollama")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=11435)
+    parser.add_argument("--latencia", type=float, default=0.05, help="Segundos hasta el primer token")
+    parser.add_argument("--tokens-por-segundo", type=float, default=200.0)
+    parser.add_argument("--tokens-respuesta", type=int, default=60)
+    args = parser.parse_args()
+
+    servidor = FakeOllamaServer(
+        host=args.host,
+        port=args.puerto,
+        latencia=args.latencia,
+        tokens_por_segundo=args.tokens_por_segundo,
+        tokens_respuesta=args.tokens_respuesta
+    )
+    print(f"🤖 Ollama falso escuchando en {servidor.url}")
+    servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Exportar e importar el índice de contratos a Parquet
+
+Uso:
+    python index_export.py exportar --db ./chroma_db --salida indice.parquet
+    python index_export.py importar --db ./nueva_db --entrada indice.parquet --backend numpy
+
+Cada fila del archivo es un registro de la colección: id, vector, fragmento,
+metadata (JSON), texto completo y resultado OCR (ambos del almacén de
+contenido). Se escribe y se lee por grupos de filas, así la memoria no
+depende del tamaño del corpus. Importar no vuelve a calcular embeddings ni
+a pasar por OCR o LLM.
+
+DatabaseManager exporta las fichas de los contratos en un segundo archivo
+con el mismo formato (indice.fichas.parquet) y lo importa si está.
+
+El archivo guarda el modelo y la dimensión de los vectores: importarlo en
+una base con otro modelo de embeddings falla (las búsquedas devolverían
+vecinos sin sentido).
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+
+FORMATO = "contratos-indice"
+VERSION = 2                 # 2: columna 'ocr'
+VERSIONES_LEGIBLES = {"1", "2"}
+
+
+def _esquema(dim, modelo):
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("vector", pa.list_(pa.float32(), dim)),
+            ("documento", pa.large_string()),
+            ("metadata", pa.large_string()),
+            ("texto", pa.large_string()),
+            ("ocr", pa.large_binary()),
+        ],
+        metadata={"formato": FORMATO, "version": str(VERSION), "dim": str(dim), "modelo": modelo or ""}
+    )
+
+
+def exportar_parquet(collection, contenido, ruta, filas_por_grupo=1000, incluir_texto=True, modelo=None,
+                     compresion="zstd", dim=None):
+    """
+    Exporta una colección (y sus textos) a un archivo Parquet
+
+    Args:
+        collection: VectorStore a exportar
+        contenido: ContentStore con los textos completos (None = sin textos)
+        ruta: Archivo .parquet de salida
+        filas_por_grupo: Filas por row group (y por página leída de la colección)
+        incluir_texto: Guardar el texto completo y el resultado OCR además del fragmento
+        modelo: Nombre del modelo de embeddings (queda en los metadatos del archivo)
+        compresion: Códec de Parquet
+        dim: Dimensión de los vectores si la colección está vacía (un int o
+             una función que la calcula, así el modelo solo se carga si hace falta)
+
+    Returns:
+        int: Filas exportadas
+
+    Raises:
+        ValueError: La colección está vacía y no se indicó dim
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    filas = 0
+
+    try:
+        for pagina in collection.iterar(lote=filas_por_grupo):
+            vectores = np.asarray(pagina["embeddings"], dtype=np.float32)
+            metadatas = pagina.get("metadatas") or [{}] * len(pagina["ids"])
+            documentos = pagina.get("documents") or [None] * len(pagina["ids"])
+
+            if escritor is None:
+                esquema = _esquema(vectores.shape[1], modelo)
+                escritor = pq.ParquetWriter(ruta, esquema, compression=compresion)
+
+            textos = [
+                _texto(contenido, metadata, documento) if incluir_texto else None
+                for metadata, documento in zip(metadatas, documentos)
+            ]
+            ocr = [_ocr(contenido, metadata) if incluir_texto else None for metadata in metadatas]
+
+            tabla = pa.Table.from_arrays(
+                [
+                    pa.array(list(pagina["ids"]), pa.string()),
+                    pa.FixedSizeListArray.from_arrays(pa.array(vectores.ravel(), pa.float32()), vectores.shape[1]),
+                    pa.array(documentos, pa.large_string()),
+                    pa.array([json.dumps(m or {}, ensure_ascii=False) for m in metadatas], pa.large_string()),
+                    pa.array(textos, pa.large_string()),
+                    pa.array(ocr, pa.large_binary()),
+                ],
+                schema=esquema
+            )
+            escritor.write_table(tabla, row_group_size=filas_por_grupo)
+            filas += len(tabla)
+
+        # Colección vacía: igual se escribe el archivo (solo el esquema), así se puede importar
+        if escritor is None:
+            if dim is None:
+                raise ValueError("La colección está vacía: hace falta 'dim' para escribir el esquema")
+            escritor = pq.ParquetWriter(ruta, _esquema(dim() if callable(dim) else dim, modelo),
+                                        compression=compresion)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+    return filas
+
+
+def _texto(contenido, metadata, documento):
+    """Texto completo desde el almacén (o el fragmento si el contrato es anterior al almacén)"""
+    contenido_id = (metadata or {}).get("contenido_id")
+    if contenido is not None and contenido_id and contenido_id in contenido:
+        return contenido.leer(contenido_id)
+    return documento
+
+
+def _ocr(contenido, metadata):
+    """Blob del ResultadoOCR del contrato (None si se guardó sin él)"""
+    ocr_id = (metadata or {}).get("ocr_id")
+    if contenido is not None and ocr_id and ocr_id in contenido:
+        return contenido.leer_bytes(ocr_id)
+    return None
+
+
+def _dimension(collection):
+    """Dimensión de los vectores ya guardados (None si la colección está vacía)"""
+    for pagina in collection.iterar(lote=1, include=("embeddings",)):
+        return len(pagina["embeddings"][0])
+    return None
+
+
+def _verificar_destino(metadatos, ruta, collection, modelo):
+    """Falla si los vectores del archivo no sirven para buscar en la colección de destino"""
+    origen = metadatos.get("modelo")
+    if modelo and origen and origen != modelo:
+        raise ValueError(f"{ruta} tiene vectores de '{origen}' y la base usa '{modelo}': "
+                         f"hay que reindexar en lugar de importar")
+    if modelo and not origen:
+        print(f"⚠️ {ruta} no indica el modelo de embeddings: se asume '{modelo}'")
+
+    dim = _dimension(collection)
+    if dim is not None and int(metadatos.get("dim", dim)) != dim:
+        raise ValueError(f"{ruta} tiene vectores de dimensión {metadatos['dim']} y la colección de {dim}")
+
+
+def importar_parquet(ruta, collection, contenido, filas_por_lote=1000, omitir_existentes=True, modelo=None):
+    """
+    Carga un archivo exportado con exportar_parquet en una colección
+
+    Args:
+        ruta: Archivo .parquet
+        collection: VectorStore de destino (puede ser de otro backend)
+        contenido: ContentStore de destino para textos y resultados OCR (None = no guardarlos)
+        filas_por_lote: Filas por escritura en la colección
+        omitir_existentes: Saltear ids que ya están en la colección
+        modelo: Modelo de embeddings de la base de destino (debe ser el del archivo)
+
+    Returns:
+        dict con importadas y omitidas
+
+    Raises:
+        ValueError: El archivo no es una exportación, o sus vectores son de
+                    otro modelo o de otra dimensión que la colección
+    """
+    import pyarrow.parquet as pq
+
+    archivo = pq.ParquetFile(ruta)
+    metadatos = {k.decode(): v.decode() for k, v in (archivo.schema_arrow.metadata or {}).items()}
+    if metadatos.get("formato") != FORMATO:
+        raise ValueError(f"{ruta} no es una exportación del índice de contratos")
+    if metadatos.get("version") not in VERSIONES_LEGIBLES:
+        raise ValueError(f"Versión de exportación no soportada: {metadatos.get('version')}")
+    _verificar_destino(metadatos, ruta, collection, modelo)
+
+    importadas = 0
+    omitidas = 0
+
+    for lote in archivo.iter_batches(batch_size=filas_por_lote):
+        columnas = lote.to_pydict()
+        ids = columnas["id"]
+        metadatas = [json.loads(m) for m in columnas["metadata"]]
+
+        seleccion = range(len(ids))
+        if omitir_existentes:
+            existentes = set(collection.get(ids=ids, include=[])["ids"])
+            seleccion = [i for i in seleccion if ids[i] not in existentes]
+            omitidas += len(ids) - len(seleccion)
+        if not seleccion:
+            continue
+
+        # Textos y resultados OCR van al almacén de contenido (el id es el hash: no se duplican)
+        if contenido is not None:
+            ocr = columnas.get("ocr") or [None] * len(ids)  # Versión 1: sin OCR
+            for i in seleccion:
+                if columnas["texto"][i] is not None:
+                    metadatas[i]["contenido_id"] = contenido.guardar(columnas["texto"][i])
+                if ocr[i] is not None:
+                    metadatas[i]["ocr_id"] = contenido.guardar_datos(ocr[i])
+
+        vectores = lote.column("vector").flatten().to_numpy(zero_copy_only=False)
+        vectores = vectores.reshape(len(ids), -1)
+
+        collection.add(
+            ids=[ids[i] for i in seleccion],
+            embeddings=vectores[list(seleccion)].tolist(),
+            documents=[columnas["documento"][i] for i in seleccion],
+            metadatas=[metadatas[i] for i in seleccion]
+        )
+        importadas += len(seleccion)
+
+    return {"importadas": importadas, "omitidas": omitidas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar/importar el índice de contratos a Parquet")
+    parser.add_argument("accion", choices=["exportar", "importar"])
+    parser.add_argument("--db", default="./chroma_db")
+    parser.add_argument("--backend", default=None, help="'chroma' o 'numpy' (None = VECTOR_BACKEND)")
+    parser.add_argument("--salida", default="indice.parquet")
+    parser.add_argument("--entrada", default="indice.parquet")
+    parser.add_argument("--filas-por-grupo", type=int, default=1000)
+    parser.add_argument("--sin-texto", action="store_true", help="No exportar el texto completo")
+    args = parser.parse_args()
+
+    from database_manager import DatabaseManager
+
+    db = DatabaseManager(db_path=args.db, backend=args.backend)
+    inicio = time.perf_counter()
+
+    if args.accion == "exportar":
+        filas = db.exportar(args.salida, filas_por_grupo=args.filas_por_grupo, incluir_texto=not args.sin_texto)
+        print(f"✅ {filas} filas exportadas a {args.salida} en {time.perf_counter() - inicio:.1f}s")
+    else:
+        resultado = db.importar(args.entrada, filas_por_lote=args.filas_por_grupo)
+        print(f"✅ {resultado['importadas']} filas y {resultado['fichas']} fichas importadas "
+              f"({resultado['omitidas']} ya existían) en {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
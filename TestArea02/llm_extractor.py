@@ -1,6 +1,40 @@
+import hashlib
 import json
+import os
+import threading
+
 import requests
 
+from metrics import METRICAS, log
+
+
+# Prompt de la ficha de cada contrato (se genera una vez, al ingerir)
+PROMPT_FICHA = """Summarize this contract as a normalized index card in JSON format.
+
+KNOWN FIELDS:
+{datos}
+
+TEXT:
+{texto}
+
+Return these fields:
+- summary: 2-3 sentences, plain language
+- parties: array of "name (role)"
+- term: "YYYY-MM-DD to YYYY-MM-DD", renewal and termination notice if stated
+- amounts: array of "amount currency - what it pays for / when"
+- obligations: array of the key obligations, "party: obligation"
+- penalties: array of penalties, fines or late fees
+
+IMPORTANT:
+- Use only information in the text; leave out fields you cannot find
+- Keep every item short (one line)
+- Respond ONLY with valid JSON, no explanations
+
+JSON:"""
+
+# Cambiar el prompt cambia la versión: las fichas guardadas con otra versión se regeneran
+VERSION_FICHA = "ficha-" + hashlib.sha256(PROMPT_FICHA.encode("utf-8")).hexdigest()[:8]
+
 
 class LLMExtractor:
     """
@@ -12,16 +46,19 @@ class LLMExtractor:
     - Devuelve datos en formato JSON
     """
 
-    def __init__(self, model_name="mistral:7b", base_url="http://localhost:11434"):
+    def __init__(self, model_name="mistral:7b", base_url="http://localhost:11434", timeout=None):
         """
         Inicializa conexión con Ollama
 
         Args:
             model_name: Modelo a usar (ej: "mistral:7b", "llama2")
             base_url: URL de Ollama
+            timeout: Segundos máximos sin respuesta de Ollama (None = LLM_TIMEOUT o 300)
         """
         self.model_name = model_name
         self.base_url = base_url
+        self.timeout = timeout or float(os.environ.get("LLM_TIMEOUT", "300"))
+        self._uso = threading.local()  # Tokens y error de la última llamada de cada hilo
 
     def extract_contract_data(self, texto):
         """
@@ -33,7 +70,7 @@ class LLMExtractor:
         Returns:
             dict con campos como: contract_type, parties, dates, amount, etc.
         """
-        print("🤖 Extrayendo datos estructurados con LLM...")
+        log("🤖 Extrayendo datos estructurados con LLM...", evento="llm_extraccion_inicio")
 
         # Limitar texto si es muy largo (para no exceder tokens)
         texto_sample = texto[:6000] if len(texto) > 6000 else texto
@@ -64,17 +101,13 @@ IMPORTANT:
 JSON:"""
 
         # Llamar a Ollama
-        response = requests.post(
-            f"{self.base_url}/api/generate",
-            json={
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": False
-            }
-        )
+        with METRICAS.span("llm_extraccion", modelo=self.model_name):
+            response = self._generar(prompt)
 
         if response.status_code != 200:
-            print(f"❌ Error llamando a Ollama: {response.status_code}")
+            METRICAS.incrementar("fallos", etapa="llm_extraccion")
+            log(f"❌ Error llamando a Ollama: {response.status_code}", evento="llm_error",
+                estado=response.status_code)
             return {}
 
         # Obtener respuesta
@@ -82,24 +115,68 @@ JSON:"""
 
         # Parsear JSON
         try:
-            # Limpiar posibles markdown code blocks
-            llm_response = llm_response.strip()
-            if llm_response.startswith("```json"):
-                llm_response = llm_response[7:]
-            if llm_response.startswith("```"):
-                llm_response = llm_response[3:]
-            if llm_response.endswith("```"):
-                llm_response = llm_response[:-3]
-
-            datos = json.loads(llm_response.strip())
-            print(f"✅ Extraídos {len(datos)} campos")
+            datos = self._parsear_json(llm_response)
+            log(f"✅ Extraídos {len(datos)} campos", evento="llm_campos", campos=len(datos))
             return datos
 
         except json.JSONDecodeError as e:
-            print(f"⚠️ Error parseando JSON: {e}")
-            print(f"Respuesta del LLM: {llm_response[:200]}...")
+            METRICAS.incrementar("fallos", etapa="llm_json")
+            log(f"⚠️ Error parseando JSON: {e}", evento="llm_json_invalido")
+            log(f"Respuesta del LLM: {llm_response[:200]}...", evento="llm_json_invalido_respuesta")
+            return {}
+
+    def generar_ficha(self, texto, datos=None):
+        """
+        Resumen normalizado y ficha del contrato (partes, vigencia, montos,
+        obligaciones, penalidades) para usar como contexto en las preguntas
+
+        Args:
+            texto: Texto del contrato (del OCR)
+            datos: Campos ya extraídos por extract_contract_data (ayudan a normalizar)
+
+        Returns:
+            dict con summary, parties, term, amounts, obligations, penalties
+            (solo los encontrados; {} si el LLM falló)
+        """
+        log("🗂️ Generando ficha del contrato...", evento="llm_ficha_inicio")
+
+        prompt = PROMPT_FICHA.format(
+            datos=json.dumps(datos or {}, ensure_ascii=False),
+            texto=texto[:6000]
+        )
+
+        with METRICAS.span("llm_ficha", modelo=self.model_name):
+            response = self._generar(prompt)
+
+        if response.status_code != 200:
+            METRICAS.incrementar("fallos", etapa="llm_ficha")
+            log(f"❌ Error llamando a Ollama: {response.status_code}", evento="llm_error",
+                estado=response.status_code)
+            return {}
+
+        llm_response = response.json()['response']
+        try:
+            ficha = self._parsear_json(llm_response)
+        except json.JSONDecodeError as e:
+            METRICAS.incrementar("fallos", etapa="llm_ficha_json")
+            log(f"⚠️ Error parseando la ficha: {e}", evento="llm_json_invalido")
             return {}
 
+        return ficha if isinstance(ficha, dict) else {}
+
+    @staticmethod
+    def _parsear_json(llm_response):
+        """JSON de la respuesta del LLM, sin los bloques de markdown que a veces agrega"""
+        llm_response = llm_response.strip()
+        if llm_response.startswith("```json"):
+            llm_response = llm_response[7:]
+        if llm_response.startswith("```"):
+            llm_response = llm_response[3:]
+        if llm_response.endswith("```"):
+            llm_response = llm_response[:-3]
+
+        return json.loads(llm_response.strip())
+
     def responder_pregunta(self, pregunta, contexto):
         """
         Responde una pregunta del usuario usando contexto de contratos
@@ -111,9 +188,70 @@ JSON:"""
         Returns:
             str: Respuesta del LLM
         """
-        print("🤖 Generando respuesta...")
+        log("🤖 Generando respuesta...", evento="llm_respuesta_inicio")
+
+        prompt = self._prompt_pregunta(pregunta, contexto)
+
+        # Llamar a Ollama
+        with METRICAS.span("llm_respuesta", modelo=self.model_name):
+            response = self._generar(prompt)
+
+        if response.status_code != 200:
+            METRICAS.incrementar("fallos", etapa="llm_respuesta")
+            return f"❌ Error generando respuesta: {response.status_code}"
+
+        return response.json()['response']
+
+    def responder_pregunta_stream(self, pregunta, contexto):
+        """
+        Igual que responder_pregunta, pero devuelve la respuesta por partes
+        a medida que Ollama la genera
+
+        Args:
+            pregunta: Pregunta del usuario
+            contexto: Información de contratos relevantes
+
+        Yields:
+            str: Fragmentos de la respuesta
+        """
+        log("🤖 Generando respuesta (streaming)...", evento="llm_respuesta_inicio", stream=True)
 
-        prompt = f"""You are a contract analysis assistant. Answer the user's question using the provided contract information.
+        prompt = self._prompt_pregunta(pregunta, contexto)
+
+        with METRICAS.span("llm_respuesta", modelo=self.model_name, stream=True):
+            response = requests.post(
+                f"{self.base_url}/api/generate",
+                json={
+                    "model": self.model_name,
+                    "prompt": prompt,
+                    "stream": True
+                },
+                stream=True,
+                timeout=self.timeout
+            )
+
+            if response.status_code != 200:
+                METRICAS.incrementar("fallos", etapa="llm_respuesta")
+                yield f"❌ Error generando respuesta: {response.status_code}"
+                return
+
+            with response:
+                # Ollama manda un JSON por línea; el último trae done=true y los conteos
+                for linea in response.iter_lines():
+                    if not linea:
+                        continue
+
+                    parte = json.loads(linea)
+                    if parte.get("response"):
+                        yield parte["response"]
+
+                    if parte.get("done"):
+                        METRICAS.incrementar("tokens", parte.get("prompt_eval_count", 0), tipo="entrada")
+                        METRICAS.incrementar("tokens", parte.get("eval_count", 0), tipo="salida")
+
+    def _prompt_pregunta(self, pregunta, contexto):
+        """Prompt para responder una pregunta con el contexto de contratos"""
+        return f"""You are a contract analysis assistant. Answer the user's question using the provided contract information.
 
 QUESTION:
 {pregunta}
@@ -129,17 +267,45 @@ Instructions:
 
 Answer:"""
 
-        # Llamar a Ollama
+    def _generar(self, prompt):
+        """
+        Llama a /api/generate de Ollama y cuenta los tokens usados
+
+        Args:
+            prompt: Prompt completo
+
+        Returns:
+            requests.Response
+
+        Raises:
+            requests.Timeout: Si Ollama no responde en self.timeout segundos
+        """
+        self._uso.tokens = 0
+        self._uso.error = True  # Hasta tener una respuesta 200
+
         response = requests.post(
             f"{self.base_url}/api/generate",
             json={
                 "model": self.model_name,
                 "prompt": prompt,
                 "stream": False
-            }
+            },
+            timeout=self.timeout
         )
 
-        if response.status_code != 200:
-            return f"❌ Error generando respuesta: {response.status_code}"
+        self._uso.error = response.status_code != 200
+        if response.status_code == 200:
+            datos = response.json()
+            METRICAS.incrementar("tokens", datos.get("prompt_eval_count", 0), tipo="entrada")
+            METRICAS.incrementar("tokens", datos.get("eval_count", 0), tipo="salida")
+            self._uso.tokens = datos.get("prompt_eval_count", 0) + datos.get("eval_count", 0)
+
+        return response
+
+    def tokens_ultima_llamada(self):
+        """Tokens (entrada + salida) de la última llamada hecha desde este hilo"""
+        return getattr(self._uso, "tokens", 0)
 
-        return response.json()['response']
\ No newline at end of file
+    def error_ultima_llamada(self):
+        """True si la última llamada hecha desde este hilo no recibió un 200 de Ollama"""
+        return getattr(self._uso, "error", False)
\ No newline at end of file
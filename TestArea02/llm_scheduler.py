@@ -0,0 +1,325 @@
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from concurrent.futures import TimeoutError as FuturoTimeout
+
+from metrics import METRICAS, log
+
+
+# Clases de prioridad: las preguntas de un usuario pasan antes que la ingesta en lote
+INTERACTIVA = "interactiva"
+LOTE = "lote"
+_ORDEN = {INTERACTIVA: 0, LOTE: 1}
+
+
+class ColaLlena(Exception):
+    """La cola del LLM llegó a su máximo"""
+
+
+class FueraDeTiempo(Exception):
+    """La petición venció antes de llegar al LLM (o de terminar)"""
+
+
+class _Tarea:
+    """Una llamada al LLM en cola; varios pedidos idénticos comparten la misma tarea"""
+
+    def __init__(self, clave, funcion, prioridad, limite):
+        self.clave = clave
+        self.funcion = funcion
+        self.prioridad = prioridad
+        self.limite = limite            # time.monotonic() máximo para empezar (None = sin límite)
+        self.interesados = []           # Futures de quienes esperan el resultado
+        self.estado = "en_cola"         # en_cola → corriendo → terminada (o descartada)
+        self.encolada = time.monotonic()
+
+
+class LLMScheduler:
+    """
+    RESPONSABILIDAD: Ordenar las llamadas a Ollama de todos los usuarios
+
+    ¿Qué hace?
+    - Se pone delante de LLMExtractor con la misma interfaz
+    - Atiende primero las preguntas interactivas y después la extracción en lote
+    - Une pedidos idénticos en vuelo en una sola llamada (single-flight)
+    - Limita el largo de la cola (las interactivas tienen lugares reservados)
+    - Descarta pedidos vencidos o cancelados antes de mandarlos al LLM
+    - Con un LimitadorAdaptativo, la cantidad de llamadas simultáneas se
+      ajusta sola (hasta su techo) según los tokens/s y la latencia medidos
+
+    Una llamada que ya está corriendo no se corta: si todos los interesados
+    cancelan, el resultado simplemente se descarta.
+    """
+
+    def __init__(self, extractor, trabajadores=1, max_cola=32, reserva_interactiva=4, limitador=None):
+        """
+        Args:
+            extractor: LLMExtractor al que se le delegan las llamadas
+            trabajadores: Llamadas simultáneas a Ollama (con limitador se usa su techo)
+            max_cola: Tareas esperando como máximo
+            reserva_interactiva: Lugares de la cola que el lote no puede ocupar
+            limitador: LimitadorAdaptativo (None = siempre 'trabajadores' llamadas)
+        """
+        self.extractor = extractor
+        self.limitador = limitador
+        if limitador is not None:
+            trabajadores = limitador.maximo
+        self.max_cola = max_cola
+        self.reserva_interactiva = min(reserva_interactiva, max_cola - 1)
+
+        self._cola = []                 # heap de (orden, secuencia, tarea)
+        self._secuencia = itertools.count()
+        self._en_vuelo = {}             # clave → tarea en cola o corriendo
+        self._condicion = threading.Condition()
+        self._cerrado = False
+        self.en_cola = 0
+
+        self._hilos = [
+            threading.Thread(target=self._trabajar, name=f"llm-{i}", daemon=True)
+            for i in range(trabajadores)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def __getattr__(self, nombre):
+        # model_name, base_url, etc. vienen del extractor
+        if nombre == "extractor":
+            raise AttributeError(nombre)
+        return getattr(self.extractor, nombre)
+
+    # ==========================================
+    # INTERFAZ DE LLMExtractor
+    # ==========================================
+
+    def extract_contract_data(self, texto, prioridad=LOTE, timeout=None):
+        """Igual que LLMExtractor.extract_contract_data, pasando por la cola"""
+        futuro = self.enviar(("extraccion", texto), lambda: self.extractor.extract_contract_data(texto),
+                             prioridad=prioridad, timeout=timeout, bloquear=prioridad == LOTE)
+        return self._esperar(futuro, timeout)
+
+    def generar_ficha(self, texto, datos=None, prioridad=LOTE, timeout=None):
+        """Igual que LLMExtractor.generar_ficha, pasando por la cola"""
+        # Mismo texto con otros datos extraídos es otro pedido
+        huella = hashlib.sha256(json.dumps(datos or {}, sort_keys=True, ensure_ascii=False,
+                                           default=str).encode("utf-8")).hexdigest()
+        futuro = self.enviar(("ficha", texto, huella), lambda: self.extractor.generar_ficha(texto, datos),
+                             prioridad=prioridad, timeout=timeout, bloquear=prioridad == LOTE)
+        return self._esperar(futuro, timeout)
+
+    def responder_pregunta(self, pregunta, contexto, prioridad=INTERACTIVA, timeout=None):
+        """Igual que LLMExtractor.responder_pregunta, pasando por la cola"""
+        futuro = self.enviar(("respuesta", pregunta, contexto),
+                             lambda: self.extractor.responder_pregunta(pregunta, contexto),
+                             prioridad=prioridad, timeout=timeout)
+        return self._esperar(futuro, timeout)
+
+    def responder_pregunta_stream(self, pregunta, contexto, prioridad=INTERACTIVA, timeout=None):
+        """
+        Igual que LLMExtractor.responder_pregunta_stream
+
+        El streaming no se une con otros pedidos: la tarea solo reserva un
+        trabajador mientras quien llama consume la respuesta. Si vence la
+        espera, el trabajador se libera aunque ya haya sacado la tarea de la cola.
+        """
+        empezo = threading.Event()
+        termino = threading.Event()
+
+        def ocupar_trabajador():
+            empezo.set()
+            termino.wait()
+
+        futuro = self.enviar(None, ocupar_trabajador, prioridad=prioridad, timeout=timeout)
+
+        limite = time.monotonic() + timeout if timeout else None
+        try:
+            while not empezo.wait(0.05):
+                if futuro.done():
+                    futuro.result()  # Propaga FueraDeTiempo
+                if limite and time.monotonic() > limite:
+                    futuro.cancel()
+                    raise FueraDeTiempo(f"La pregunta esperó más de {timeout}s por el LLM")
+
+            yield from self.extractor.responder_pregunta_stream(pregunta, contexto)
+        finally:
+            termino.set()
+
+    # ==========================================
+    # COLA
+    # ==========================================
+
+    def enviar(self, clave, funcion, prioridad=LOTE, timeout=None, bloquear=False):
+        """
+        Encola una llamada al LLM
+
+        Args:
+            clave: Identifica pedidos idénticos (None = nunca se une con otro)
+            funcion: Llamada a ejecutar (sin argumentos)
+            prioridad: INTERACTIVA o LOTE
+            timeout: Segundos máximos esperando turno (None = sin límite)
+            bloquear: Si la cola está llena, esperar lugar en vez de lanzar ColaLlena
+
+        Returns:
+            Future con el resultado (cancelarlo retira el pedido de la cola)
+        """
+        limite = time.monotonic() + timeout if timeout else None
+        futuro = Future()
+
+        with self._condicion:
+            tarea = self._en_vuelo.get(clave) if clave is not None else None
+
+            if tarea is not None:
+                # Single-flight: el mismo pedido ya está en cola o corriendo
+                METRICAS.incrementar("llm_unidas", prioridad=prioridad)
+                tarea.interesados.append(futuro)
+                tarea.limite = None if limite is None or tarea.limite is None else max(tarea.limite, limite)
+
+                # Si una pregunta interactiva se une a una tarea de lote, la tarea sube de prioridad
+                if tarea.estado == "en_cola" and _ORDEN[prioridad] < _ORDEN[tarea.prioridad]:
+                    tarea.prioridad = prioridad
+                    heapq.heappush(self._cola, (_ORDEN[prioridad], next(self._secuencia), tarea))
+                    self._condicion.notify()
+            else:
+                capacidad = self.max_cola if prioridad == INTERACTIVA else self.max_cola - self.reserva_interactiva
+                while self.en_cola >= capacidad:
+                    if not bloquear or self._cerrado:
+                        METRICAS.incrementar("rechazos", cola="llm", prioridad=prioridad)
+                        raise ColaLlena(f"Cola del LLM llena ({self.en_cola} esperando)")
+                    self._condicion.wait()
+
+                tarea = _Tarea(clave, funcion, prioridad, limite)
+                tarea.interesados.append(futuro)
+                heapq.heappush(self._cola, (_ORDEN[prioridad], next(self._secuencia), tarea))
+                self.en_cola += 1
+                if clave is not None:
+                    self._en_vuelo[clave] = tarea
+
+                METRICAS.fijar("llm_en_cola", self.en_cola)
+                self._condicion.notify_all()
+
+        futuro.add_done_callback(lambda f: self._al_cancelar(tarea, f))
+        return futuro
+
+    def _al_cancelar(self, tarea, futuro):
+        """Si nadie más espera una tarea en cola, se descarta"""
+        if not futuro.cancelled():
+            return
+
+        with self._condicion:
+            if futuro in tarea.interesados:
+                tarea.interesados.remove(futuro)
+
+            if not tarea.interesados and tarea.estado == "en_cola":
+                tarea.estado = "descartada"
+                self._quitar(tarea)
+                self.en_cola -= 1
+                METRICAS.incrementar("llm_canceladas", prioridad=tarea.prioridad)
+                METRICAS.fijar("llm_en_cola", self.en_cola)
+                self._condicion.notify_all()
+
+    def _quitar(self, tarea):
+        if tarea.clave is not None and self._en_vuelo.get(tarea.clave) is tarea:
+            del self._en_vuelo[tarea.clave]
+
+    def _esperar(self, futuro, timeout):
+        try:
+            return futuro.result(timeout=timeout)
+        except FuturoTimeout:
+            futuro.cancel()
+            raise FueraDeTiempo(f"El LLM no respondió en {timeout}s")
+
+    def _hay_lugar(self):
+        return self.limitador is None or self.limitador.hay_lugar()
+
+    def _siguiente(self):
+        """Saca la próxima tarea válida de la cola (None si se cerró)"""
+        while True:
+            with self._condicion:
+                while not self._cerrado and (not self._cola or not self._hay_lugar()):
+                    self._condicion.wait()
+                if self._cerrado:
+                    return None
+
+                _, _, tarea = heapq.heappop(self._cola)
+                if tarea.estado != "en_cola":
+                    continue  # Descartada, o entrada repetida por un cambio de prioridad
+
+                self.en_cola -= 1
+                METRICAS.fijar("llm_en_cola", self.en_cola)
+                self._condicion.notify_all()  # Hay lugar para quien espera con bloquear=True
+
+                vencida = tarea.limite is not None and time.monotonic() > tarea.limite
+                tarea.estado = "terminada" if vencida else "corriendo"
+                if not vencida:
+                    if self.limitador is not None:
+                        self.limitador.empezar()
+                    return tarea
+
+                self._quitar(tarea)
+                interesados = list(tarea.interesados)
+
+            METRICAS.incrementar("llm_vencidas", prioridad=tarea.prioridad)
+            self._resolver(interesados, error=FueraDeTiempo("Venció esperando turno del LLM"))
+
+    def _trabajar(self):
+        while True:
+            tarea = self._siguiente()
+            if tarea is None:
+                return
+
+            METRICAS.observar("llm_espera_segundos", time.monotonic() - tarea.encolada, prioridad=tarea.prioridad)
+
+            resultado, error = None, None
+            inicio = time.monotonic()
+            try:
+                resultado = tarea.funcion()
+            except Exception as e:
+                error = e
+                log(f"❌ Error en llamada al LLM: {e}", evento="llm_planificador_error", error=str(e))
+
+            if self.limitador is not None:
+                self._medir(tarea, time.monotonic() - inicio, error)
+
+            with self._condicion:
+                self._condicion.notify_all()  # Puede haber lugar (o un límite nuevo) para otra tarea
+                tarea.estado = "terminada"
+                self._quitar(tarea)
+                interesados = list(tarea.interesados)
+
+            self._resolver(interesados, resultado, error)
+
+    def _medir(self, tarea, segundos, error):
+        """
+        Le pasa la llamada al limitador (los tokens y si Ollama contestó con
+        error los deja el extractor en este mismo hilo: un estado HTTP de
+        error no lanza excepción, el extractor devuelve {})
+        """
+        if tarea.clave is None:
+            # Streaming: el trabajador solo estuvo reservado, no hay nada que medir
+            self.limitador.terminar(segundos, medir=False)
+            return
+
+        tokens_ultima_llamada = getattr(self.extractor, "tokens_ultima_llamada", None)
+        tokens = tokens_ultima_llamada() if tokens_ultima_llamada else 0
+        error_ultima_llamada = getattr(self.extractor, "error_ultima_llamada", None)
+        fallo = error is not None or bool(error_ultima_llamada and error_ultima_llamada())
+        self.limitador.terminar(segundos, tokens, error=fallo)
+
+    @staticmethod
+    def _resolver(futuros, resultado=None, error=None):
+        for futuro in futuros:
+            try:
+                if error is not None:
+                    futuro.set_exception(error)
+                else:
+                    futuro.set_result(resultado)
+            except InvalidStateError:
+                pass  # Quien esperaba ya canceló
+
+    def cerrar(self):
+        """Detiene los trabajadores (las tareas en cola quedan sin atender)"""
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
@@ -1,10 +1,26 @@
+import argparse
+
 from contract_system import ContractSystem
+from metrics import configurar_logging
+from profiler import agregar_argumentos, crear_desde_argumentos
 
 
 def main():
     """
     Programa principal
     """
+    parser = argparse.ArgumentParser(description="Sistema de contratos")
+    parser.add_argument("--ingerir", nargs="+", metavar="RUTA", help="Procesar estos archivos en lote y salir")
+    parser.add_argument("--regenerar-fichas", action="store_true",
+                        help="Generar las fichas que faltan o quedaron de otra versión del prompt y salir")
+    parser.add_argument("--llm-adaptativo", action="store_true", default=None,
+                        help="Ajustar la concurrencia con Ollama según tokens/s y latencia")
+    parser.add_argument("--llm-concurrencia-max", type=int, default=None, help="Techo de la concurrencia adaptativa")
+    agregar_argumentos(parser)
+    args = parser.parse_args()
+
+    # Log estructurado si CONTRACTS_LOG=json (si no, se siguen usando prints)
+    configurar_logging()
 
     # ==========================================
     # INICIALIZAR SISTEMA
@@ -12,9 +28,22 @@ def main():
     sistema = ContractSystem(
         db_path="./chroma_db",
         llm_model="mistral:7b",
-        ocr_lang="en"
+        ocr_lang="en",
+        perfil=crear_desde_argumentos(args),
+        llm_adaptativo=args.llm_adaptativo,
+        llm_concurrencia_max=args.llm_concurrencia_max
     )
 
+    if args.ingerir:
+        resultados = sistema.procesar_contratos(args.ingerir)
+        errores = sum(isinstance(resultado, Exception) for resultado in resultados.values())
+        print(f"\n📦 {len(resultados) - errores} contratos procesados, {errores} con error")
+        return
+
+    if args.regenerar_fichas:
+        print(f"\n🗂️ {sistema.regenerar_fichas()} fichas generadas")
+        return
+
     # ==========================================
     # OPCIÓN 1: PROCESAR CONTRATOS
     # ==========================================
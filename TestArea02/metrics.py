@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Límites de los histogramas de tiempo (segundos)
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+PREFIJO = "contratos"
+
+logger = logging.getLogger(PREFIJO)
+
+
+class Histograma:
+    """Histograma acumulado estilo Prometheus"""
+
+    def __init__(self, buckets=BUCKETS_SEGUNDOS):
+        self.buckets = tuple(buckets)
+        self.conteos = [0] * (len(self.buckets) + 1)  # El último es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[i] += 1
+                break
+        else:
+            self.conteos[-1] += 1
+
+        self.suma += valor
+        self.total += 1
+
+    def percentil(self, p):
+        """Percentil aproximado (límite superior del bucket que lo contiene)"""
+        if not self.total:
+            return 0.0
+
+        objetivo = self.total * p / 100
+        acumulado = 0
+        for limite, conteo in zip(self.buckets + (float("inf"),), self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return limite
+
+        return float("inf")
+
+
+def _formatear_etiquetas(etiquetas, extra=None):
+    pares = list(etiquetas) + (list(extra.items()) if extra else [])
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{clave}="{valor}"' for clave, valor in pares) + "}"
+
+
+class Metrics:
+    """
+    RESPONSABILIDAD: Medir el sistema de contratos
+
+    ¿Qué hace?
+    - span(): mide la duración de una etapa (OCR, LLM, embedding, Chroma...)
+    - Contadores (páginas, tokens, aciertos de caché, fallos)
+    - Histogramas de duración por etapa
+    - Exporta en formato texto de Prometheus o en JSON
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores = {}
+        self.histogramas = {}
+        self.valores = {}
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        """Suma valor a un contador (ej: incrementar("paginas", 3))"""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, buckets=BUCKETS_SEGUNDOS, **etiquetas):
+        """Registra un valor en un histograma"""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            if clave not in self.histogramas:
+                self.histogramas[clave] = Histograma(buckets)
+            self.histogramas[clave].observar(valor)
+
+    def fijar(self, nombre, valor, **etiquetas):
+        """Fija el valor actual de una métrica (gauge)"""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self.valores[clave] = valor
+
+    @contextmanager
+    def span(self, etapa, **campos):
+        """
+        Mide una etapa del pipeline
+
+        Registra la duración en el histograma etapa_segundos, cuenta los fallos
+        y deja un evento en el log estructurado.
+
+        Uso:
+            with METRICAS.span("ocr", archivo=ruta):
+                ...
+        """
+        inicio = time.perf_counter()
+        estado = "ok"
+        try:
+            yield
+        except Exception:
+            estado = "error"
+            self.incrementar("fallos", etapa=etapa)
+            raise
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.observar("etapa_segundos", duracion, etapa=etapa)
+            logger.debug("span", extra={"campos": {"etapa": etapa, "segundos": round(duracion, 6),
+                                                   "estado": estado, **campos}})
+
+    def exportar_prometheus(self):
+        """
+        Returns:
+            str: Métricas en formato de texto de Prometheus
+        """
+        lineas = []
+
+        with self._lock:
+            for (nombre, etiquetas), valor in sorted(self.contadores.items()):
+                lineas.append(f"{PREFIJO}_{nombre}_total{_formatear_etiquetas(etiquetas)} {valor}")
+
+            for (nombre, etiquetas), valor in sorted(self.valores.items()):
+                lineas.append(f"{PREFIJO}_{nombre}{_formatear_etiquetas(etiquetas)} {valor}")
+
+            for (nombre, etiquetas), histograma in sorted(self.histogramas.items()):
+                acumulado = 0
+                for limite, conteo in zip(histograma.buckets + ("+Inf",), histograma.conteos):
+                    acumulado += conteo
+                    lineas.append(
+                        f"{PREFIJO}_{nombre}_bucket{_formatear_etiquetas(etiquetas, {'le': limite})} {acumulado}"
+                    )
+                lineas.append(f"{PREFIJO}_{nombre}_sum{_formatear_etiquetas(etiquetas)} {histograma.suma}")
+                lineas.append(f"{PREFIJO}_{nombre}_count{_formatear_etiquetas(etiquetas)} {histograma.total}")
+
+        return "\n".join(lineas) + "\n"
+
+    def exportar_json(self):
+        """
+        Returns:
+            dict con contadores, valores e histogramas (con p50/p95/p99 aproximados)
+        """
+        with self._lock:
+            return {
+                "contadores": [
+                    {"nombre": nombre, "etiquetas": dict(etiquetas), "valor": valor}
+                    for (nombre, etiquetas), valor in sorted(self.contadores.items())
+                ],
+                "valores": [
+                    {"nombre": nombre, "etiquetas": dict(etiquetas), "valor": valor}
+                    for (nombre, etiquetas), valor in sorted(self.valores.items())
+                ],
+                "histogramas": [
+                    {
+                        "nombre": nombre,
+                        "etiquetas": dict(etiquetas),
+                        "total": h.total,
+                        "suma": h.suma,
+                        "p50": h.percentil(50),
+                        "p95": h.percentil(95),
+                        "p99": h.percentil(99),
+                        "buckets": dict(zip([str(b) for b in h.buckets] + ["+Inf"], h.conteos))
+                    }
+                    for (nombre, etiquetas), h in sorted(self.histogramas.items())
+                ]
+            }
+
+    def guardar(self, ruta):
+        """Guarda las métricas: .json en JSON, cualquier otra extensión en formato Prometheus"""
+        with open(ruta, "w", encoding="utf-8") as f:
+            if ruta.endswith(".json"):
+                json.dump(self.exportar_json(), f, ensure_ascii=False, indent=2)
+            else:
+                f.write(self.exportar_prometheus())
+
+    def reiniciar(self):
+        with self._lock:
+            self.contadores.clear()
+            self.histogramas.clear()
+            self.valores.clear()
+
+
+# Registro global compartido por todos los componentes
+METRICAS = Metrics()
+
+
+class _FormatoJSON(logging.Formatter):
+    """Una línea JSON por evento"""
+
+    def format(self, record):
+        evento = {
+            "ts": round(record.created, 3),
+            "nivel": record.levelname.lower(),
+            "mensaje": record.getMessage()
+        }
+        evento.update(getattr(record, "campos", {}))
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+def configurar_logging(formato=None, nivel=None, ruta=None):
+    """
+    Activa el log estructurado en lugar de los prints
+
+    Args:
+        formato: 'json' o 'texto' (None = variable CONTRACTS_LOG, si no hay se siguen usando prints)
+        nivel: Nivel de logging ('INFO', 'DEBUG'...; DEBUG incluye un evento por span)
+        ruta: Archivo de log (None = stderr)
+    """
+    formato = formato or os.environ.get("CONTRACTS_LOG")
+    if not formato:
+        return
+
+    handler = logging.FileHandler(ruta, encoding="utf-8") if ruta else logging.StreamHandler()
+    if formato == "json":
+        handler.setFormatter(_FormatoJSON())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+
+    logger.handlers = [handler]
+    logger.setLevel(nivel or os.environ.get("CONTRACTS_LOG_LEVEL", "INFO"))
+    logger.propagate = False
+
+
+def log(mensaje, nivel=logging.INFO, **campos):
+    """
+    Reporta un evento: por log estructurado si está configurado, si no con print
+
+    Args:
+        mensaje: Texto para humanos (el mismo que antes iba al print)
+        **campos: Datos del evento para el log estructurado
+    """
+    if logger.handlers:
+        logger.log(nivel, mensaje, extra={"campos": campos})
+    else:
+        print(mensaje)
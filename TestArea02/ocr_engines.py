@@ -0,0 +1,331 @@
+import os
+
+
+# Códigos de idioma de cada motor a partir del código corto ('en', 'es')
+_IDIOMAS_TESSERACT = {"en": "eng", "es": "spa"}
+
+
+class OCREngine:
+    """
+    RESPONSABILIDAD: Interfaz común para todos los motores OCR
+
+    ¿Qué hace?
+    - Define recognize_batch(images) para procesar varias imágenes a la vez
+    - Cada imagen puede ser una ruta, una imagen PIL o un array de NumPy
+    - Devuelve, por imagen, un dict con:
+        - texto: Texto completo (líneas unidas con saltos de línea)
+        - lineas: Lista con el texto de cada línea
+        - cajas: Lista de cajas [[x, y], [x, y], [x, y], [x, y]] por línea
+        - confianzas: Lista de scores (0-1) por línea
+
+    Cada motor calcula su confianza a su manera: un 0.8 de Tesseract y un
+    0.8 de Paddle no significan lo mismo, así que solo se comparan
+    confianzas del mismo motor. informa_confianza es False si el motor no
+    da ningún score real.
+    """
+
+    nombre = "base"
+    informa_confianza = True
+
+    def recognize_batch(self, images):
+        """
+        Reconoce texto en un lote de imágenes
+
+        Args:
+            images: Lista de rutas, imágenes PIL o arrays de NumPy
+
+        Returns:
+            list de dicts (uno por imagen, en el mismo orden)
+        """
+        raise NotImplementedError
+
+    def recognize(self, image):
+        """Atajo para reconocer una sola imagen"""
+        return self.recognize_batch([image])[0]
+
+
+def _resultado(lineas, cajas, confianzas):
+    """Construye el dict de resultado común a todos los motores"""
+    return {
+        "texto": "\n".join(lineas),
+        "lineas": lineas,
+        "cajas": cajas,
+        "confianzas": confianzas
+    }
+
+
+def _caja_desde_rectangulo(x, y, ancho, alto):
+    """Convierte (x, y, ancho, alto) en los 4 puntos de la caja"""
+    return [
+        [float(x), float(y)],
+        [float(x + ancho), float(y)],
+        [float(x + ancho), float(y + alto)],
+        [float(x), float(y + alto)]
+    ]
+
+
+def _a_array(image):
+    """Convierte ruta o imagen PIL en array RGB de NumPy"""
+    import numpy as np
+    from PIL import Image
+
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, (str, os.PathLike)):
+        image = Image.open(image)
+    return np.asarray(image.convert("RGB"))
+
+
+class PaddleOCREngine(OCREngine):
+    """Motor PaddleOCR (el que usa OCRProcessor por defecto)"""
+
+    nombre = "paddle"
+
+    def __init__(self, lang="en", **kwargs):
+        from paddleocr import PaddleOCR
+
+        self.ocr = PaddleOCR(use_angle_cls=True, lang=lang, **kwargs)
+
+    def recognize_batch(self, images):
+        resultados = []
+
+        for image in images:
+            # PaddleOCR acepta rutas o arrays BGR
+            if not isinstance(image, (str, os.PathLike)):
+                image = _a_array(image)
+                if image.ndim == 3:
+                    image = image[:, :, ::-1]
+
+            lineas, cajas, confianzas = [], [], []
+
+            # Un PDF devuelve varias páginas; se juntan en un solo resultado
+            for pagina in self.ocr.ocr(image):
+                if pagina is None:
+                    continue
+
+                for linea in pagina:
+                    cajas.append([[float(x), float(y)] for x, y in linea[0]])
+                    lineas.append(linea[1][0])
+                    confianzas.append(float(linea[1][1]))
+
+            resultados.append(_resultado(lineas, cajas, confianzas))
+
+        return resultados
+
+
+class TesseractEngine(OCREngine):
+    """Motor pytesseract (el que usa DocumentProcessor)"""
+
+    nombre = "tesseract"
+
+    def __init__(self, lang="en", tesseract_cmd=None):
+        import pytesseract
+
+        self.pytesseract = pytesseract
+        self.lang = _IDIOMAS_TESSERACT.get(lang, lang)
+
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    def recognize_batch(self, images):
+        from PIL import Image
+
+        resultados = []
+
+        for image in images:
+            if isinstance(image, (str, os.PathLike)):
+                image = Image.open(image)
+
+            datos = self.pytesseract.image_to_data(
+                image,
+                lang=self.lang,
+                output_type=self.pytesseract.Output.DICT
+            )
+
+            # Tesseract devuelve palabras; se agrupan por (bloque, párrafo, línea)
+            grupos = {}
+            for i, palabra in enumerate(datos["text"]):
+                confianza = float(datos["conf"][i])
+                if not palabra.strip() or confianza < 0:
+                    continue
+
+                clave = (datos["block_num"][i], datos["par_num"][i], datos["line_num"][i])
+                grupos.setdefault(clave, []).append(i)
+
+            lineas, cajas, confianzas = [], [], []
+            for indices in grupos.values():
+                izquierda = min(datos["left"][i] for i in indices)
+                arriba = min(datos["top"][i] for i in indices)
+                derecha = max(datos["left"][i] + datos["width"][i] for i in indices)
+                abajo = max(datos["top"][i] + datos["height"][i] for i in indices)
+
+                lineas.append(" ".join(datos["text"][i] for i in indices))
+                cajas.append(_caja_desde_rectangulo(izquierda, arriba, derecha - izquierda, abajo - arriba))
+                confianzas.append(sum(float(datos["conf"][i]) for i in indices) / len(indices) / 100)
+
+            resultados.append(_resultado(lineas, cajas, confianzas))
+
+        return resultados
+
+
+class EasyOCREngine(OCREngine):
+    """Motor EasyOCR"""
+
+    nombre = "easyocr"
+
+    def __init__(self, lang="en", gpu=False, batch_size=8):
+        import easyocr
+
+        idiomas = [lang] if lang == "en" else [lang, "en"]
+        self.reader = easyocr.Reader(idiomas, gpu=gpu)
+        self.batch_size = batch_size
+
+    def recognize_batch(self, images):
+        arrays = [_a_array(image) for image in images]
+        resultados = [None] * len(arrays)
+
+        # readtext_batched necesita imágenes del mismo tamaño: se agrupan por forma
+        grupos = {}
+        for i, array in enumerate(arrays):
+            grupos.setdefault(array.shape, []).append(i)
+
+        for indices in grupos.values():
+            salidas = self.reader.readtext_batched(
+                [arrays[i] for i in indices],
+                batch_size=self.batch_size
+            )
+
+            for i, salida in zip(indices, salidas):
+                lineas, cajas, confianzas = [], [], []
+                for bbox, texto, confianza in salida:
+                    cajas.append([[float(x), float(y)] for x, y in bbox])
+                    lineas.append(texto)
+                    confianzas.append(float(confianza))
+
+                resultados[i] = _resultado(lineas, cajas, confianzas)
+
+        return resultados
+
+
+class KerasOCREngine(OCREngine):
+    """
+    Motor keras-ocr
+
+    keras-ocr devuelve palabras sueltas y no expone confianza, así que las
+    palabras se agrupan en líneas por su posición vertical y la confianza
+    se reporta como 1.0.
+
+    Su reconocedor solo conoce el alfabeto inglés (sin acentos ni ñ): no
+    sirve para documentos en español.
+    """
+
+    nombre = "keras"
+    informa_confianza = False
+    idiomas = ("en",)
+
+    def __init__(self, lang="en"):
+        if lang not in self.idiomas:
+            raise ValueError(f"keras-ocr solo reconoce inglés, no '{lang}' (usa paddle, tesseract o easyocr)")
+
+        import keras_ocr
+
+        self.pipeline = keras_ocr.pipeline.Pipeline()
+
+    def recognize_batch(self, images):
+        arrays = [_a_array(image) for image in images]
+        resultados = []
+
+        for predicciones in self.pipeline.recognize(arrays):
+            lineas, cajas, confianzas = [], [], []
+
+            for palabras in _agrupar_en_lineas(predicciones):
+                xs = [float(p[0]) for _, caja in palabras for p in caja]
+                ys = [float(p[1]) for _, caja in palabras for p in caja]
+
+                lineas.append(" ".join(palabra for palabra, _ in palabras))
+                cajas.append(_caja_desde_rectangulo(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)))
+                confianzas.append(1.0)
+
+            resultados.append(_resultado(lineas, cajas, confianzas))
+
+        return resultados
+
+
+def _agrupar_en_lineas(predicciones):
+    """
+    Agrupa palabras [(texto, caja)] en líneas de lectura
+
+    Dos palabras están en la misma línea si su centro vertical cae dentro
+    de la altura de la línea actual.
+    """
+    ordenadas = sorted(predicciones, key=lambda p: (float(p[1][:, 1].mean()), float(p[1][:, 0].min())))
+
+    lineas = []
+    for palabra, caja in ordenadas:
+        centro = float(caja[:, 1].mean())
+
+        if lineas:
+            arriba, abajo = lineas[-1]["limites"]
+            if arriba <= centro <= abajo:
+                lineas[-1]["palabras"].append((palabra, caja))
+                continue
+
+        lineas.append({
+            "limites": (float(caja[:, 1].min()), float(caja[:, 1].max())),
+            "palabras": [(palabra, caja)]
+        })
+
+    return [sorted(linea["palabras"], key=lambda p: float(p[1][:, 0].min())) for linea in lineas]
+
+
+# Motores disponibles por nombre
+MOTORES = {
+    "paddle": PaddleOCREngine,
+    "tesseract": TesseractEngine,
+    "easyocr": EasyOCREngine,
+    "keras": KerasOCREngine
+}
+
+
+def resolver_nombre_motor(clase_documento=None, default="paddle"):
+    """
+    Decide qué motor usar en este despliegue
+
+    Orden de prioridad:
+    1. Variable OCR_ENGINE_<CLASE> (ej: OCR_ENGINE_FACTURA=tesseract)
+    2. Variable OCR_ENGINE
+    3. default
+
+    Args:
+        clase_documento: Clase de documento (opcional)
+        default: Motor a usar si no hay configuración
+
+    Returns:
+        str: Nombre del motor
+    """
+    if clase_documento:
+        nombre = os.environ.get(f"OCR_ENGINE_{clase_documento.upper()}")
+        if nombre:
+            return nombre
+
+    return os.environ.get("OCR_ENGINE", default)
+
+
+def crear_motor(nombre=None, clase_documento=None, **kwargs):
+    """
+    Crea un motor OCR por nombre
+
+    Args:
+        nombre: 'paddle', 'tesseract', 'easyocr' o 'keras' (None = según entorno)
+        clase_documento: Clase de documento para elegir el motor (opcional)
+        **kwargs: Parámetros del motor (ej: lang)
+
+    Returns:
+        OCREngine
+    """
+    nombre = nombre or resolver_nombre_motor(clase_documento)
+
+    if nombre not in MOTORES:
+        raise ValueError(f"Motor OCR no soportado: {nombre} (opciones: {', '.join(MOTORES)})")
+
+    return MOTORES[nombre](**kwargs)
@@ -1,4 +1,9 @@
-from paddleocr import PaddleOCR
+import os
+
+from metrics import METRICAS, log
+from ocr_engines import OCREngine, crear_motor
+from ocr_result import ResultadoOCR
+from preprocessing import ImagePreprocessor, mapear_a_original, redimensionar
 
 
 class OCRProcessor:
@@ -7,18 +12,73 @@ class OCRProcessor:
 
     ¿Qué hace?
     - Recibe una imagen (PNG, JPG, PDF)
-    - Usa PaddleOCR para extraer texto
-    - Devuelve el texto completo y la confianza promedio
+    - Prepara la imagen (DPI, grises, enderezado, recorte) y salta páginas en blanco
+    - Usa un motor OCR (PaddleOCR por defecto) para extraer texto
+    - Devuelve el texto completo, la confianza promedio y cada línea con su
+      caja (en coordenadas de la imagen original) y su confianza
+    - Opcional: vuelve a leer solo las líneas de baja confianza con un motor
+      más lento/mejor o a más resolución, y se queda con la mejor lectura
     """
 
-    def __init__(self, lang='en'):
+    def __init__(self, lang='en', engine=None, batch_size=8, preprocess=True, preprocess_config=None,
+                 umbral_revision=None, motor_revision=None, escala_revision=2.0, margen_revision=4,
+                 umbral_aceptacion=None):
         """
         Inicializa el motor OCR
 
         Args:
             lang: Idioma ('en' para inglés, 'es' para español)
+            engine: Nombre del motor ('paddle', 'tesseract', 'easyocr', 'keras'),
+                    una instancia de OCREngine, o None para usar OCR_ENGINE
+            batch_size: Cuántas imágenes enviar juntas al motor
+            preprocess: Preprocesar las imágenes antes del OCR
+            preprocess_config: dict que pisa la configuración del motor
+                               (ver preprocessing.CONFIG_DEFAULT)
+            umbral_revision: Líneas con confianza menor se vuelven a leer
+                             (None = variable OCR_REVISION_UMBRAL o sin segunda pasada)
+            motor_revision: Motor de la segunda pasada (nombre o OCREngine;
+                            None = variable OCR_REVISION_ENGINE o el mismo motor)
+            escala_revision: Resolución del recorte respecto a lo que vio el
+                             primer motor (2.0 = el doble de DPI)
+            margen_revision: Píxeles alrededor de cada línea recortada
+            umbral_aceptacion: Confianza mínima (en la escala del motor de
+                               revisión) para aceptar la relectura de otro motor
+                               (None = variable OCR_REVISION_ACEPTACION o umbral_revision)
         """
-        self.ocr = PaddleOCR(use_angle_cls=True, lang=lang)
+        if isinstance(engine, OCREngine):
+            self.motor = engine
+        else:
+            self.motor = crear_motor(engine, lang=lang)
+
+        self.batch_size = batch_size
+
+        self.preprocesador = None
+        if preprocess:
+            self.preprocesador = ImagePreprocessor(config=preprocess_config, motor=self.motor.nombre)
+
+        if umbral_revision is None and os.environ.get("OCR_REVISION_UMBRAL"):
+            umbral_revision = float(os.environ["OCR_REVISION_UMBRAL"])
+        self.umbral_revision = umbral_revision
+        if umbral_aceptacion is None and os.environ.get("OCR_REVISION_ACEPTACION"):
+            umbral_aceptacion = float(os.environ["OCR_REVISION_ACEPTACION"])
+        self.umbral_aceptacion = umbral_aceptacion if umbral_aceptacion is not None else umbral_revision
+        self.escala_revision = escala_revision
+        self.margen_revision = margen_revision
+
+        # El motor de revisión se crea recién cuando hay una línea para revisar
+        self._motor_revision = motor_revision or os.environ.get("OCR_REVISION_ENGINE") or self.motor
+        self._lang = lang
+
+        if umbral_revision is not None and not self.motor.informa_confianza:
+            log(f"⚠️ {self.motor.nombre} no informa confianza: ninguna línea va a bajar del umbral de revisión",
+                evento="ocr_revision_sin_confianza", motor=self.motor.nombre)
+
+    @property
+    def motor_revision(self):
+        if not isinstance(self._motor_revision, OCREngine):
+            with METRICAS.span("carga_ocr_revision"):
+                self._motor_revision = crear_motor(self._motor_revision, lang=self._lang)
+        return self._motor_revision
 
     def extraer_texto(self, ruta_imagen):
         """
@@ -32,26 +92,206 @@ class OCRProcessor:
                 - texto_completo: Todo el texto extraído
                 - confianza: Score promedio de confianza (0-1)
                 - num_lineas: Cantidad de líneas detectadas
+                - lineas: Texto de cada línea
+                - cajas: Caja de cada línea (4 puntos en la imagen original)
+                - confianzas: Confianza de cada línea
+                - revision: dict con revisadas y mejoradas (segunda pasada)
+        """
+        return self.extraer_textos([ruta_imagen])[0]
+
+    def extraer_textos(self, rutas_imagenes):
+        """
+        Extrae texto de varias imágenes enviándolas al motor por lotes
+
+        Args:
+            rutas_imagenes: Lista de rutas a archivos de imagen
+
+        Returns:
+            list de dicts (mismo formato que extraer_texto)
+        """
+        return [self._resumir(resultado) for _, resultado in self._reconocer(rutas_imagenes)]
+
+    def extraer_resultado(self, rutas_imagenes):
+        """
+        Extrae texto de las páginas de un documento a un ResultadoOCR
+
+        A diferencia de extraer_textos no arma listas, strings y floats por
+        línea: cada página pasa a los arrays apenas sale del motor.
+
+        Args:
+            rutas_imagenes: Lista de rutas (una por página)
+
+        Returns:
+            ResultadoOCR con todas las páginas
+        """
+        def paginas():
+            for _, resultado in self._reconocer(rutas_imagenes):
+                METRICAS.incrementar("lineas_ocr", len(resultado["lineas"]))
+                yield resultado
+
+        resultado = ResultadoOCR.desde_paginas(paginas())
+        log(f"✅ Extraídas {len(resultado)} líneas de {resultado.num_paginas} páginas", evento="ocr_lineas",
+            lineas=len(resultado), paginas=resultado.num_paginas)
+        log(f"📊 Confianza: {resultado.confianza:.2%}", evento="ocr_confianza", confianza=resultado.confianza)
+        return resultado
+
+    def _reconocer(self, rutas_imagenes):
+        """
+        Preprocesa y reconoce por lotes
+
+        Yields:
+            tuple (ruta, resultado del motor)
+        """
+        for inicio in range(0, len(rutas_imagenes), self.batch_size):
+            lote = rutas_imagenes[inicio:inicio + self.batch_size]
+
+            for ruta_imagen in lote:
+                log(f"🔍 Procesando imagen: {ruta_imagen}", evento="ocr_inicio", archivo=str(ruta_imagen))
+
+            # Preparar imágenes; las páginas en blanco no van al motor
+            with METRICAS.span("ocr_preprocesamiento", imagenes=len(lote)):
+                preparadas = [self._preparar(ruta_imagen) for ruta_imagen in lote]
+            pendientes = [entrada for entrada, _ in preparadas if entrada is not None]
+
+            # Ejecutar OCR sobre el lote completo
+            with METRICAS.span("ocr_reconocimiento", motor=self.motor.nombre, imagenes=len(pendientes)):
+                reconocidos = iter(self.motor.recognize_batch(pendientes) if pendientes else [])
+
+            METRICAS.incrementar("paginas", len(lote))
+            METRICAS.incrementar("paginas_en_blanco", len(lote) - len(pendientes))
+
+            resultados = []
+            for entrada, preparada in preparadas:
+                if entrada is None:
+                    log("⚪ Página en blanco, se omite", evento="ocr_pagina_en_blanco")
+                    resultados.append({"lineas": [], "cajas": [], "confianzas": []})
+                    continue
+
+                resultado = next(reconocidos)
+                # Cajas en coordenadas de la imagen original (no de la preprocesada)
+                if preparada is not None:
+                    resultado["cajas"] = [mapear_a_original(caja, preparada).tolist() for caja in resultado["cajas"]]
+                resultados.append(resultado)
+
+            if self.umbral_revision is not None:
+                self._revisar(lote, preparadas, resultados)
+
+            yield from zip(lote, resultados)
+
+    def _preparar(self, ruta_imagen):
+        """
+        Preprocesa una imagen para el motor
+
+        Returns:
+            tuple (entrada, preparada): entrada es el array listo para el motor,
+            la ruta original (PDFs o sin preprocesamiento), o None si la página
+            está en blanco; preparada es el dict del preprocesador (o None)
         """
-        print(f"🔍 Procesando imagen: {ruta_imagen}")
+        if self.preprocesador is None or str(ruta_imagen).lower().endswith('.pdf'):
+            return ruta_imagen, None
+
+        preparada = self.preprocesador.procesar(ruta_imagen)
+        return preparada['imagen'], preparada
+
+    def _revisar(self, lote, preparadas, resultados):
+        """
+        Segunda pasada: recorta de la imagen original las líneas de baja
+        confianza, las vuelve a leer y se queda con la lectura más confiable
+
+        Todos los recortes del lote van juntos al motor de revisión. Los PDF
+        no se revisan (el motor los lee directo, sin imagen por página).
+
+        Las confianzas solo se comparan dentro de un mismo motor:
+        - Mismo motor (a más resolución): gana la lectura de mayor confianza
+        - Otro motor: su lectura se acepta si pasa umbral_aceptacion en su
+          propia escala (si el motor no informa confianza, se acepta siempre:
+          es el motor elegido como referencia). La línea conserva la
+          confianza del primer motor, así la confianza del documento sigue
+          en una sola escala.
+        """
+        import numpy as np
+        from PIL import Image
+
+        recortes = []
+        ubicaciones = []  # (resultado, índice de línea)
+
+        for ruta_imagen, (entrada, preparada), resultado in zip(lote, preparadas, resultados):
+            if entrada is None or str(ruta_imagen).lower().endswith('.pdf'):
+                continue
+
+            bajas = [i for i, confianza in enumerate(resultado["confianzas"]) if confianza < self.umbral_revision]
+            resultado["revision"] = {"revisadas": len(bajas), "mejoradas": 0}
+            if not bajas:
+                continue
+
+            original = np.asarray(Image.open(ruta_imagen).convert("RGB"))
+            alto, ancho = original.shape[:2]
+            # Escala del recorte respecto a la original: escala_revision veces lo que vio el motor
+            factor = self.escala_revision * (preparada["escala"] if preparada else 1.0)
 
-        # Ejecutar OCR
-        resultado = self.ocr.ocr(ruta_imagen)
+            for i in bajas:
+                caja = np.asarray(resultado["cajas"][i])
+                x0 = max(int(caja[:, 0].min()) - self.margen_revision, 0)
+                y0 = max(int(caja[:, 1].min()) - self.margen_revision, 0)
+                x1 = min(int(np.ceil(caja[:, 0].max())) + self.margen_revision, ancho)
+                y1 = min(int(np.ceil(caja[:, 1].max())) + self.margen_revision, alto)
+                if x1 - x0 < 2 or y1 - y0 < 2:
+                    continue
 
-        # Extraer texto y confianzas
-        texto_lineas = []
-        confianzas = []
+                recorte = original[y0:y1, x0:x1]
+                if abs(factor - 1.0) > 0.02:
+                    recorte = redimensionar(np.ascontiguousarray(recorte), factor)
+                recortes.append(np.ascontiguousarray(recorte))
+                ubicaciones.append((resultado, i))
 
-        for pagina in resultado:
-            if pagina is None:
+        if not recortes:
+            return
+
+        motor = self.motor_revision
+        with METRICAS.span("ocr_revision", motor=motor.nombre, lineas=len(recortes)):
+            relecturas = motor.recognize_batch(recortes)
+
+        mismo_motor = motor.nombre == self.motor.nombre
+
+        mejoradas = 0
+        for (resultado, i), relectura in zip(ubicaciones, relecturas):
+            if not relectura["lineas"]:
                 continue
 
-            for linea in pagina:
-                texto = linea[1][0]  # El texto
-                confianza = linea[1][1]  # Score de confianza
+            # El recorte es una línea, pero el motor puede partirla en varias
+            texto = " ".join(relectura["lineas"])
+            confianza = sum(relectura["confianzas"]) / len(relectura["confianzas"])
+
+            if mismo_motor:
+                aceptada = confianza > resultado["confianzas"][i]
+            else:
+                aceptada = not motor.informa_confianza or confianza >= self.umbral_aceptacion
 
-                texto_lineas.append(texto)
-                confianzas.append(confianza)
+            if aceptada:
+                resultado["lineas"][i] = texto
+                if mismo_motor:
+                    resultado["confianzas"][i] = confianza
+                resultado["revision"]["mejoradas"] += 1
+                mejoradas += 1
+
+        METRICAS.incrementar("lineas_revisadas", len(recortes), motor=motor.nombre)
+        METRICAS.incrementar("lineas_mejoradas", mejoradas, motor=motor.nombre)
+        log(f"🔁 Revisadas {len(recortes)} líneas de baja confianza, {mejoradas} mejoradas",
+            evento="ocr_revision", revisadas=len(recortes), mejoradas=mejoradas)
+
+    def _resumir(self, resultado):
+        """
+        Convierte el resultado del motor en el formato de extraer_texto
+
+        Args:
+            resultado: dict del motor (lineas, cajas, confianzas)
+
+        Returns:
+            dict con texto_completo, confianza, num_lineas y el detalle por
+            línea (lineas, cajas, confianzas, revision)
+        """
+        texto_lineas = resultado['lineas']
+        confianzas = resultado['confianzas']
 
         # Calcular confianza promedio
         confianza_promedio = sum(confianzas) / len(confianzas) if confianzas else 0
@@ -59,11 +299,16 @@ class OCRProcessor:
         # Unir todo el texto
         texto_completo = "\n".join(texto_lineas)
 
-        print(f"✅ Extraídas {len(texto_lineas)} líneas")
-        print(f"📊 Confianza: {confianza_promedio:.2%}")
+        METRICAS.incrementar("lineas_ocr", len(texto_lineas))
+        log(f"✅ Extraídas {len(texto_lineas)} líneas", evento="ocr_lineas", lineas=len(texto_lineas))
+        log(f"📊 Confianza: {confianza_promedio:.2%}", evento="ocr_confianza", confianza=confianza_promedio)
 
         return {
             "texto_completo": texto_completo,
             "confianza": confianza_promedio,
-            "num_lineas": len(texto_lineas)
+            "num_lineas": len(texto_lineas),
+            "lineas": texto_lineas,
+            "cajas": resultado['cajas'],
+            "confianzas": confianzas,
+            "revision": resultado.get('revision', {"revisadas": 0, "mejoradas": 0})
         }
\ No newline at end of file
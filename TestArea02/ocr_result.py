@@ -0,0 +1,298 @@
+import struct
+
+import numpy as np
+
+
+MAGIA = b"OCRR"
+VERSION = 1
+
+# magia, versión, líneas, páginas, bytes de texto (24 bytes: los arrays quedan alineados a 8)
+_CABECERA = struct.Struct("<4sHxxIIQ")
+
+
+class ResultadoOCR:
+    """
+    RESPONSABILIDAD: Guardar el resultado OCR de un documento en poco espacio
+
+    ¿Qué hace?
+    - Cajas (n, 4, 2), confianzas y página de cada línea en arrays de NumPy
+    - Todo el texto en un único buffer UTF-8, con el offset de inicio y fin
+      de cada línea (las líneas se unen con "\\n" y las páginas con "\\n\\n",
+      igual que OCRProcessor)
+    - pagina(p) devuelve una vista: los arrays son slices y el buffer es el
+      mismo, no se copia nada
+    - Se serializa a un único blob (a_bytes / desde_bytes): al leerlo los
+      arrays apuntan directo al blob
+
+    Así la memoria depende de los caracteres y no de la cantidad de líneas:
+    un escaneo de 200 páginas son unos pocos arrays, no millones de listas,
+    strings y floats sueltos.
+    """
+
+    def __init__(self, texto, inicios, finales, cajas, confianzas, paginas, rangos_paginas, rango=None,
+                 base_pagina=0):
+        """
+        No se llama directo: usar desde_paginas o desde_bytes
+
+        Args:
+            texto: Buffer UTF-8 (bytes o memoryview) con el texto de todas las páginas
+            inicios, finales: Offset en bytes de cada línea dentro del buffer
+            cajas: float32 (n, 4, 2) en coordenadas de la imagen original
+            confianzas: float32 (n,)
+            paginas: int32 (n,) página de cada línea (ordenadas)
+            rangos_paginas: int64 (páginas, 2) inicio y fin de cada página en el buffer
+            rango: (inicio, fin) del buffer que cubre este resultado (None = todo)
+            base_pagina: Número de la primera página (en una vista, 'paginas' sigue
+                con la numeración del documento completo)
+        """
+        self._texto = texto
+        self.inicios = inicios
+        self.finales = finales
+        self.cajas = cajas
+        self.confianzas = confianzas
+        self.paginas = paginas
+        self.rangos_paginas = rangos_paginas
+        self._rango = rango or (0, len(texto))
+        self._base = base_pagina
+
+    # ==========================================
+    # CONSTRUCCIÓN
+    # ==========================================
+
+    @classmethod
+    def desde_paginas(cls, paginas):
+        """
+        Arma el resultado a partir de lo que devuelven los motores
+
+        Args:
+            paginas: Iterable de dicts con lineas, cajas y confianzas (uno por página)
+
+        Returns:
+            ResultadoOCR
+        """
+        partes = []
+        inicios, finales, cajas, confianzas, numeros = [], [], [], [], []
+        rangos = []
+        posicion = 0
+
+        for numero, pagina in enumerate(paginas):
+            if numero:
+                partes.append(b"\n\n")
+                posicion += 2
+            inicio_pagina = posicion
+
+            for i, linea in enumerate(pagina["lineas"]):
+                if i:
+                    partes.append(b"\n")
+                    posicion += 1
+                datos = linea.encode("utf-8")
+                partes.append(datos)
+                inicios.append(posicion)
+                posicion += len(datos)
+                finales.append(posicion)
+
+            rangos.append((inicio_pagina, posicion))
+            n = len(pagina["lineas"])
+            if n:
+                cajas.append(_cajas_a_array(pagina["cajas"], n))
+                confianzas.append(np.asarray(pagina["confianzas"], dtype=np.float32))
+                numeros.append(np.full(n, numero, dtype=np.int32))
+
+        return cls(
+            b"".join(partes),
+            np.asarray(inicios, dtype=np.int64),
+            np.asarray(finales, dtype=np.int64),
+            np.concatenate(cajas) if cajas else np.zeros((0, 4, 2), dtype=np.float32),
+            np.concatenate(confianzas) if confianzas else np.zeros(0, dtype=np.float32),
+            np.concatenate(numeros) if numeros else np.zeros(0, dtype=np.int32),
+            np.asarray(rangos, dtype=np.int64).reshape(-1, 2)
+        )
+
+    # ==========================================
+    # LECTURA
+    # ==========================================
+
+    def __len__(self):
+        return len(self.inicios)
+
+    @property
+    def num_paginas(self):
+        return len(self.rangos_paginas)
+
+    @property
+    def texto_completo(self):
+        inicio, fin = self._rango
+        return bytes(self._texto[inicio:fin]).decode("utf-8")
+
+    @property
+    def confianza(self):
+        """Confianza promedio de las líneas (0 si no hay ninguna)"""
+        return float(self.confianzas.mean()) if len(self.confianzas) else 0.0
+
+    def inicio(self, caracteres):
+        """
+        Primeros caracteres del texto (decodifica solo esa parte del buffer)
+
+        Args:
+            caracteres: Cantidad de caracteres
+
+        Returns:
+            str
+        """
+        desde, hasta = self._rango
+        # Un carácter UTF-8 ocupa como mucho 4 bytes; un corte a mitad de carácter se descarta
+        datos = bytes(self._texto[desde:min(hasta, desde + 4 * caracteres)])
+        return datos.decode("utf-8", errors="ignore")[:caracteres]
+
+    def segmentos(self):
+        """
+        Texto página por página, con el separador incluido: unidos dan
+        texto_completo (para guardarlo sin armar el texto entero)
+
+        Yields:
+            str
+        """
+        for numero, (desde, hasta) in enumerate(self.rangos_paginas.tolist()):
+            texto = bytes(self._texto[desde:hasta]).decode("utf-8")
+            yield "\n\n" + texto if numero else texto
+
+    def linea(self, i):
+        """Texto de la línea i"""
+        return bytes(self._texto[self.inicios[i]:self.finales[i]]).decode("utf-8")
+
+    def lineas(self):
+        """Texto de cada línea, en orden"""
+        for inicio, fin in zip(self.inicios.tolist(), self.finales.tolist()):
+            yield bytes(self._texto[inicio:fin]).decode("utf-8")
+
+    def pagina(self, numero):
+        """
+        Vista de una página (sin copiar arrays ni texto)
+
+        Args:
+            numero: Índice de la página dentro de este resultado
+
+        Returns:
+            ResultadoOCR con una sola página
+        """
+        absoluta = self._base + numero
+        desde, hasta = np.searchsorted(self.paginas, [absoluta, absoluta + 1])
+        rango = self.rangos_paginas[numero]
+        return ResultadoOCR(
+            self._texto,
+            self.inicios[desde:hasta], self.finales[desde:hasta],
+            self.cajas[desde:hasta], self.confianzas[desde:hasta], self.paginas[desde:hasta],
+            self.rangos_paginas[numero:numero + 1],
+            rango=(int(rango[0]), int(rango[1])),
+            base_pagina=absoluta
+        )
+
+    def region(self, x0, y0, x1, y1, pagina=None):
+        """
+        Líneas cuyo centro cae dentro de un rectángulo
+
+        Args:
+            x0, y0, x1, y1: Rectángulo en coordenadas de la imagen original
+            pagina: Limitar a una página (None = todas)
+
+        Returns:
+            ResultadoOCR nuevo con esas líneas (se copian solo ellas)
+        """
+        centros = self.cajas.mean(axis=1)
+        dentro = (centros[:, 0] >= x0) & (centros[:, 0] <= x1) & (centros[:, 1] >= y0) & (centros[:, 1] <= y1)
+        if pagina is not None:
+            dentro &= self.paginas == self._base + pagina
+
+        indices = np.flatnonzero(dentro)
+        paginas = [{"lineas": [], "cajas": [], "confianzas": []} for _ in range(self.num_paginas)]
+        for i in indices.tolist():
+            pagina_linea = paginas[int(self.paginas[i]) - self._base]
+            pagina_linea["lineas"].append(self.linea(i))
+            pagina_linea["cajas"].append(self.cajas[i])
+            pagina_linea["confianzas"].append(float(self.confianzas[i]))
+
+        return ResultadoOCR.desde_paginas(paginas)
+
+    def a_dict(self):
+        """Mismo formato que OCRProcessor.extraer_texto"""
+        return {
+            "texto_completo": self.texto_completo,
+            "confianza": self.confianza,
+            "num_lineas": len(self),
+            "lineas": list(self.lineas()),
+            "cajas": self.cajas.tolist(),
+            "confianzas": self.confianzas.tolist()
+        }
+
+    # ==========================================
+    # SERIALIZACIÓN
+    # ==========================================
+
+    def a_bytes(self):
+        """
+        Serializa a un único blob (para el almacén de contenido)
+
+        Returns:
+            bytes
+        """
+        inicio, fin = self._rango
+        texto = bytes(self._texto[inicio:fin])
+        n = len(self)
+
+        return b"".join([
+            _CABECERA.pack(MAGIA, VERSION, n, self.num_paginas, len(texto)),
+            (self.inicios - inicio).astype("<i8").tobytes(),
+            (self.finales - inicio).astype("<i8").tobytes(),
+            (self.rangos_paginas - inicio).astype("<i8").tobytes(),
+            self.cajas.astype("<f4").tobytes(),
+            self.confianzas.astype("<f4").tobytes(),
+            (self.paginas - self._base).astype("<i4").tobytes(),
+            texto
+        ])
+
+    @classmethod
+    def desde_bytes(cls, blob):
+        """
+        Lee un blob de a_bytes sin copiar: los arrays son vistas sobre el blob
+
+        Args:
+            blob: bytes, bytearray o memoryview
+
+        Returns:
+            ResultadoOCR
+        """
+        blob = memoryview(blob)
+        magia, version, n, num_paginas, bytes_texto = _CABECERA.unpack_from(blob)
+        if magia != MAGIA:
+            raise ValueError("El blob no es un resultado OCR")
+        if version != VERSION:
+            raise ValueError(f"Versión de resultado OCR no soportada: {version}")
+
+        posicion = _CABECERA.size
+
+        def leer(tipo, cantidad, forma=None):
+            nonlocal posicion
+            array = np.frombuffer(blob, dtype=tipo, count=cantidad, offset=posicion)
+            posicion += array.nbytes
+            return array.reshape(forma) if forma else array
+
+        inicios = leer("<i8", n)
+        finales = leer("<i8", n)
+        rangos = leer("<i8", num_paginas * 2, (num_paginas, 2))
+        cajas = leer("<f4", n * 8, (n, 4, 2))
+        confianzas = leer("<f4", n)
+        paginas = leer("<i4", n)
+        texto = blob[posicion:posicion + bytes_texto]
+
+        return cls(texto, inicios, finales, cajas, confianzas, paginas, rangos)
+
+    def __reduce__(self):
+        # pickle (ProcessPool, caché) manda el blob en lugar de los objetos
+        return ResultadoOCR.desde_bytes, (self.a_bytes(),)
+
+
+def _cajas_a_array(cajas, n):
+    """Cajas de un motor (listas de 4 puntos) → float32 (n, 4, 2)"""
+    if len(cajas) != n:
+        return np.zeros((n, 4, 2), dtype=np.float32)  # Motor sin cajas
+    return np.asarray(cajas, dtype=np.float32).reshape(n, 4, 2)
@@ -0,0 +1,308 @@
+import os
+
+import numpy as np
+
+
+# Configuración recomendada por motor
+# - dpi: resolución a la que el motor rinde mejor (se reduce si la imagen es mayor)
+# - gris: entregar la imagen en escala de grises (si no, se mantiene el color)
+# - binarizar: umbral adaptativo (blanco/negro)
+# - enderezar: corregir inclinación de la hoja
+# - recortar: quitar márgenes en blanco
+CONFIG_POR_MOTOR = {
+    "paddle": {"dpi": 200, "gris": True, "binarizar": False, "enderezar": True, "recortar": True},
+    "tesseract": {"dpi": 300, "gris": True, "binarizar": True, "enderezar": True, "recortar": True},
+    "easyocr": {"dpi": 200, "gris": True, "binarizar": False, "enderezar": True, "recortar": True},
+    "keras": {"dpi": 150, "gris": False, "binarizar": False, "enderezar": True, "recortar": True},
+}
+
+CONFIG_DEFAULT = {
+    "dpi": 300,
+    "dpi_origen": 300,         # Se asume si la imagen no trae DPI
+    "gris": True,
+    "binarizar": False,
+    "enderezar": True,
+    "recortar": True,
+    "margen_recorte": 10,      # Píxeles que se dejan alrededor del texto
+    "ventana_binarizado": 31,  # Lado de la ventana del umbral adaptativo
+    "sensibilidad": 0.15,      # Cuánto más oscuro que su entorno debe ser un píxel de texto
+    "angulo_maximo": 5.0,      # Inclinación máxima que se busca (grados)
+    "paso_angulo": 0.25,
+    "umbral_tinta": 160,       # Gris por debajo del cual un píxel cuenta como tinta
+    "min_tinta": 0.002,        # Fracción mínima de tinta para que la página no esté en blanco
+}
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+def _a_array(image):
+    """Convierte ruta, imagen PIL o array en array de NumPy y devuelve su DPI (o None)"""
+    from PIL import Image
+
+    if isinstance(image, np.ndarray):
+        return image, None
+    if isinstance(image, (str, os.PathLike)):
+        image = Image.open(image)
+
+    dpi = image.info.get("dpi", (None,))[0]
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+
+    return np.asarray(image), dpi
+
+
+def a_gris(array):
+    """Escala de grises por luminancia (sin bucles por píxel)"""
+    if array.ndim == 2:
+        return array
+    return (array[..., :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)).astype(np.uint8)
+
+
+def redimensionar(array, escala):
+    """Reduce (o amplía) un array con interpolación por área"""
+    alto, ancho = array.shape[:2]
+    nuevo = (max(int(round(ancho * escala)), 1), max(int(round(alto * escala)), 1))
+
+    if cv2 is not None:
+        interpolacion = cv2.INTER_AREA if escala < 1 else cv2.INTER_CUBIC
+        return cv2.resize(array, nuevo, interpolation=interpolacion)
+
+    from PIL import Image
+    filtro = Image.BOX if escala < 1 else Image.BICUBIC
+    return np.asarray(Image.fromarray(array).resize(nuevo, filtro))
+
+
+def binarizar(gris, ventana=31, sensibilidad=0.15):
+    """
+    Umbral adaptativo (Bradley): un píxel es texto si es más oscuro que
+    la media de su ventana en más de `sensibilidad`
+
+    La media local se calcula con una imagen integral, así que el costo no
+    depende del tamaño de la ventana.
+    """
+    if cv2 is not None:
+        c = int(round(sensibilidad * 255 / 2))
+        return cv2.adaptiveThreshold(
+            gris, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, ventana | 1, c
+        )
+
+    alto, ancho = gris.shape
+    radio = ventana // 2
+
+    integral = np.zeros((alto + 1, ancho + 1), dtype=np.float64)
+    integral[1:, 1:] = gris.cumsum(axis=0).cumsum(axis=1)
+
+    filas = np.arange(alto)
+    columnas = np.arange(ancho)
+    y0 = np.clip(filas - radio, 0, alto)[:, None]
+    y1 = np.clip(filas + radio + 1, 0, alto)[:, None]
+    x0 = np.clip(columnas - radio, 0, ancho)[None, :]
+    x1 = np.clip(columnas + radio + 1, 0, ancho)[None, :]
+
+    suma = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    media = suma / ((y1 - y0) * (x1 - x0))
+
+    return np.where(gris < media * (1 - sensibilidad), 0, 255).astype(np.uint8)
+
+
+def estimar_inclinacion(tinta, angulo_maximo=5.0, paso=0.25, max_puntos=50000):
+    """
+    Estima la inclinación del texto con perfiles de proyección
+
+    Para cada ángulo candidato se proyectan los píxeles de tinta sobre el eje
+    vertical; cuando el ángulo es correcto las líneas de texto caen en pocas
+    filas y la varianza del histograma es máxima. Todos los ángulos se
+    evalúan a la vez con una sola matriz.
+
+    Args:
+        tinta: Máscara booleana (True = tinta)
+
+    Returns:
+        float: Ángulo en grados a rotar para enderezar
+    """
+    ys, xs = np.nonzero(tinta)
+    if len(ys) < 50:
+        return 0.0
+
+    if len(ys) > max_puntos:
+        indices = np.random.default_rng(0).choice(len(ys), max_puntos, replace=False)
+        ys, xs = ys[indices], xs[indices]
+
+    angulos = np.arange(-angulo_maximo, angulo_maximo + paso / 2, paso)
+    tangentes = np.tan(np.radians(angulos))
+
+    # Fila proyectada de cada punto para cada ángulo (angulos × puntos)
+    proyectadas = np.rint(ys[None, :] - xs[None, :] * tangentes[:, None]).astype(np.int64)
+    proyectadas -= proyectadas.min()
+    alto = int(proyectadas.max()) + 1
+
+    # Un histograma por ángulo usando un único bincount con desplazamiento
+    desplazadas = proyectadas + np.arange(len(angulos))[:, None] * alto
+    histogramas = np.bincount(desplazadas.ravel(), minlength=len(angulos) * alto).reshape(len(angulos), alto)
+
+    puntajes = (histogramas.astype(np.float64) ** 2).sum(axis=1)
+    return float(angulos[int(np.argmax(puntajes))])
+
+
+def rotar(array, angulo):
+    """Rota un array (grados, antihorario) rellenando con blanco"""
+    if cv2 is not None:
+        alto, ancho = array.shape[:2]
+        matriz = cv2.getRotationMatrix2D((ancho / 2, alto / 2), angulo, 1.0)
+        relleno = 255 if array.ndim == 2 else (255, 255, 255)
+        return cv2.warpAffine(
+            array, matriz, (ancho, alto), flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT, borderValue=relleno
+        )
+
+    from PIL import Image
+    relleno = 255 if array.ndim == 2 else (255, 255, 255)
+    return np.asarray(Image.fromarray(array).rotate(angulo, resample=Image.BILINEAR, fillcolor=relleno))
+
+
+def caja_de_contenido(tinta, margen=10):
+    """
+    Rectángulo que contiene toda la tinta
+
+    Returns:
+        tuple (y0, y1, x0, x1) o None si no hay tinta
+    """
+    filas = np.flatnonzero(tinta.any(axis=1))
+    columnas = np.flatnonzero(tinta.any(axis=0))
+
+    if len(filas) == 0:
+        return None
+
+    alto, ancho = tinta.shape
+    return (
+        max(int(filas[0]) - margen, 0),
+        min(int(filas[-1]) + margen + 1, alto),
+        max(int(columnas[0]) - margen, 0),
+        min(int(columnas[-1]) + margen + 1, ancho)
+    )
+
+
+def mapear_a_original(puntos, preparada):
+    """
+    Lleva puntos de la imagen preprocesada a la imagen original
+    (deshace el recorte, la rotación y la escala, en ese orden)
+
+    Args:
+        puntos: Lista o array de (x, y), ej: los 4 puntos de una caja del motor
+        preparada: dict devuelto por ImagePreprocessor.procesar
+
+    Returns:
+        np.ndarray (n, 2) con los puntos en coordenadas de la imagen original
+    """
+    puntos = np.asarray(puntos, dtype=np.float64).reshape(-1, 2) + preparada["desplazamiento"]
+
+    angulo = preparada["angulo"]
+    if angulo:
+        # rotar() gira alrededor del centro sin cambiar el tamaño: se aplica la rotación inversa
+        ancho, alto = preparada["tamano"]
+        centro = np.array([ancho / 2, alto / 2])
+        coseno, seno = np.cos(np.deg2rad(angulo)), np.sin(np.deg2rad(angulo))
+        dx, dy = (puntos - centro).T
+        puntos = np.stack([coseno * dx - seno * dy, seno * dx + coseno * dy], axis=1) + centro
+
+    return puntos / preparada["escala"]
+
+
+class ImagePreprocessor:
+    """
+    RESPONSABILIDAD: Preparar imágenes escaneadas antes del OCR
+
+    ¿Qué hace?
+    - Reduce la imagen a los DPI óptimos del motor
+    - Convierte a escala de grises y binariza de forma adaptativa
+    - Endereza hojas torcidas y recorta márgenes en blanco
+    - Detecta páginas en blanco para no enviarlas al motor
+    - Todo con operaciones vectorizadas de NumPy (u OpenCV si está instalado)
+    """
+
+    def __init__(self, config=None, motor=None):
+        """
+        Args:
+            config: dict con opciones (ver CONFIG_DEFAULT); pisa a las del motor
+            motor: Nombre del motor OCR para usar su configuración recomendada
+        """
+        self.config = dict(CONFIG_DEFAULT)
+        if motor:
+            self.config.update(CONFIG_POR_MOTOR.get(motor, {}))
+        if config:
+            self.config.update(config)
+
+    def procesar(self, image, dpi_origen=None):
+        """
+        Preprocesa una imagen
+
+        Args:
+            image: Ruta, imagen PIL o array de NumPy
+            dpi_origen: DPI de la imagen (None = leerlo de la imagen o asumir dpi_origen)
+
+        Returns:
+            dict con:
+                - imagen: Array listo para el motor (None si la página está en blanco)
+                - en_blanco: True si la página no tiene texto
+                - escala: Factor aplicado al tamaño original
+                - angulo: Grados rotados para enderezar
+                - desplazamiento: (x, y) del recorte respecto a la imagen escalada
+                - tamano: (ancho, alto) de la imagen escalada (centro de la rotación)
+        """
+        config = self.config
+        array, dpi_imagen = _a_array(image)
+        dpi_origen = dpi_origen or dpi_imagen or config["dpi_origen"]
+
+        # PASO 1: Reducir a los DPI del motor (nunca ampliar)
+        escala = min(config["dpi"] / dpi_origen, 1.0)
+        if escala < 0.98:
+            array = redimensionar(array, escala)
+        else:
+            escala = 1.0
+        tamano = (array.shape[1], array.shape[0])
+
+        gris = a_gris(array)
+        tinta = gris < config["umbral_tinta"]
+
+        # PASO 2: Página en blanco → no se envía al motor
+        if tinta.mean() < config["min_tinta"]:
+            return {"imagen": None, "en_blanco": True, "escala": escala, "angulo": 0.0, "desplazamiento": (0, 0),
+                    "tamano": tamano}
+
+        # PASO 3: Enderezar
+        angulo = 0.0
+        if config["enderezar"]:
+            angulo = estimar_inclinacion(tinta, config["angulo_maximo"], config["paso_angulo"])
+            if abs(angulo) >= config["paso_angulo"]:
+                array = rotar(array, angulo)
+                gris = a_gris(array)
+                tinta = gris < config["umbral_tinta"]
+            else:
+                angulo = 0.0
+
+        salida = gris if config["gris"] else array
+
+        # PASO 4: Binarizar
+        if config["binarizar"]:
+            salida = binarizar(gris, config["ventana_binarizado"], config["sensibilidad"])
+
+        # PASO 5: Recortar márgenes
+        desplazamiento = (0, 0)
+        if config["recortar"]:
+            caja = caja_de_contenido(tinta, config["margen_recorte"])
+            if caja is not None:
+                y0, y1, x0, x1 = caja
+                salida = salida[y0:y1, x0:x1]
+                desplazamiento = (x0, y0)
+
+        return {
+            "imagen": np.ascontiguousarray(salida),
+            "en_blanco": False,
+            "escala": escala,
+            "angulo": angulo,
+            "desplazamiento": desplazamiento,
+            "tamano": tamano
+        }
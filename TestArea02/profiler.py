@@ -0,0 +1,234 @@
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class _Muestreador:
+    """
+    Toma muestras de las pilas de todos los hilos cada cierto intervalo
+
+    Sirve para el formato de pilas colapsadas (flamegraph.pl, speedscope):
+    a diferencia de cProfile, ve también los hilos del planificador del LLM,
+    del OCR, etc., y se puede arrancar a mitad de un documento.
+    """
+
+    def __init__(self, intervalo=0.005):
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, name="perfil-muestreo", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join()
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pila.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    frame = frame.f_back
+                pila.append(nombres.get(ident, str(ident)))
+                self.pilas[";".join(reversed(pila))] += 1
+            self.muestras += 1
+
+    def guardar(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            for pila, cantidad in self.pilas.most_common():
+                f.write(f"{pila} {cantidad}\n")
+
+
+class _Captura:
+    """Todo lo que se mide de un documento mientras la captura está activa"""
+
+    def __init__(self, disparador, con_cprofile, intervalo):
+        self.disparador = disparador
+        self.desde = time.perf_counter()
+        self.perfil = cProfile.Profile() if con_cprofile else None
+        self.muestreador = _Muestreador(intervalo)
+        self.iniciado_tracemalloc = not tracemalloc.is_tracing()
+        if self.iniciado_tracemalloc:
+            tracemalloc.start(25)
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.take_snapshot()
+
+        self.muestreador.iniciar()
+        if self.perfil is not None:
+            self.perfil.enable()
+
+    def terminar(self):
+        if self.perfil is not None:
+            self.perfil.disable()
+        self.muestreador.detener()
+
+        self.final = tracemalloc.take_snapshot()
+        self.pico_bytes = tracemalloc.get_traced_memory()[1]
+        if self.iniciado_tracemalloc:
+            tracemalloc.stop()
+
+
+class Perfilador:
+    """
+    RESPONSABILIDAD: Perfilar documentos lentos o grandes sin frenar al resto
+
+    ¿Qué hace?
+    - Envuelve el procesamiento de cada documento (documento())
+    - Sin umbrales: captura todos los documentos
+    - umbral_mb: captura desde el inicio los archivos de ese tamaño o más
+    - umbral_segundos: si un documento pasa ese tiempo, empieza a capturar
+      en ese momento (hasta entonces solo hay un temporizador esperando)
+    - Por documento escribe:
+        <doc>.prof        cProfile del hilo que procesa (solo si la captura
+                          empezó con el documento: cProfile no se puede
+                          prender desde otro hilo)
+        <doc>.collapsed   Pilas colapsadas de todos los hilos (flame graph)
+        <doc>.alloc.txt   Lugares que más memoria reservaron
+    - Agrega una línea por documento capturado a resumen.jsonl
+    """
+
+    def __init__(self, carpeta="./perfiles", umbral_segundos=None, umbral_mb=None, intervalo=0.005,
+                 top_asignaciones=25):
+        """
+        Args:
+            carpeta: Dónde se guardan los perfiles
+            umbral_segundos: Capturar solo documentos que tarden más que esto
+            umbral_mb: Capturar solo archivos de este tamaño o más
+            intervalo: Segundos entre muestras de pilas
+            top_asignaciones: Lugares de asignación que se listan
+        """
+        self.carpeta = carpeta
+        self.umbral_segundos = umbral_segundos
+        self.umbral_mb = umbral_mb
+        self.intervalo = intervalo
+        self.top_asignaciones = top_asignaciones
+        self._lock = threading.Lock()  # tracemalloc y el muestreo son globales: un documento a la vez
+        os.makedirs(carpeta, exist_ok=True)
+
+    def _disparo_inicial(self, tamano_bytes):
+        """Motivo para capturar desde el principio (None = esperar al umbral de tiempo)"""
+        if self.umbral_segundos is None and self.umbral_mb is None:
+            return "siempre"
+        if self.umbral_mb is not None and tamano_bytes is not None and tamano_bytes >= self.umbral_mb * 1024 * 1024:
+            return "tamano"
+        return None
+
+    @contextmanager
+    def documento(self, nombre, tamano_bytes=None):
+        """
+        Perfila el bloque que procesa un documento
+
+        Uso:
+            with perfilador.documento(ruta, os.path.getsize(ruta)):
+                sistema.procesar_contrato(ruta)
+
+        Args:
+            nombre: Archivo o identificador (se usa para nombrar los perfiles)
+            tamano_bytes: Tamaño del archivo (para umbral_mb)
+        """
+        # Si otro documento ya se está capturando, este pasa sin perfilar
+        if not self._lock.acquire(blocking=False):
+            yield
+            return
+
+        inicio = time.perf_counter()
+        capturas = []
+        temporizador = None
+
+        try:
+            disparador = self._disparo_inicial(tamano_bytes)
+            if disparador:
+                capturas.append(_Captura(disparador, True, self.intervalo))
+            elif self.umbral_segundos is not None:
+                def disparar():
+                    capturas.append(_Captura("tiempo", False, self.intervalo))
+                temporizador = threading.Timer(self.umbral_segundos, disparar)
+                temporizador.daemon = True
+                temporizador.start()
+
+            yield
+
+        finally:
+            if temporizador is not None:
+                temporizador.cancel()
+                temporizador.join()
+            segundos = time.perf_counter() - inicio
+
+            try:
+                if capturas:
+                    captura = capturas[0]
+                    captura.terminar()
+                    self._guardar(nombre, tamano_bytes, segundos, captura)
+            finally:
+                self._lock.release()
+
+    def _guardar(self, nombre, tamano_bytes, segundos, captura):
+        seguro = re.sub(r"[^\w.-]+", "_", os.path.basename(str(nombre)))
+        base = os.path.join(self.carpeta, f"{datetime.now():%Y%m%d_%H%M%S}_{seguro}")
+        archivos = {}
+
+        if captura.perfil is not None:
+            archivos["prof"] = base + ".prof"
+            captura.perfil.dump_stats(archivos["prof"])
+
+        archivos["collapsed"] = base + ".collapsed"
+        captura.muestreador.guardar(archivos["collapsed"])
+
+        archivos["asignaciones"] = base + ".alloc.txt"
+        diferencias = captura.final.compare_to(captura.base, "lineno")
+        with open(archivos["asignaciones"], "w", encoding="utf-8") as f:
+            f.write(f"# {nombre}: {segundos:.2f}s, pico {captura.pico_bytes / 1e6:.1f} MB "
+                    f"(captura por {captura.disparador})\n")
+            for diferencia in diferencias[:self.top_asignaciones]:
+                f.write(f"{diferencia}\n")
+
+        registro = {
+            "documento": str(nombre),
+            "fecha": datetime.now().isoformat(),
+            "segundos": round(segundos, 3),
+            "segundos_capturados": round(time.perf_counter() - captura.desde, 3),
+            "tamano_bytes": tamano_bytes,
+            "disparador": captura.disparador,
+            "pico_memoria_mb": round(captura.pico_bytes / 1e6, 1),
+            "muestras": captura.muestreador.muestras,
+            "archivos": archivos
+        }
+        with open(os.path.join(self.carpeta, "resumen.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+        print(f"🔬 Perfil de {os.path.basename(str(nombre))}: {segundos:.1f}s, "
+              f"pico {registro['pico_memoria_mb']} MB → {base}.*")
+
+
+def agregar_argumentos(parser):
+    """Opciones --profile comunes a los main.py"""
+    parser.add_argument("--profile", action="store_true", help="Perfilar cada documento (cProfile + tracemalloc)")
+    parser.add_argument("--profile-dir", default="./perfiles")
+    parser.add_argument("--profile-umbral-s", type=float, default=None,
+                        help="Solo documentos que tarden más que estos segundos")
+    parser.add_argument("--profile-umbral-mb", type=float, default=None,
+                        help="Solo archivos de este tamaño o más")
+
+
+def crear_desde_argumentos(args):
+    """Perfilador según las opciones de agregar_argumentos (None sin --profile)"""
+    if not args.profile:
+        return None
+    return Perfilador(args.profile_dir, umbral_segundos=args.profile_umbral_s, umbral_mb=args.profile_umbral_mb)
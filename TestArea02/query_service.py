@@ -0,0 +1,502 @@
+"""
+Servicio HTTP local para consultar contratos desde varios puestos a la vez
+
+Uso:
+    python query_service.py --puerto 8080 --db ./chroma_db
+    python query_service.py --concurrencia-llm 2 --max-espera-llm 16 --ollama-url http://localhost:11434
+
+Endpoints:
+    GET  /salud                       Estado del servicio y de las colas
+    GET  /contratos                   Lista de contratos (ids y metadata)
+    GET  /metricas                    Métricas en formato Prometheus
+    POST /buscar     {"consulta", "n"}             Búsqueda semántica
+    POST /preguntar  {"pregunta", "stream"}        Respuesta del LLM (NDJSON si stream)
+    POST /ingerir    {"ruta"}                      Procesa un archivo de --carpeta-ingesta
+
+Los modelos se cargan una sola vez al arrancar. La búsqueda corre en un pool
+de hilos y la ingesta pasa por una cola acotada. Las llamadas al LLM pasan
+por el LLMScheduler del sistema (las preguntas antes que la ingesta). Si una
+cola está llena se responde 429 con Retry-After; si una pregunta vence
+esperando al LLM, 504. Cada respuesta trae los
+tiempos de la petición (cuerpo 'tiempos_ms' y cabecera Server-Timing).
+
+/ingerir solo acepta archivos dentro de --carpeta-ingesta (sin esa opción
+está deshabilitado), así el servicio puede escuchar en otra interfaz que no
+sea 127.0.0.1 sin dar acceso a cualquier archivo del servidor.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from contract_system import ContractSystem
+from llm_scheduler import ColaLlena, FueraDeTiempo
+from metrics import METRICAS, configurar_logging, log
+
+
+MAX_RESULTADOS = 50  # Tope de 'n' en /buscar
+
+
+class Ocupado(Exception):
+    """La cola está llena o se agotó la espera: se responde 429"""
+
+
+class ColaAcotada:
+    """
+    RESPONSABILIDAD: Limitar cuántas tareas corren a la vez y cuántas esperan
+
+    ¿Qué hace?
+    - Deja pasar hasta 'concurrencia' tareas simultáneas
+    - Deja esperar hasta 'max_espera' tareas más (en orden de llegada)
+    - Rechaza el resto con Ocupado (contrapresión en vez de colas infinitas)
+    """
+
+    def __init__(self, nombre, concurrencia, max_espera, timeout=None):
+        """
+        Args:
+            nombre: Nombre para las métricas (ej: 'llm')
+            concurrencia: Tareas simultáneas
+            max_espera: Tareas que pueden esperar turno
+            timeout: Segundos máximos de espera (None = sin límite)
+        """
+        self.nombre = nombre
+        self.concurrencia = concurrencia
+        self.max_espera = max_espera
+        self.timeout = timeout
+
+        self._semaforo = threading.BoundedSemaphore(concurrencia)
+        self._lock = threading.Lock()
+        self.esperando = 0
+
+    @contextmanager
+    def turno(self, tiempos=None):
+        """
+        Espera un lugar libre; lanza Ocupado si la cola está llena
+
+        Args:
+            tiempos: Tiempos de la petición (registra 'espera_<nombre>')
+        """
+        inicio = time.perf_counter()
+        with self._lock:
+            if self.esperando >= self.max_espera:
+                METRICAS.incrementar("rechazos", cola=self.nombre)
+                raise Ocupado(f"Cola '{self.nombre}' llena ({self.esperando} esperando)")
+            self.esperando += 1
+            METRICAS.fijar("cola_esperando", self.esperando, cola=self.nombre)
+
+        try:
+            obtenido = self._semaforo.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.esperando -= 1
+                METRICAS.fijar("cola_esperando", self.esperando, cola=self.nombre)
+
+        espera = time.perf_counter() - inicio
+        METRICAS.observar("cola_espera_segundos", espera, cola=self.nombre)
+        if tiempos is not None:
+            tiempos.etapas[f"espera_{self.nombre}"] = espera * 1000
+
+        if not obtenido:
+            METRICAS.incrementar("rechazos", cola=self.nombre)
+            raise Ocupado(f"Cola '{self.nombre}': no hubo turno en {self.timeout}s")
+
+        try:
+            yield
+        finally:
+            self._semaforo.release()
+
+    def estado(self):
+        return {"concurrencia": self.concurrencia, "esperando": self.esperando, "max_espera": self.max_espera}
+
+
+class Tiempos:
+    """Tiempos de una petición por etapa (en ms)"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[etapa] = self.etapas.get(etapa, 0) + (time.perf_counter() - inicio) * 1000
+
+    def marcar(self, etapa):
+        """Registra el tiempo transcurrido desde el inicio (ej: primer token)"""
+        self.etapas.setdefault(etapa, (time.perf_counter() - self.inicio) * 1000)
+
+    def resumen(self):
+        return {**{k: round(v, 2) for k, v in self.etapas.items()},
+                "total": round((time.perf_counter() - self.inicio) * 1000, 2)}
+
+    def cabecera(self):
+        """Valor para la cabecera Server-Timing"""
+        return ", ".join(f"{etapa};dur={ms}" for etapa, ms in self.resumen().items())
+
+
+class QueryService:
+    """
+    RESPONSABILIDAD: Exponer ContractSystem por HTTP a varios usuarios
+
+    ¿Qué hace?
+    - Carga la base y el modelo de embeddings una sola vez
+    - Atiende cada petición en su propio hilo (ThreadingHTTPServer)
+    - Corre las búsquedas en un pool de hilos con cola acotada
+    - Procesa las ingestas de a una
+    - Deja el orden de las llamadas al LLM al LLMScheduler del sistema
+    - Devuelve 429 cuando una cola está llena
+    """
+
+    def __init__(self, sistema, host="127.0.0.1", port=8080, hilos_busqueda=4, max_busquedas_pendientes=32,
+                 timeout_llm=120, max_espera_ingesta=4, carpeta_ingesta=None, precargar=True):
+        """
+        Args:
+            sistema: ContractSystem ya configurado
+            host: Interfaz donde escuchar
+            port: Puerto (0 = cualquiera libre)
+            hilos_busqueda: Hilos del pool de búsqueda (embedding + base)
+            max_busquedas_pendientes: Búsquedas que pueden esperar en el pool
+            timeout_llm: Segundos máximos de una pregunta esperando al LLM
+            max_espera_ingesta: Ingestas que pueden esperar (se procesan de a una)
+            carpeta_ingesta: Única carpeta desde donde /ingerir lee archivos
+                             (None = /ingerir deshabilitado)
+            precargar: Cargar base y embeddings al arrancar
+        """
+        self.sistema = sistema
+
+        self.pool_busqueda = ThreadPoolExecutor(max_workers=hilos_busqueda, thread_name_prefix="busqueda")
+        self.cola_busqueda = ColaAcotada("busqueda", hilos_busqueda, max_busquedas_pendientes)
+        self.timeout_llm = timeout_llm
+        self.cola_ingesta = ColaAcotada("ingesta", 1, max_espera_ingesta)
+        self.carpeta_ingesta = os.path.realpath(carpeta_ingesta) if carpeta_ingesta else None
+
+        if precargar:
+            # Las propiedades perezosas no son seguras entre hilos: se resuelven acá
+            with METRICAS.span("precarga_servicio"):
+                self.sistema.db.embedder
+                self.sistema.llm
+                if self.sistema.reranker:
+                    self.sistema.reranker.modelo
+
+        self._hilo = None
+        self._servidor = ThreadingHTTPServer((host, port), self._crear_handler())
+        self._servidor.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._servidor.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Arranca el servidor en segundo plano"""
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def stop(self):
+        """Detiene el servidor y el pool"""
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        self.pool_busqueda.shutdown(wait=False)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def serve_forever(self):
+        """Atiende peticiones en el hilo actual (uso por línea de comandos)"""
+        self._servidor.serve_forever()
+
+    def _en_pool(self, funcion, *args):
+        """Corre una función en el pool de búsqueda; rechaza si hay demasiadas pendientes"""
+        with self.cola_busqueda.turno():
+            return self.pool_busqueda.submit(funcion, *args).result()
+
+    # ==========================================
+    # OPERACIONES
+    # ==========================================
+
+    def buscar(self, consulta, n, tiempos):
+        with tiempos.medir("busqueda"):
+            resultados = self._en_pool(
+                lambda: self.sistema.db.buscar_contratos(consulta, n_results=n, reranker=self.sistema.reranker,
+                                                         candidatos=self.sistema.candidatos_rerank)
+            )
+
+        return {
+            "resultados": [
+                {"id": doc_id, "metadata": metadata, "distancia": distancia, "fragmento": documento}
+                for doc_id, metadata, distancia, documento in zip(
+                    resultados['ids'][0], resultados['metadatas'][0],
+                    resultados['distances'][0], resultados['documents'][0]
+                )
+            ]
+        }
+
+    def preparar_pregunta(self, pregunta, tiempos):
+        """Busca y arma el contexto en el pool; None si no hay contratos relacionados"""
+        METRICAS.incrementar("preguntas")
+        with tiempos.medir("busqueda"):
+            return self._en_pool(self.sistema.preparar_contexto, pregunta)
+
+    def ruta_ingesta(self, ruta):
+        """
+        Ruta real de un archivo a ingerir, si está dentro de la carpeta permitida
+
+        Args:
+            ruta: Ruta relativa a la carpeta de ingesta (o absoluta dentro de ella)
+
+        Returns:
+            str o None si está afuera (incluye '..' y enlaces que salen de la carpeta)
+        """
+        if self.carpeta_ingesta is None:
+            return None
+        real = os.path.realpath(os.path.join(self.carpeta_ingesta, ruta))
+        if os.path.commonpath([real, self.carpeta_ingesta]) != self.carpeta_ingesta:
+            return None
+        return real
+
+    def listar(self):
+        todos = self.sistema.db.listar_todos()
+        return {"contratos": [{"id": doc_id, "metadata": metadata}
+                              for doc_id, metadata in zip(todos['ids'], todos['metadatas'])]}
+
+    def estado(self):
+        colas = {cola.nombre: cola.estado() for cola in (self.cola_busqueda, self.cola_ingesta)}
+        colas["llm"] = {"en_cola": self.sistema.llm.en_cola, "max_cola": self.sistema.llm.max_cola}
+        if self.sistema.llm.limitador is not None:
+            colas["llm"]["concurrencia"] = self.sistema.llm.limitador.estado()
+        return {"estado": "ok", "colas": colas}
+
+    def _crear_handler(self):
+        servicio = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, formato, *args):
+                pass  # Los eventos van por log()
+
+            def do_GET(self):
+                tiempos = Tiempos()
+                try:
+                    if self.path == "/salud":
+                        self._enviar_json(servicio.estado(), tiempos)
+                    elif self.path == "/contratos":
+                        self._enviar_json(servicio.listar(), tiempos)
+                    elif self.path == "/metricas":
+                        self._enviar_texto(METRICAS.exportar_prometheus())
+                    else:
+                        self._enviar_json({"error": "not found"}, tiempos, estado=404)
+                except Exception as e:
+                    self._error(e, tiempos)
+
+            def do_POST(self):
+                tiempos = Tiempos()
+                self._en_stream = False
+                try:
+                    largo = int(self.headers.get("Content-Length", 0))
+                    cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+                except ValueError:
+                    self._enviar_json({"error": "JSON inválido"}, tiempos, estado=400)
+                    return
+                if not isinstance(cuerpo, dict):
+                    self._enviar_json({"error": "El cuerpo tiene que ser un objeto JSON"}, tiempos, estado=400)
+                    return
+
+                try:
+                    with METRICAS.span("servicio", ruta=self.path):
+                        if self.path == "/buscar":
+                            self._buscar(cuerpo, tiempos)
+                        elif self.path == "/preguntar":
+                            self._preguntar(cuerpo, tiempos)
+                        elif self.path == "/ingerir":
+                            self._ingerir(cuerpo, tiempos)
+                        else:
+                            self._enviar_json({"error": "not found"}, tiempos, estado=404)
+                except (BrokenPipeError, ConnectionResetError):
+                    log(f"⚠️ El cliente cortó la conexión en {self.path}", evento="servicio_desconexion")
+                    self.close_connection = True
+                except Exception as e:
+                    if self._en_stream:
+                        self._cortar_stream(e)
+                    elif isinstance(e, (Ocupado, ColaLlena)):
+                        self._enviar_json({"error": str(e)}, tiempos, estado=429, cabeceras={"Retry-After": "2"})
+                    elif isinstance(e, FueraDeTiempo):
+                        self._enviar_json({"error": str(e)}, tiempos, estado=504)
+                    else:
+                        self._error(e, tiempos)
+
+            def _buscar(self, cuerpo, tiempos):
+                if not cuerpo.get("consulta"):
+                    self._enviar_json({"error": "Falta 'consulta'"}, tiempos, estado=400)
+                    return
+
+                try:
+                    n = int(cuerpo.get("n", 3))
+                except (TypeError, ValueError):
+                    n = 0
+                if not 1 <= n <= MAX_RESULTADOS:
+                    self._enviar_json({"error": f"'n' debe ser un entero entre 1 y {MAX_RESULTADOS}"}, tiempos,
+                                      estado=400)
+                    return
+
+                datos = servicio.buscar(cuerpo["consulta"], n, tiempos)
+                self._enviar_json(datos, tiempos)
+
+            def _preguntar(self, cuerpo, tiempos):
+                pregunta = cuerpo.get("pregunta")
+                if not pregunta:
+                    self._enviar_json({"error": "Falta 'pregunta'"}, tiempos, estado=400)
+                    return
+
+                contexto = servicio.preparar_pregunta(pregunta, tiempos)
+                if contexto is None:
+                    self._enviar_json({"respuesta": "❌ No encontré contratos relacionados con tu pregunta."},
+                                      tiempos)
+                    return
+
+                llm = servicio.sistema.llm
+                if not cuerpo.get("stream"):
+                    with tiempos.medir("llm"):
+                        respuesta = llm.responder_pregunta(pregunta, contexto, timeout=servicio.timeout_llm)
+                    self._enviar_json({"respuesta": respuesta}, tiempos)
+                    return
+
+                # El primer fragmento se pide antes de mandar cabeceras: si la
+                # cola está llena o vence, todavía se puede responder 429/504
+                with tiempos.medir("llm"):
+                    partes = llm.responder_pregunta_stream(pregunta, contexto, timeout=servicio.timeout_llm)
+                    primera = next(partes, "")
+                    tiempos.marcar("primer_token")
+
+                    # Streaming: una línea JSON por fragmento, la última con los tiempos
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    self._en_stream = True  # Desde acá un error ya no puede cambiar el estado HTTP
+
+                    try:
+                        self._enviar_chunk({"respuesta": primera, "done": False})
+                        for parte in partes:
+                            self._enviar_chunk({"respuesta": parte, "done": False})
+                    finally:
+                        partes.close()  # Libera el trabajador del LLM aunque el cliente corte
+
+                self._enviar_chunk({"done": True, "tiempos_ms": tiempos.resumen()})
+                self.wfile.write(b"0\r\n\r\n")
+                self._en_stream = False
+
+            def _ingerir(self, cuerpo, tiempos):
+                if not cuerpo.get("ruta") or not isinstance(cuerpo["ruta"], str):
+                    self._enviar_json({"error": "Falta 'ruta'"}, tiempos, estado=400)
+                    return
+                if servicio.carpeta_ingesta is None:
+                    self._enviar_json({"error": "Ingesta deshabilitada (iniciar con --carpeta-ingesta)"}, tiempos,
+                                      estado=403)
+                    return
+
+                ruta = servicio.ruta_ingesta(cuerpo["ruta"])
+                if ruta is None:
+                    self._enviar_json({"error": "La ruta está fuera de la carpeta de ingesta"}, tiempos, estado=403)
+                    return
+                if not os.path.isfile(ruta):
+                    self._enviar_json({"error": "Archivo no encontrado"}, tiempos, estado=404)
+                    return
+
+                with servicio.cola_ingesta.turno(tiempos), tiempos.medir("ingesta"):
+                    contrato_id = servicio.sistema.procesar_contrato(ruta)
+
+                self._enviar_json({"contrato_id": contrato_id}, tiempos)
+
+            def _error(self, error, tiempos):
+                log(f"❌ Error en {self.path}: {error}", evento="servicio_error", ruta=self.path, error=str(error))
+                self._enviar_json({"error": str(error)}, tiempos, estado=500)
+
+            def _cortar_stream(self, error):
+                """
+                Error con la respuesta en streaming ya empezada: el estado 200 ya
+                salió, así que no se manda otra respuesta; se cierra la conexión
+                sin el chunk final y el cliente ve la respuesta incompleta
+                """
+                log(f"❌ Error en {self.path} durante el streaming: {error}", evento="servicio_error",
+                    ruta=self.path, error=str(error), stream=True)
+                self.close_connection = True
+
+            def _enviar_chunk(self, datos):
+                linea = (json.dumps(datos, ensure_ascii=False) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(linea):X}\r\n".encode("ascii") + linea + b"\r\n")
+                self.wfile.flush()
+
+            def _enviar_json(self, datos, tiempos, estado=200, cabeceras=None):
+                cuerpo = json.dumps({**datos, "tiempos_ms": tiempos.resumen()}, ensure_ascii=False,
+                                    default=str).encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.send_header("Server-Timing", tiempos.cabecera())
+                for nombre, valor in (cabeceras or {}).items():
+                    self.send_header(nombre, valor)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def _enviar_texto(self, texto):
+                cuerpo = texto.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP de consulta de contratos")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--db", default="./chroma_db")
+    parser.add_argument("--modelo", default="mistral:7b")
+    parser.add_argument("--ollama-url", default="http://localhost:11434")
+    parser.add_argument("--hilos-busqueda", type=int, default=4)
+    parser.add_argument("--max-busquedas-pendientes", type=int, default=32)
+    parser.add_argument("--concurrencia-llm", type=int, default=1, help="Llamadas simultáneas a Ollama")
+    parser.add_argument("--max-espera-llm", type=int, default=32, help="Pedidos al LLM en espera antes de responder 429")
+    parser.add_argument("--llm-adaptativo", action="store_true", default=None,
+                        help="Ajustar la concurrencia con Ollama según tokens/s y latencia")
+    parser.add_argument("--llm-concurrencia-max", type=int, default=None, help="Techo de la concurrencia adaptativa")
+    parser.add_argument("--rerank", action="store_true", help="Reordenar con cross-encoder")
+    parser.add_argument("--carpeta-ingesta", default=None,
+                        help="Carpeta desde donde /ingerir puede leer archivos (sin esto, /ingerir no se atiende)")
+    args = parser.parse_args()
+
+    configurar_logging()
+
+    sistema = ContractSystem(db_path=args.db, llm_model=args.modelo, llm_url=args.ollama_url, rerank=args.rerank,
+                             llm_trabajadores=args.concurrencia_llm, llm_max_cola=args.max_espera_llm,
+                             llm_adaptativo=args.llm_adaptativo, llm_concurrencia_max=args.llm_concurrencia_max)
+    servicio = QueryService(
+        sistema,
+        host=args.host,
+        port=args.puerto,
+        hilos_busqueda=args.hilos_busqueda,
+        max_busquedas_pendientes=args.max_busquedas_pendientes,
+        carpeta_ingesta=args.carpeta_ingesta
+    )
+
+    log(f"🌐 Servicio de contratos escuchando en {servicio.url}", evento="servicio_inicio", url=servicio.url)
+    servicio.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import logging
+import os
+import time
+
+from metrics import METRICAS, log
+
+
+# Cross-encoder multilingüe chico (los contratos están en español e inglés)
+MODELO_DEFAULT = os.environ.get("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+
+
+class Reranker:
+    """
+    RESPONSABILIDAD: Reordenar candidatos de la búsqueda vectorial con un cross-encoder
+
+    ¿Qué hace?
+    - Recibe los N candidatos que devolvió la base (orden del bi-encoder)
+    - Puntúa cada par (pregunta, fragmento) con un cross-encoder, en lotes
+    - Se queda con los k mejores
+    - Si el presupuesto de tiempo no alcanza, devuelve el orden original
+
+    El presupuesto se controla entre lotes: antes de cada lote se estima si
+    terminaría a tiempo con la duración del lote más lento visto hasta ahora.
+    La carga del modelo no cuenta para el presupuesto (ocurre una sola vez).
+    """
+
+    def __init__(self, modelo=MODELO_DEFAULT, presupuesto_ms=300, batch_size=8, largo_texto=1000):
+        """
+        Args:
+            modelo: Nombre del cross-encoder
+            presupuesto_ms: Tiempo máximo para puntuar los candidatos
+            batch_size: Pares por lote
+            largo_texto: Caracteres de cada candidato que se le pasan al modelo
+        """
+        self.nombre_modelo = modelo
+        self.presupuesto_ms = presupuesto_ms
+        self.batch_size = batch_size
+        self.largo_texto = largo_texto
+        self._modelo = None
+
+    @property
+    def modelo(self):
+        """CrossEncoder, cargado en el primer reordenamiento"""
+        if self._modelo is None:
+            with METRICAS.span("carga_reranker"):
+                from sentence_transformers import CrossEncoder
+                self._modelo = CrossEncoder(self.nombre_modelo)
+        return self._modelo
+
+    def puntuar(self, consulta, textos, presupuesto_ms=None):
+        """
+        Puntúa los textos contra la consulta respetando el presupuesto
+
+        Args:
+            consulta: Texto de la pregunta
+            textos: Lista de textos candidatos
+            presupuesto_ms: Sobrescribe el presupuesto por defecto
+
+        Returns:
+            list de floats, o None si se acabó el tiempo
+        """
+        presupuesto = (presupuesto_ms or self.presupuesto_ms) / 1000
+        modelo = self.modelo
+
+        pares = [(consulta, texto[:self.largo_texto]) for texto in textos]
+        puntajes = []
+        lote_mas_lento = 0.0
+        inicio = time.perf_counter()
+
+        for i in range(0, len(pares), self.batch_size):
+            transcurrido = time.perf_counter() - inicio
+            if transcurrido + lote_mas_lento > presupuesto:
+                return None
+
+            inicio_lote = time.perf_counter()
+            puntajes.extend(float(p) for p in modelo.predict(pares[i:i + self.batch_size]))
+            lote_mas_lento = max(lote_mas_lento, time.perf_counter() - inicio_lote)
+
+        # El último lote pudo pasarse del presupuesto aunque la estimación dijera que no
+        if time.perf_counter() - inicio > presupuesto:
+            return None
+
+        return puntajes
+
+    def reordenar(self, consulta, resultados, k, presupuesto_ms=None):
+        """
+        Reordena resultados con formato de Chroma y se queda con los k mejores
+
+        Args:
+            consulta: Texto de la pregunta
+            resultados: dict con ids, documents, metadatas, distances (una consulta)
+            k: Cuántos resultados devolver
+            presupuesto_ms: Sobrescribe el presupuesto por defecto
+
+        Returns:
+            dict con el mismo formato, más 'rerank' con el detalle
+            (aplicado, candidatos, segundos, puntajes)
+        """
+        documentos = resultados['documents'][0]
+        candidatos = len(documentos)
+
+        inicio = time.perf_counter()
+        with METRICAS.span("rerank", candidatos=candidatos):
+            puntajes = self.puntuar(consulta, [doc or '' for doc in documentos], presupuesto_ms)
+        segundos = time.perf_counter() - inicio
+
+        if puntajes is None:
+            # Fuera de presupuesto: orden del bi-encoder
+            METRICAS.incrementar("rerank_fuera_de_presupuesto")
+            log(f"⚠️ Rerank fuera de presupuesto ({segundos * 1000:.0f} ms), se usa el orden original",
+                nivel=logging.WARNING, evento="rerank_fuera_de_presupuesto", candidatos=candidatos)
+            orden = list(range(min(k, candidatos)))
+        else:
+            orden = sorted(range(candidatos), key=lambda i: puntajes[i], reverse=True)[:k]
+
+        reordenado = {
+            clave: [[valores[0][i] for i in orden]]
+            for clave, valores in resultados.items()
+            if clave in ('ids', 'documents', 'metadatas', 'distances') and valores
+        }
+        reordenado['rerank'] = {
+            "aplicado": puntajes is not None,
+            "candidatos": candidatos,
+            "segundos": segundos,
+            "puntajes": [puntajes[i] for i in orden] if puntajes is not None else None
+        }
+
+        return reordenado
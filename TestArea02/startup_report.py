@@ -0,0 +1,134 @@
+"""
+Reporte de tiempo de arranque para los comandos de solo lectura
+
+Uso:
+    python startup_report.py                # listar + stats sobre una base temporal
+    python startup_report.py --db ./chroma_db --limite 1.0
+
+Cada medición corre en un intérprete nuevo (arranque en frío). Se reporta:
+- Tiempo de importar contract_system y de ejecutar 'stats' y 'listar'
+- Los imports más lentos (python -X importtime)
+- Qué módulos pesados (torch, paddle, ...) se cargaron sin necesidad
+
+Sale con código 1 si algún comando supera el límite, para usarlo como control.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmark_utils import formatear_tabla
+
+
+# Módulos que NO deberían cargarse para listar o contar
+MODULOS_PESADOS = ["torch", "paddle", "paddleocr", "sentence_transformers", "transformers",
+                   "easyocr", "keras_ocr", "tensorflow", "cv2", "onnxruntime"]
+
+_ESCENARIOS = {
+    "import": "",
+    "stats": "sistema.db.contar_contratos()",
+    "listar": "sistema.listar_contratos()",
+}
+
+_CODIGO = """
+import contextlib, io, json, sys, time
+inicio = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    from contract_system import ContractSystem
+    sistema = ContractSystem(db_path={db!r})
+    {accion}
+segundos = time.perf_counter() - inicio
+pesados = [m for m in {pesados!r} if m in sys.modules]
+print(json.dumps({{"segundos": segundos, "pesados": pesados}}))
+"""
+
+
+def medir_escenario(accion, db_path):
+    """
+    Ejecuta un comando en un intérprete nuevo con -X importtime
+
+    Returns:
+        tuple (dict con segundos y módulos pesados, lista de imports lentos)
+    """
+    codigo = _CODIGO.format(db=db_path, accion=accion, pesados=MODULOS_PESADOS)
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1])
+
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return resultado, _imports_lentos(proceso.stderr)
+
+
+def _imports_lentos(salida_importtime, top=10):
+    """
+    Paquetes de primer nivel ordenados por tiempo acumulado
+
+    Formato de cada línea: 'import time: self [us] | cumulative | imported package'
+    """
+    imports = []
+
+    for linea in salida_importtime.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        # Los imports anidados vienen indentados; solo interesan los de primer nivel
+        if not nombre.startswith("  "):
+            imports.append({"modulo": nombre.strip(), "ms": int(acumulado) / 1000})
+
+    return sorted(imports, key=lambda i: i["ms"], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de comandos de solo lectura")
+    parser.add_argument("--db", default=None, help="Base de datos a usar (por defecto una temporal vacía)")
+    parser.add_argument("--limite", type=float, default=1.0, help="Segundos máximos por comando")
+    parser.add_argument("--salida", default=None, help="Guardar el reporte en JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        db_path = args.db or os.path.join(carpeta, "chroma_db")
+
+        filas = []
+        lentos = {}
+        for nombre, accion in _ESCENARIOS.items():
+            resultado, lentos[nombre] = medir_escenario(accion, db_path)
+            filas.append({
+                "comando": nombre,
+                "segundos": resultado["segundos"],
+                "pesados": ", ".join(resultado["pesados"]) or "-",
+                "ok": "✅" if resultado["segundos"] <= args.limite and not resultado["pesados"] else "❌"
+            })
+
+    print(formatear_tabla(filas, [
+        ("comando", "Comando", "{}"),
+        ("segundos", "Segundos", "{:.3f}"),
+        ("pesados", "Módulos pesados cargados", "{}"),
+        ("ok", "OK", "{}")
+    ]))
+
+    print("\n🐢 Imports más lentos ('listar'):")
+    print(formatear_tabla(lentos["listar"], [("modulo", "Módulo", "{}"), ("ms", "ms", "{:.1f}")]))
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"limite": args.limite, "comandos": filas, "imports_lentos": lentos}, f,
+                      ensure_ascii=False, indent=2)
+
+    if any(fila["ok"] == "❌" for fila in filas):
+        print(f"\n❌ Algún comando supera {args.limite}s o carga módulos pesados")
+        sys.exit(1)
+
+    print(f"\n✅ Todos los comandos arrancan en menos de {args.limite}s")
+
+
+if __name__ == "__main__":
+    main()
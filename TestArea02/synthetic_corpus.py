@@ -0,0 +1,106 @@
+"""
+Genera un corpus de contratos sintéticos con sus datos reales
+
+Uso:
+    python synthetic_corpus.py --salida ./corpus --n 50 --imagenes
+
+Por cada contrato se escribe:
+    contrato_00000.txt   Texto del contrato
+    contrato_00000.json  Datos reales (mismos campos que LLMExtractor)
+    contrato_00000.png   Página escaneada simulada (con --imagenes)
+"""
+import argparse
+import json
+import os
+
+from synthetic_pages import generar_contrato, renderizar_pagina
+
+
+def generar_corpus(carpeta, n, semilla=0, imagenes=False, dpi=200, ruido=0.0, inclinacion=0.0):
+    """
+    Escribe n contratos sintéticos en una carpeta
+
+    Args:
+        carpeta: Carpeta de salida (se crea si no existe)
+        n: Cantidad de contratos
+        semilla: Semilla del primer contrato
+        imagenes: Si True, también renderiza cada contrato como PNG
+        dpi, ruido, inclinacion: Parámetros de la imagen
+
+    Returns:
+        list de dicts con: id, texto, datos, imagen (ruta o None)
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    corpus = []
+
+    for i in range(n):
+        contrato_id = f"contrato_{semilla + i:05d}"
+        texto, datos = generar_contrato(semilla + i)
+        base = os.path.join(carpeta, contrato_id)
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(texto)
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+
+        ruta_imagen = None
+        if imagenes:
+            imagen, _ = renderizar_pagina(texto, dpi=dpi, ruido=ruido, inclinacion=inclinacion, semilla=semilla + i)
+            ruta_imagen = base + ".png"
+            imagen.save(ruta_imagen, dpi=(dpi, dpi))
+
+        corpus.append({"id": contrato_id, "texto": texto, "datos": datos, "imagen": ruta_imagen})
+
+    return corpus
+
+
+def cargar_corpus(carpeta):
+    """
+    Lee un corpus de la forma contrato.txt + contrato.json (+ contrato.png)
+
+    Returns:
+        list de dicts con: id, texto, datos, imagen
+    """
+    corpus = []
+
+    for nombre in sorted(os.listdir(carpeta)):
+        if not nombre.endswith(".txt"):
+            continue
+
+        contrato_id = nombre[:-4]
+        base = os.path.join(carpeta, contrato_id)
+
+        with open(base + ".txt", "r", encoding="utf-8") as f:
+            texto = f.read()
+
+        datos = {}
+        if os.path.exists(base + ".json"):
+            with open(base + ".json", "r", encoding="utf-8") as f:
+                datos = json.load(f)
+
+        imagen = base + ".png" if os.path.exists(base + ".png") else None
+        corpus.append({"id": contrato_id, "texto": texto, "datos": datos, "imagen": imagen})
+
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera contratos sintéticos")
+    parser.add_argument("--salida", default="./corpus_sintetico")
+    parser.add_argument("--n", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--imagenes", action="store_true", help="Renderizar también cada contrato como PNG")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--ruido", type=float, default=0.0)
+    parser.add_argument("--inclinacion", type=float, default=0.0)
+    args = parser.parse_args()
+
+    corpus = generar_corpus(
+        args.salida, args.n, semilla=args.semilla, imagenes=args.imagenes,
+        dpi=args.dpi, ruido=args.ruido, inclinacion=args.inclinacion
+    )
+    print(f"✅ {len(corpus)} contratos generados en: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import random
+from datetime import date, timedelta
+
+
+# Material para armar contratos sintéticos
+_EMPRESAS = [
+    "Cardow Inc", "Andes Logistics S.A.", "Pacific Cloud Services LLC", "Grupo Sierra Norte",
+    "Northwind Traders", "Quito Airport Retail Ltd", "Blue Harbor Consulting", "Tecnologías del Sur S.A.S."
+]
+_TIPOS = ["service agreement", "lease", "sale", "license agreement", "consulting agreement"]
+_OBJETOS = [
+    "cloud hosting and maintenance services", "lease of retail space at the airport terminal",
+    "sale of industrial equipment", "software license for document management",
+    "consulting on logistics optimization"
+]
+_CLAUSULAS = [
+    "FIRST CLAUSE - OBJECT", "SECOND CLAUSE - TERM", "THIRD CLAUSE - PRICE AND PAYMENT",
+    "FOURTH CLAUSE - CONFIDENTIALITY", "FIFTH CLAUSE - TERMINATION", "SIXTH CLAUSE - PENALTIES"
+]
+_MONEDAS = ["USD", "EUR"]
+
+# Fuentes habituales en Linux / macOS / Windows
+FUENTES = [
+    "DejaVuSans.ttf", "DejaVuSerif.ttf", "LiberationSans-Regular.ttf", "LiberationSerif-Regular.ttf",
+    "Arial.ttf", "arial.ttf", "Times New Roman.ttf", "times.ttf", "cour.ttf"
+]
+
+# Tamaño carta en pulgadas
+_ANCHO_PULGADAS = 8.5
+_ALTO_PULGADAS = 11
+
+
+def generar_contrato(semilla):
+    """
+    Genera el texto de un contrato sintético y sus datos reales
+
+    Args:
+        semilla: Semilla para que el contrato sea reproducible
+
+    Returns:
+        tuple (texto, datos) donde datos tiene los mismos campos que
+        LLMExtractor.extract_contract_data (contract_type, parties, ...)
+    """
+    rng = random.Random(semilla)
+
+    partes = rng.sample(_EMPRESAS, 2)
+    tipo = rng.choice(_TIPOS)
+    objeto = rng.choice(_OBJETOS)
+    firma = date(2015, 1, 1) + timedelta(days=rng.randrange(3650))
+    inicio = firma + timedelta(days=rng.randrange(1, 60))
+    fin = inicio + timedelta(days=365 * rng.randint(1, 5))
+    monto = rng.randrange(5, 500) * 1000
+    moneda = rng.choice(_MONEDAS)
+    clausulas = _CLAUSULAS[:rng.randint(3, len(_CLAUSULAS))]
+    penalidad = f"{rng.randint(1, 10)}% of the total amount per month of delay"
+
+    parrafos = [
+        f"{tipo.upper()} No. {semilla:05d}",
+        f"This {tipo} is entered into on {firma.isoformat()} by and between {partes[0]} "
+        f"and {partes[1]}, hereinafter the parties.",
+    ]
+    for clausula in clausulas:
+        parrafos.append(clausula)
+        if "OBJECT" in clausula:
+            parrafos.append(f"The object of this agreement is the {objeto}.")
+        elif "TERM" in clausula:
+            parrafos.append(f"The agreement starts on {inicio.isoformat()} and ends on {fin.isoformat()}.")
+        elif "PRICE" in clausula:
+            parrafos.append(f"The total amount of this agreement is {monto} {moneda}, payable in monthly installments.")
+        elif "PENALTIES" in clausula:
+            parrafos.append(f"In case of breach the defaulting party shall pay {penalidad}.")
+        else:
+            parrafos.append("The parties agree to comply with all obligations set forth in this document "
+                            "and in the applicable law.")
+    parrafos.append(f"Signed by {partes[0]} and {partes[1]}.")
+
+    datos = {
+        "contract_type": tipo,
+        "parties": partes,
+        "signature_date": firma.isoformat(),
+        "start_date": inicio.isoformat(),
+        "end_date": fin.isoformat(),
+        "total_amount": monto,
+        "currency": moneda,
+        "subject_matter": objeto,
+        "key_clauses": clausulas
+    }
+    if "SIXTH CLAUSE - PENALTIES" in clausulas:
+        datos["penalties"] = penalidad
+
+    return "\n".join(parrafos), datos
+
+
+def _cargar_fuente(nombre, tamano_px):
+    """Carga una fuente TrueType; si no existe usa la fuente por defecto de PIL"""
+    from PIL import ImageFont
+
+    candidatas = [nombre] + FUENTES if nombre else FUENTES
+    for candidata in candidatas:
+        try:
+            return ImageFont.truetype(candidata, tamano_px)
+        except OSError:
+            continue
+
+    return ImageFont.load_default(size=tamano_px)
+
+
+def _partir_lineas(texto, fuente, ancho_max):
+    """Parte cada párrafo en líneas que quepan en ancho_max píxeles"""
+    lineas = []
+
+    for parrafo in texto.split("\n"):
+        actual = ""
+        for palabra in parrafo.split():
+            candidata = f"{actual} {palabra}" if actual else palabra
+            if actual and fuente.getlength(candidata) > ancho_max:
+                lineas.append(actual)
+                actual = palabra
+            else:
+                actual = candidata
+        if actual:
+            lineas.append(actual)
+
+    return lineas
+
+
+def renderizar_pagina(texto, dpi=300, tamano_fuente=11, fuente=None, ruido=0.0, inclinacion=0.0, semilla=0):
+    """
+    Dibuja un texto como página escaneada
+
+    Args:
+        texto: Texto a dibujar (párrafos separados por saltos de línea)
+        dpi: Resolución de la página
+        tamano_fuente: Tamaño de letra en puntos
+        fuente: Archivo de fuente TrueType (None = primera disponible)
+        ruido: Desviación del ruido gaussiano (0-1, relativo a 255)
+        inclinacion: Grados de rotación (simula hoja torcida)
+        semilla: Semilla del ruido
+
+    Returns:
+        tuple (imagen PIL RGB, texto real dibujado)
+    """
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    ancho = int(_ANCHO_PULGADAS * dpi)
+    alto = int(_ALTO_PULGADAS * dpi)
+    margen = dpi  # 1 pulgada
+
+    fuente_pil = _cargar_fuente(fuente, max(int(tamano_fuente * dpi / 72), 6))
+    interlineado = int(tamano_fuente * dpi / 72 * 1.5)
+
+    lineas = _partir_lineas(texto, fuente_pil, ancho - 2 * margen)
+    lineas = lineas[:max((alto - 2 * margen) // interlineado, 1)]
+
+    imagen = Image.new("L", (ancho, alto), 255)
+    dibujo = ImageDraw.Draw(imagen)
+    for i, linea in enumerate(lineas):
+        dibujo.text((margen, margen + i * interlineado), linea, fill=0, font=fuente_pil)
+
+    if inclinacion:
+        imagen = imagen.rotate(inclinacion, resample=Image.BILINEAR, expand=True, fillcolor=255)
+
+    if ruido:
+        rng = np.random.default_rng(semilla)
+        pixeles = np.asarray(imagen, dtype=np.float32)
+        pixeles += rng.normal(0, ruido * 255, pixeles.shape).astype(np.float32)
+        imagen = Image.fromarray(np.clip(pixeles, 0, 255).astype(np.uint8))
+
+    return imagen.convert("RGB"), "\n".join(lineas)
+
+
+def generar_paginas(n, dpi=300, tamano_fuente=11, fuente=None, ruido=0.0, inclinacion=0.0, semilla=0):
+    """
+    Genera n páginas de contratos sintéticos con su texto real
+
+    Args:
+        n: Cantidad de páginas
+        (resto): Igual que renderizar_pagina
+
+    Returns:
+        list de tuplas (imagen PIL, texto real)
+    """
+    paginas = []
+
+    for i in range(n):
+        texto, _ = generar_contrato(semilla + i)
+        paginas.append(renderizar_pagina(
+            texto,
+            dpi=dpi,
+            tamano_fuente=tamano_fuente,
+            fuente=fuente,
+            ruido=ruido,
+            inclinacion=inclinacion,
+            semilla=semilla + i
+        ))
+
+    return paginas
@@ -0,0 +1,134 @@
+# test_adaptive_limiter.py
+
+import pytest
+
+import adaptive_limiter
+import llm_extractor
+from adaptive_limiter import LimitadorAdaptativo
+from llm_extractor import LLMExtractor
+from llm_scheduler import LLMScheduler
+
+
+class _Reloj:
+    """Reemplaza a time en adaptive_limiter: el tiempo avanza solo cuando la prueba quiere"""
+
+    def __init__(self):
+        self.ahora = 0.0
+
+    def monotonic(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(adaptive_limiter, "time", reloj)
+    return reloj
+
+
+def _ronda(limitador, reloj, segundos, tokens, error=False):
+    """Una ronda de llamadas en paralelo que ocupan todo el límite"""
+    llamadas = limitador.limite
+    for _ in range(llamadas):
+        limitador.empezar()
+    reloj.ahora += segundos
+    for _ in range(llamadas):
+        limitador.terminar(segundos, tokens, error=error)
+
+
+def test_sube_mientras_mejora_el_rendimiento(reloj):
+    """Con el límite lleno y más tokens/s en cada ventana, sube de a uno hasta el techo"""
+    limitador = LimitadorAdaptativo(maximo=3, muestras_minimas=4)
+    limites = []
+    for _ in range(12):
+        _ronda(limitador, reloj, 1.0, 100)
+        limites.append(limitador.limite)
+
+    assert limites[3] == 2 and limites[5] == 3
+    assert limitador.limite == 3  # Nunca pasa el máximo
+
+
+def test_sin_mejora_vuelve_un_paso_y_espera(reloj):
+    """Si subir no dio más tokens/s, vuelve atrás y no prueba otra vez hasta enfriarse"""
+    limitador = LimitadorAdaptativo(maximo=4, muestras_minimas=2, tolerancia=3.0, enfriamiento=2)
+
+    # Límite 1 → 2, pero con 2 en paralelo cada llamada tarda el doble
+    _ronda(limitador, reloj, 1.0, 100)
+    _ronda(limitador, reloj, 1.0, 100)
+    assert limitador.limite == 2
+    _ronda(limitador, reloj, 2.0, 100)
+    _ronda(limitador, reloj, 2.0, 100)
+    assert limitador.limite == 1
+
+    # Dos ventanas de espera y recién después vuelve a subir
+    for _ in range(4):
+        _ronda(limitador, reloj, 1.0, 100)
+    assert limitador.limite == 1
+    _ronda(limitador, reloj, 1.0, 100)
+    _ronda(limitador, reloj, 1.0, 100)
+    assert limitador.limite == 2
+
+
+def test_errores_bajan_de_golpe(reloj):
+    """Un error en la ventana multiplica el límite por factor_baja, sin bajar del mínimo"""
+    limitador = LimitadorAdaptativo(maximo=8, inicial=8, minimo=3, muestras_minimas=4, factor_baja=0.5)
+
+    _ronda(limitador, reloj, 1.0, 100)
+    _ronda(limitador, reloj, 1.0, 100, error=True)
+    assert limitador.limite == 4
+
+    _ronda(limitador, reloj, 1.0, 100, error=True)
+    _ronda(limitador, reloj, 1.0, 100, error=True)
+    assert limitador.limite == 3
+
+
+def test_latencia_alta_baja_el_limite(reloj):
+    """La latencia por token por encima de 'tolerancia' veces la mejor medida baja el límite"""
+    limitador = LimitadorAdaptativo(maximo=4, inicial=4, muestras_minimas=4, tolerancia=2.0)
+
+    _ronda(limitador, reloj, 1.0, 100)
+    _ronda(limitador, reloj, 1.0, 100)
+    assert limitador.limite == 4 and limitador.base == pytest.approx(0.01)
+
+    _ronda(limitador, reloj, 5.0, 100)
+    _ronda(limitador, reloj, 5.0, 100)
+    assert limitador.limite == 2
+
+
+def test_llamadas_sin_tokens_no_cuentan_como_latencia(reloj):
+    """Los segundos por llamada no se mezclan con los segundos por token"""
+    limitador = LimitadorAdaptativo(maximo=4, inicial=4, muestras_minimas=4)
+
+    _ronda(limitador, reloj, 1.0, 100)
+    _ronda(limitador, reloj, 1.0, 100)
+    _ronda(limitador, reloj, 10.0, 0)
+    _ronda(limitador, reloj, 10.0, 0)
+
+    assert limitador.limite == 4
+    assert limitador.base == pytest.approx(0.01)
+
+
+def test_error_http_del_extractor_llega_al_limitador(monkeypatch):
+    """Un 500 de Ollama no lanza excepción, pero el limitador lo ve como error"""
+
+    class _Respuesta:
+        status_code = 500
+
+    pedidos = []
+
+    def post(url, json=None, timeout=None, **kwargs):
+        pedidos.append(timeout)
+        return _Respuesta()
+
+    monkeypatch.setattr(llm_extractor.requests, "post", post)
+
+    limitador = LimitadorAdaptativo(maximo=2, inicial=2, muestras_minimas=4, factor_baja=0.5)
+    planificador = LLMScheduler(LLMExtractor(timeout=30), limitador=limitador)
+    try:
+        for i in range(4):
+            assert planificador.extract_contract_data(f"contrato {i}") == {}
+    finally:
+        planificador.cerrar()
+
+    assert limitador.limite == 1
+    assert pedidos == [30] * 4  # Toda llamada lleva timeout
@@ -0,0 +1,110 @@
+# test_content_store.py
+
+import multiprocessing
+import os
+
+import pytest
+
+from content_store import ContentStore
+
+
+def _escribir_textos(carpeta, inicio, cantidad):
+    """Escribe textos distintos desde otro proceso (cada uno con su ContentStore)"""
+    store = ContentStore(carpeta, tamano_bloque=256)
+    for i in range(inicio, inicio + cantidad):
+        store.guardar(f"contrato {i} " + "cláusula " * (i % 50))
+    store.cerrar()
+
+
+def test_guardar_y_leer_rangos(tmp_path):
+    """Guarda una vez por contenido y lee rangos que cruzan bloques"""
+    store = ContentStore(str(tmp_path), tamano_bloque=64)
+    texto = "".join(f"Cláusula {i}: el arrendatario pagará en término. " for i in range(200))
+
+    contenido_id = store.guardar(texto)
+    assert store.guardar(texto) == contenido_id
+    assert len(store) == 1
+
+    datos = texto.encode("utf-8")
+    assert store.leer(contenido_id) == texto
+    assert store.leer_bytes(contenido_id, 100, 1000) == datos[100:1000]
+    assert store.largo(contenido_id) == len(datos)
+
+    # Otra instancia ve lo guardado
+    store.cerrar()
+    assert ContentStore(str(tmp_path)).leer(contenido_id) == texto
+
+
+def test_guardar_stream_igual_que_guardar(tmp_path):
+    """Las partes de cualquier tamaño dan el mismo ID y el mismo texto"""
+    store = ContentStore(str(tmp_path), tamano_bloque=100)
+    partes = [f"segmento {i} con acentos ñáé " * (i % 7 + 1) for i in range(300)]
+    texto = "".join(partes)
+
+    contenido_id, total = store.guardar_stream(iter(partes))
+    assert contenido_id == ContentStore.calcular_id(texto)
+    assert total == len(texto.encode("utf-8"))
+    assert store.leer(contenido_id) == texto
+
+    # Una sola parte enorme (varios bloques de golpe)
+    otro_id, _ = store.guardar_stream([texto * 3])
+    assert store.leer(otro_id) == texto * 3
+
+
+def test_dos_instancias_en_la_misma_carpeta(tmp_path):
+    """Cada instancia escribe al final real del paquete y ve lo de la otra"""
+    a = ContentStore(str(tmp_path), tamano_bloque=32)
+    b = ContentStore(str(tmp_path), tamano_bloque=32)
+
+    id_a = a.guardar("texto de la instancia A " * 20)
+    id_b = b.guardar("texto de la instancia B " * 20)
+    id_stream, _ = a.guardar_stream(["texto ", "en partes " * 30])
+
+    for store in (a, b):
+        assert store.leer(id_a) == "texto de la instancia A " * 20
+        assert store.leer(id_b) == "texto de la instancia B " * 20
+        assert store.leer(id_stream) == "texto " + "en partes " * 30
+
+    # Un texto ya escrito por la otra instancia no se duplica
+    tamano = os.path.getsize(tmp_path / ContentStore.ARCHIVO_PAQUETE)
+    assert b.guardar("texto de la instancia A " * 20) == id_a
+    assert os.path.getsize(tmp_path / ContentStore.ARCHIVO_PAQUETE) == tamano
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="requiere fork")
+def test_varios_procesos_escribiendo(tmp_path):
+    """Procesos escribiendo a la vez no se pisan los offsets"""
+    contexto = multiprocessing.get_context("fork")
+    procesos = [
+        contexto.Process(target=_escribir_textos, args=(str(tmp_path), i * 40, 40))
+        for i in range(4)
+    ]
+    for proceso in procesos:
+        proceso.start()
+    for proceso in procesos:
+        proceso.join()
+        assert proceso.exitcode == 0
+
+    store = ContentStore(str(tmp_path))
+    assert len(store) == 160
+    for i in range(160):
+        texto = f"contrato {i} " + "cláusula " * (i % 50)
+        assert store.leer(ContentStore.calcular_id(texto)) == texto
+
+
+def test_indice_con_linea_cortada(tmp_path):
+    """Una línea a medio escribir en el índice no rompe la apertura ni las escrituras"""
+    store = ContentStore(str(tmp_path))
+    primero = store.guardar("primer contrato")
+    store.cerrar()
+
+    with open(tmp_path / ContentStore.ARCHIVO_INDICE, "ab") as f:
+        f.write(b'{"id": "cortad')
+
+    store = ContentStore(str(tmp_path))
+    segundo = store.guardar("segundo contrato")
+    store.cerrar()
+
+    store = ContentStore(str(tmp_path))
+    assert store.leer(primero) == "primer contrato"
+    assert store.leer(segundo) == "segundo contrato"
@@ -0,0 +1,62 @@
+# test_embeddings.py
+
+import numpy as np
+import pytest
+
+# La paridad necesita los dos backends: sin ellos la prueba se saltea
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("tokenizers")
+
+from embeddings import crear_embedder
+
+
+TEXTOS = [
+    "Contrato de arrendamiento entre Juan Pérez y Inmobiliaria del Sur S.A.",
+    "The Supplier shall deliver the goods within thirty (30) days of the order.",
+    "Monto total: USD 45,000. Penalidad del 2% por cada semana de atraso.",
+    "Confidentiality obligations survive termination for a period of five years.",
+    "¿Cuándo vence el contrato de servicios de limpieza?",
+    "Employment agreement, start date 2024-03-01, salary paid monthly.",
+]
+
+# Coseno mínimo aceptado entre el vector de PyTorch y el de cada backend
+MINIMO_COSENO = {"onnx": 0.999, "onnx-int8": 0.97}
+
+
+def _cosenos(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def test_paridad_embeddings():
+    """Compara los vectores ONNX (float32 e int8) contra los de PyTorch"""
+
+    print("=" * 60)
+    print("PARIDAD DE EMBEDDINGS: PYTORCH vs ONNX")
+    print("=" * 60)
+
+    referencia = crear_embedder("torch").encode(TEXTOS)
+    print(f"\n✓ Referencia PyTorch: {referencia.shape}")
+
+    for backend, minimo in MINIMO_COSENO.items():
+        embedder = crear_embedder(backend)
+        vectores = embedder.encode(TEXTOS)
+        assert vectores.shape == referencia.shape, f"{backend}: forma {vectores.shape}"
+
+        cosenos = _cosenos(referencia, vectores)
+        print(f"✓ {backend}: coseno mínimo {cosenos.min():.4f}, medio {cosenos.mean():.4f}")
+        assert cosenos.min() >= minimo, f"{backend}: coseno {cosenos.min():.4f} < {minimo}"
+
+        # Un solo texto devuelve un vector 1D, igual que SentenceTransformer
+        assert embedder.encode(TEXTOS[0]).shape == referencia[0].shape
+
+    print("\n" + "=" * 60)
+    print("✓ PRUEBA COMPLETADA EXITOSAMENTE")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    test_paridad_embeddings()
@@ -0,0 +1,74 @@
+# test_llm_scheduler.py
+
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import FueraDeTiempo, LLMScheduler
+
+
+class _Extractor:
+    """Responde al instante; generar_ficha espera a que la prueba la libere"""
+
+    def __init__(self):
+        self.liberar = threading.Event()
+        self.fichas = 0
+
+    def responder_pregunta(self, pregunta, contexto):
+        return f"respuesta a {pregunta}"
+
+    def responder_pregunta_stream(self, pregunta, contexto):
+        yield "respuesta"
+
+    def generar_ficha(self, texto, datos=None):
+        self.liberar.wait(5)
+        self.fichas += 1
+        return {"summary": texto, "datos": datos}
+
+
+def test_stream_vencido_libera_el_trabajador(monkeypatch):
+    """Si la espera vence con la tarea ya sacada de la cola, el trabajador no queda tomado"""
+    siguiente = LLMScheduler._siguiente
+
+    def siguiente_lento(self):
+        tarea = siguiente(self)
+        time.sleep(0.3)  # El trabajador ya sacó la tarea pero todavía no la empezó
+        return tarea
+
+    monkeypatch.setattr(LLMScheduler, "_siguiente", siguiente_lento)
+
+    planificador = LLMScheduler(_Extractor(), trabajadores=1)
+    try:
+        with pytest.raises(FueraDeTiempo):
+            list(planificador.responder_pregunta_stream("lenta", "contexto", timeout=0.1))
+
+        assert planificador.responder_pregunta("siguiente", "contexto", timeout=3) == "respuesta a siguiente"
+    finally:
+        planificador.cerrar()
+
+
+def test_ficha_con_otros_datos_no_se_une():
+    """El mismo texto con otros datos extraídos es otra llamada al LLM"""
+    extractor = _Extractor()
+    planificador = LLMScheduler(extractor, trabajadores=2)
+    resultados = {}
+
+    def pedir(nombre, datos):
+        resultados[nombre] = planificador.generar_ficha("mismo texto", datos, timeout=5)
+
+    hilos = [threading.Thread(target=pedir, args=(nombre, datos))
+             for nombre, datos in (("a", {"tipo": "lease"}), ("b", {"tipo": "nda"}), ("c", {"tipo": "lease"}))]
+    try:
+        for hilo in hilos:
+            hilo.start()
+        time.sleep(0.2)
+        extractor.liberar.set()
+        for hilo in hilos:
+            hilo.join()
+    finally:
+        planificador.cerrar()
+
+    assert extractor.fichas == 2
+    assert resultados["a"]["datos"] == resultados["c"]["datos"] == {"tipo": "lease"}
+    assert resultados["b"]["datos"] == {"tipo": "nda"}
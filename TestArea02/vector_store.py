@@ -0,0 +1,811 @@
+import json
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class VectorStore:
+    """
+    RESPONSABILIDAD: Interfaz común para guardar y buscar vectores
+
+    ¿Qué hace?
+    - Usa los mismos métodos y formatos que una colección de ChromaDB
+      (add, query, get, count, delete), así DatabaseManager y
+      ContractDatabase funcionan igual con cualquier backend
+    - Las distancias son de coseno (1 - similitud), como "hnsw:space": "cosine"
+    """
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        raise NotImplementedError
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("documents", "metadatas", "distances")):
+        raise NotImplementedError
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def iterar(self, lote=1000, include=("embeddings", "documents", "metadatas")):
+        """
+        Recorre toda la colección por páginas (para exportar sin cargarla entera)
+
+        Yields:
+            dict con el formato de get() para cada página
+        """
+        offset = 0
+        while True:
+            pagina = self.get(limit=lote, offset=offset, include=include)
+            if not len(pagina["ids"]):
+                return
+            yield pagina
+            offset += len(pagina["ids"])
+
+
+class ChromaVectorStore(VectorStore):
+    """Backend ChromaDB (HNSW persistente)"""
+
+    def __init__(self, db_path, nombre="contratos"):
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=db_path)
+        self.collection = self.client.get_or_create_collection(
+            name=nombre,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self.collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("documents", "metadatas", "distances")):
+        return self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where,
+            include=list(include)
+        )
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        return self.collection.get(ids=ids, where=where, limit=limit, offset=offset, include=list(include))
+
+    def count(self):
+        return self.collection.count()
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+
+# Comparadores de filtros estilo Chroma sobre columnas de NumPy
+_COMPARADORES = {
+    "$eq": lambda columna, valor: columna == valor,
+    "$ne": lambda columna, valor: columna != valor,
+    "$gt": lambda columna, valor: columna > valor,
+    "$gte": lambda columna, valor: columna >= valor,
+    "$lt": lambda columna, valor: columna < valor,
+    "$lte": lambda columna, valor: columna <= valor,
+    "$in": lambda columna, valor: _alguno_igual(columna, valor),
+    "$nin": lambda columna, valor: ~_alguno_igual(columna, valor),
+}
+
+
+def _alguno_igual(columna, valores):
+    """columna in valores, elemento a elemento (sirve para columnas de tipo object)"""
+    mascara = np.zeros(len(columna), dtype=bool)
+    for valor in valores:
+        mascara |= np.asarray(columna == valor, dtype=bool)
+    return mascara
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    RESPONSABILIDAD: Búsqueda exacta por fuerza bruta con NumPy
+
+    ¿Qué hace?
+    - Guarda los vectores normalizados en segmentos binarios que solo crecen
+      (seg_00000.vec, seg_00001.vec, ...) y los lee con np.memmap
+    - Guarda ids, documentos y metadata en un .jsonl por segmento
+    - Busca con una multiplicación de matrices por bloques y top-k con argpartition
+    - Filtra con máscaras booleanas construidas sobre columnas de metadata
+    - Opcionalmente cuantiza a int8 (4x menos memoria, misma búsqueda)
+
+    Pensado para corpus chicos y medianos (menos de ~200k fragmentos), donde
+    la búsqueda exacta es más rápida que abrir y consultar un índice HNSW.
+    """
+
+    ARCHIVO_CONFIG = "store.json"
+    ARCHIVO_BORRADOS = "borrados.jsonl"
+
+    def __init__(self, carpeta, dtype="float32", filas_por_segmento=65536, filas_por_bloque=32768):
+        """
+        Args:
+            carpeta: Carpeta de los segmentos (se crea si no existe)
+            dtype: 'float32' o 'int8' (solo se usa al crear el store)
+            filas_por_segmento: Filas antes de empezar un segmento nuevo
+            filas_por_bloque: Filas por multiplicación de matrices al buscar
+        """
+        os.makedirs(carpeta, exist_ok=True)
+
+        self.carpeta = carpeta
+        self.filas_por_bloque = filas_por_bloque
+        self._lock = threading.RLock()
+
+        ruta_config = os.path.join(carpeta, self.ARCHIVO_CONFIG)
+        if os.path.exists(ruta_config):
+            with open(ruta_config, "r", encoding="utf-8") as f:
+                self.config = json.load(f)
+        else:
+            self.config = {"dim": None, "dtype": dtype, "filas_por_segmento": filas_por_segmento, "segmentos": 0}
+            self._guardar_config()
+
+        # Filas en memoria (en el orden de los segmentos)
+        self.ids = []
+        self.documentos = []
+        self.metadatas = []
+        self.posiciones = {}
+        self.filas_segmento = []  # Filas de cada segmento
+        self.borrados = set()  # Filas globales borradas
+
+        self._matrices = []  # memmap por segmento (se abren al buscar)
+        self._escalas = []
+        self._columnas = {}  # Cache de columnas de metadata para los filtros
+
+        for segmento in range(self.config["segmentos"]):
+            self._cargar_segmento(segmento)
+
+        ruta_borrados = os.path.join(carpeta, self.ARCHIVO_BORRADOS)
+        if os.path.exists(ruta_borrados):
+            with open(ruta_borrados, "r", encoding="utf-8") as f:
+                self.borrados = {int(linea) for linea in f if linea.strip().isdigit()}
+
+            # Filas recortadas al cargar: el número se va a reusar para filas nuevas
+            if any(fila >= len(self.ids) for fila in self.borrados):
+                self.borrados = {fila for fila in self.borrados if fila < len(self.ids)}
+                with open(ruta_borrados + ".tmp", "w", encoding="utf-8") as f:
+                    f.writelines(f"{fila}\n" for fila in sorted(self.borrados))
+                os.replace(ruta_borrados + ".tmp", ruta_borrados)
+
+    # ==========================================
+    # Archivos
+    # ==========================================
+    def _ruta(self, segmento, extension):
+        return os.path.join(self.carpeta, f"seg_{segmento:05d}.{extension}")
+
+    def _guardar_config(self):
+        ruta = os.path.join(self.carpeta, self.ARCHIVO_CONFIG)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.config, f)
+        os.replace(ruta + ".tmp", ruta)
+
+    def _cargar_segmento(self, segmento):
+        """
+        Carga ids y metadata de un segmento y alinea sus archivos
+
+        Si una escritura se cortó a mitad, los archivos del segmento pueden
+        tener distinta cantidad de filas: se recortan todos a la menor, así
+        la fila i de cada archivo vuelve a ser el mismo documento.
+        """
+        filas = []  # (fila, bytes de la línea)
+        ruta = self._ruta(segmento, "jsonl")
+        if os.path.exists(ruta):
+            with open(ruta, "rb") as f:
+                for linea in f:
+                    if not linea.endswith(b"\n"):
+                        break  # Línea a medio escribir
+                    if linea.strip():
+                        filas.append((json.loads(linea), len(linea)))
+
+        # Filas completas en cada archivo binario
+        dim = self.config["dim"]
+        completas = len(filas)
+        if dim:
+            tamano_fila = dim * (1 if self.config["dtype"] == "int8" else 4)
+            completas = min(completas, self._filas_en_archivo(segmento, "vec", tamano_fila))
+            if self.config["dtype"] == "int8":
+                completas = min(completas, self._filas_en_archivo(segmento, "escala", 4))
+
+            self._recortar(segmento, "vec", completas * tamano_fila)
+            if self.config["dtype"] == "int8":
+                self._recortar(segmento, "escala", completas * 4)
+        self._recortar(segmento, "jsonl", sum(largo for _, largo in filas[:completas]))
+
+        for fila, _ in filas[:completas]:
+            self.posiciones[fila["id"]] = len(self.ids)
+            self.ids.append(fila["id"])
+            self.documentos.append(fila.get("document"))
+            self.metadatas.append(fila.get("metadata") or {})
+
+        self.filas_segmento.append(completas)
+        self._matrices.append(None)
+        self._escalas.append(None)
+
+    def _filas_en_archivo(self, segmento, extension, tamano_fila):
+        ruta = self._ruta(segmento, extension)
+        return os.path.getsize(ruta) // tamano_fila if os.path.exists(ruta) else 0
+
+    def _recortar(self, segmento, extension, tamano):
+        """Descarta lo que sobra al final de un archivo del segmento"""
+        ruta = self._ruta(segmento, extension)
+        if os.path.exists(ruta) and os.path.getsize(ruta) > tamano:
+            with open(ruta, "r+b") as f:
+                f.truncate(tamano)
+
+    def _matriz(self, segmento):
+        """memmap del segmento (y escalas si es int8); se reabre si creció"""
+        filas = self.filas_segmento[segmento]
+        matriz = self._matrices[segmento]
+
+        if matriz is None or len(matriz) != filas:
+            dim = self.config["dim"]
+            dtype = np.int8 if self.config["dtype"] == "int8" else np.float32
+            self._matrices[segmento] = np.memmap(self._ruta(segmento, "vec"), dtype=dtype, mode="r",
+                                                 shape=(filas, dim))
+            if self.config["dtype"] == "int8":
+                self._escalas[segmento] = np.fromfile(self._ruta(segmento, "escala"), dtype=np.float32)[:filas]
+
+        return self._matrices[segmento], self._escalas[segmento]
+
+    # ==========================================
+    # Escritura
+    # ==========================================
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        vectores = np.asarray(embeddings, dtype=np.float32)
+        if vectores.ndim == 1:
+            vectores = vectores[None, :]
+
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+
+        with self._lock:
+            duplicados = [i for i in ids if i in self.posiciones and self.posiciones[i] not in self.borrados]
+            if duplicados:
+                raise ValueError(f"IDs ya existentes: {duplicados[:5]}")
+
+            if self.config["dim"] is None:
+                self.config["dim"] = int(vectores.shape[1])
+            elif vectores.shape[1] != self.config["dim"]:
+                raise ValueError(f"Dimensión {vectores.shape[1]} distinta de la del store ({self.config['dim']})")
+
+            # Normalizar: la similitud de coseno queda como producto punto
+            normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+            vectores = vectores / np.maximum(normas, 1e-12)
+
+            inicio = 0
+            while inicio < len(ids):
+                if not self.filas_segmento or self.filas_segmento[-1] >= self.config["filas_por_segmento"]:
+                    self.config["segmentos"] += 1
+                    self._guardar_config()
+                    self.filas_segmento.append(0)
+                    self._matrices.append(None)
+                    self._escalas.append(None)
+
+                segmento = len(self.filas_segmento) - 1
+                espacio = self.config["filas_por_segmento"] - self.filas_segmento[segmento]
+                fin = min(inicio + espacio, len(ids))
+                self._escribir(segmento, ids[inicio:fin], vectores[inicio:fin],
+                               documents[inicio:fin], metadatas[inicio:fin])
+                inicio = fin
+
+            self._columnas.clear()
+
+    def _escribir(self, segmento, ids, vectores, documents, metadatas):
+        """Agrega filas al final de un segmento (vectores primero, luego metadata)"""
+        if self.config["dtype"] == "int8":
+            escalas = np.maximum(np.abs(vectores).max(axis=1), 1e-12) / 127
+            cuantizados = np.rint(vectores / escalas[:, None]).astype(np.int8)
+            with open(self._ruta(segmento, "vec"), "ab") as f:
+                f.write(cuantizados.tobytes())
+            with open(self._ruta(segmento, "escala"), "ab") as f:
+                f.write(escalas.astype(np.float32).tobytes())
+        else:
+            with open(self._ruta(segmento, "vec"), "ab") as f:
+                f.write(vectores.astype(np.float32).tobytes())
+
+        with open(self._ruta(segmento, "jsonl"), "a", encoding="utf-8") as f:
+            for doc_id, documento, metadata in zip(ids, documents, metadatas):
+                f.write(json.dumps({"id": doc_id, "document": documento, "metadata": metadata},
+                                   ensure_ascii=False) + "\n")
+
+        for doc_id, documento, metadata in zip(ids, documents, metadatas):
+            self.posiciones[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+            self.documentos.append(documento)
+            self.metadatas.append(metadata or {})
+
+        self.filas_segmento[segmento] += len(ids)
+
+    def delete(self, ids):
+        """Marca filas como borradas (los segmentos nunca se reescriben)"""
+        with self._lock:
+            with open(os.path.join(self.carpeta, self.ARCHIVO_BORRADOS), "a", encoding="utf-8") as f:
+                for doc_id in ids:
+                    fila = self.posiciones.get(doc_id)
+                    if fila is not None and fila not in self.borrados:
+                        self.borrados.add(fila)
+                        f.write(f"{fila}\n")
+
+    # ==========================================
+    # Filtros
+    # ==========================================
+    def _columna(self, clave):
+        """Columna de metadata como array de NumPy (cacheada hasta el próximo add)"""
+        if clave not in self._columnas:
+            valores = [metadata.get(clave) for metadata in self.metadatas]
+            columna = np.empty(len(valores), dtype=object)
+            columna[:] = valores
+            self._columnas[clave] = columna
+        return self._columnas[clave]
+
+    def _columna_numerica(self, clave):
+        """Columna como float (NaN donde falta o no es número)"""
+        clave_cache = ("#num", clave)
+        if clave_cache not in self._columnas:
+            self._columnas[clave_cache] = np.array([
+                v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan
+                for v in self._columna(clave)
+            ], dtype=np.float64)
+        return self._columnas[clave_cache]
+
+    def _mascara(self, where):
+        """Máscara booleana de filas que cumplen un filtro estilo Chroma"""
+        mascara = np.ones(len(self.ids), dtype=bool)
+        if not where:
+            return mascara
+
+        for clave, condicion in where.items():
+            if clave == "$and":
+                for sub in condicion:
+                    mascara &= self._mascara(sub)
+            elif clave == "$or":
+                parcial = np.zeros(len(self.ids), dtype=bool)
+                for sub in condicion:
+                    parcial |= self._mascara(sub)
+                mascara &= parcial
+            else:
+                if not isinstance(condicion, dict):
+                    condicion = {"$eq": condicion}
+                for operador, valor in condicion.items():
+                    numerico = operador in ("$gt", "$gte", "$lt", "$lte")
+                    columna = self._columna_numerica(clave) if numerico else self._columna(clave)
+                    mascara &= np.asarray(_COMPARADORES[operador](columna, valor), dtype=bool)
+
+        return mascara
+
+    def _mascara_vivas(self, where=None):
+        mascara = self._mascara(where)
+        if self.borrados:
+            mascara[list(self.borrados)] = False
+        return mascara
+
+    # ==========================================
+    # Lectura
+    # ==========================================
+    def query(self, query_embeddings, n_results=10, where=None, include=("documents", "metadatas", "distances")):
+        consultas = np.asarray(query_embeddings, dtype=np.float32)
+        if consultas.ndim == 1:
+            consultas = consultas[None, :]
+        consultas = consultas / np.maximum(np.linalg.norm(consultas, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            total = len(self.ids)
+            mascara = self._mascara_vivas(where)
+            similitudes = np.full((len(consultas), total), -np.inf, dtype=np.float32)
+
+            # Producto punto por bloques de filas (memoria acotada)
+            base = 0
+            for segmento, filas in enumerate(self.filas_segmento):
+                if filas == 0:
+                    continue
+                matriz, escalas = self._matriz(segmento)
+
+                for inicio in range(0, filas, self.filas_por_bloque):
+                    fin = min(inicio + self.filas_por_bloque, filas)
+                    bloque = np.asarray(matriz[inicio:fin], dtype=np.float32)
+                    puntajes = consultas @ bloque.T
+                    if escalas is not None:
+                        puntajes *= escalas[inicio:fin]
+                    similitudes[:, base + inicio:base + fin] = puntajes
+                base += filas
+
+            similitudes[:, ~mascara] = -np.inf
+            k = min(n_results, int(mascara.sum()))
+
+            resultado = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            for fila in similitudes:
+                if k == 0:
+                    mejores = np.array([], dtype=np.int64)
+                else:
+                    # Top-k sin ordenar todo el arreglo
+                    candidatos = np.argpartition(-fila, k - 1)[:k]
+                    mejores = candidatos[np.argsort(-fila[candidatos])]
+
+                resultado["ids"].append([self.ids[i] for i in mejores])
+                resultado["documents"].append([self.documentos[i] for i in mejores])
+                resultado["metadatas"].append([dict(self.metadatas[i]) for i in mejores])
+                resultado["distances"].append([float(1 - fila[i]) for i in mejores])
+
+        return self._filtrar_include(resultado, include)
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        with self._lock:
+            mascara = self._mascara_vivas(where)
+            if ids is not None:
+                seleccion = np.zeros(len(self.ids), dtype=bool)
+                seleccion[[self.posiciones[i] for i in ids if i in self.posiciones]] = True
+                mascara &= seleccion
+
+            filas = np.flatnonzero(mascara)
+            filas = filas[offset or 0:]
+            if limit is not None:
+                filas = filas[:limit]
+
+            resultado = {
+                "ids": [self.ids[i] for i in filas],
+                "documents": [self.documentos[i] for i in filas],
+                "metadatas": [dict(self.metadatas[i]) for i in filas]
+            }
+
+            if "embeddings" in include:
+                resultado["embeddings"] = [self._vector(i).tolist() for i in filas]
+
+        return self._filtrar_include(resultado, include)
+
+    def _vector(self, fila):
+        """Vector normalizado de una fila global"""
+        for segmento, filas in enumerate(self.filas_segmento):
+            if fila < filas:
+                matriz, escalas = self._matriz(segmento)
+                vector = np.asarray(matriz[fila], dtype=np.float32)
+                return vector * escalas[fila] if escalas is not None else vector
+            fila -= filas
+        raise IndexError(fila)
+
+    @staticmethod
+    def _filtrar_include(resultado, include):
+        for clave in ("documents", "metadatas", "distances"):
+            if clave in resultado and clave not in include:
+                resultado[clave] = None
+        return resultado
+
+    def count(self):
+        return len(self.ids) - len(self.borrados)
+
+
+def _valor_puede_cumplir(valor, condicion):
+    """¿Un valor fijo de partición puede cumplir una condición? (True si no se sabe)"""
+    if not isinstance(condicion, dict):
+        condicion = {"$eq": condicion}
+
+    for operador, objetivo in condicion.items():
+        try:
+            cumple = bool(_COMPARADORES[operador](np.array([valor], dtype=object), objetivo)[0])
+        except (TypeError, KeyError):
+            continue  # Tipos que no se comparan u operador desconocido: no se puede descartar
+        if not cumple:
+            return False
+
+    return True
+
+
+def _particion_puede_coincidir(where, clave, valor):
+    """
+    Planificador: decide si una partición puede tener filas que cumplan el filtro
+
+    Solo mira las condiciones sobre la clave de partición; todo lo demás lo
+    resuelve la búsqueda dentro de la partición.
+    """
+    if not where:
+        return True
+
+    for campo, condicion in where.items():
+        if campo == "$and":
+            if not all(_particion_puede_coincidir(sub, clave, valor) for sub in condicion):
+                return False
+        elif campo == "$or":
+            if not any(_particion_puede_coincidir(sub, clave, valor) for sub in condicion):
+                return False
+        elif campo == clave:
+            if valor is None or not _valor_puede_cumplir(valor, condicion):
+                return False
+
+    return True
+
+
+class ShardedVectorStore(VectorStore):
+    """
+    RESPONSABILIDAD: Repartir la colección en particiones por un campo de metadata
+
+    ¿Qué hace?
+    - Cada valor de la clave (ej: año de firma o contract_type) tiene su
+      propia colección, en su propia carpeta (db_path/particiones_<nombre>/<valor>)
+    - Al buscar, descarta las particiones que el filtro 'where' no puede
+      cumplir y consulta el resto en paralelo, uniendo los top-k por distancia
+    - Una partición se puede desconectar (mover a almacenamiento frío) y
+      volver a conectar sin tocar las demás
+
+    La clave especial 'anio' se calcula del año de signature_date (o
+    start_date) y se agrega a la metadata, así se puede filtrar por ella.
+    """
+
+    ARCHIVO_REGISTRO = "particiones.json"
+    SIN_VALOR = "sin_valor"
+
+    def __init__(self, db_path, nombre="contratos", backend=None, clave="anio", hilos=8, **kwargs):
+        """
+        Args:
+            db_path: Carpeta de la base de datos
+            nombre: Nombre de la colección
+            backend: Backend de cada partición ('chroma' o 'numpy')
+            clave: Campo de metadata por el que se particiona
+            hilos: Particiones consultadas en paralelo como máximo
+            **kwargs: Opciones del backend de cada partición
+        """
+        self.carpeta = os.path.join(db_path, f"particiones_{nombre}")
+        os.makedirs(self.carpeta, exist_ok=True)
+
+        self.nombre = nombre
+        self.backend = backend or os.environ.get("VECTOR_BACKEND", "chroma")
+        self.opciones = kwargs
+        self.hilos = hilos
+        self._lock = threading.RLock()
+        self._abiertas = {}  # carpeta de la partición → VectorStore
+        self._pool = None
+
+        ruta = os.path.join(self.carpeta, self.ARCHIVO_REGISTRO)
+        if os.path.exists(ruta):
+            with open(ruta, "r", encoding="utf-8") as f:
+                self.registro = json.load(f)
+            if self.registro["clave"] != clave:
+                raise ValueError(f"La base ya está particionada por '{self.registro['clave']}', no por '{clave}'")
+        else:
+            self.registro = {"clave": clave, "backend": self.backend, "particiones": {}}
+            self._guardar_registro()
+
+        self.clave = self.registro["clave"]
+
+    # ==========================================
+    # Registro de particiones
+    # ==========================================
+    def _guardar_registro(self):
+        ruta = os.path.join(self.carpeta, self.ARCHIVO_REGISTRO)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.registro, f, ensure_ascii=False, indent=2)
+        os.replace(ruta + ".tmp", ruta)
+
+    @staticmethod
+    def _carpeta_de(valor):
+        """Nombre de carpeta seguro para un valor de partición"""
+        if valor is None:
+            return ShardedVectorStore.SIN_VALOR
+        nombre = re.sub(r"[^A-Za-z0-9_-]+", "_", str(valor)).strip("_")[:60]
+        return nombre or ShardedVectorStore.SIN_VALOR
+
+    def _valor_de(self, metadata):
+        """Valor de la clave de partición para una fila (completa 'anio' si hace falta)"""
+        if self.clave == "anio" and "anio" not in metadata:
+            for campo in ("signature_date", "start_date"):
+                fecha = str(metadata.get(campo) or "")
+                if re.match(r"^\d{4}", fecha):
+                    metadata["anio"] = int(fecha[:4])
+                    break
+
+        valor = metadata.get(self.clave)
+        return None if valor in (None, "") else valor
+
+    def _abrir(self, carpeta):
+        """VectorStore de una partición (se abre al primer uso)"""
+        with self._lock:
+            if carpeta not in self._abiertas:
+                ruta = self.registro["particiones"][carpeta]["ruta"]
+                self._abiertas[carpeta] = _crear_backend(self.backend, ruta, self.nombre, **self.opciones)
+            return self._abiertas[carpeta]
+
+    def _activas(self, where=None):
+        """Particiones conectadas que el filtro no descarta"""
+        return [
+            carpeta for carpeta, info in self.registro["particiones"].items()
+            if info["estado"] == "conectada" and _particion_puede_coincidir(where, self.clave, info["valor"])
+        ]
+
+    def particiones(self):
+        """
+        Returns:
+            dict carpeta → {valor, estado, ruta}
+        """
+        return {carpeta: dict(info) for carpeta, info in self.registro["particiones"].items()}
+
+    def desconectar(self, valor, destino=None):
+        """
+        Saca una partición de las búsquedas (ej: contratos viejos a almacenamiento frío)
+
+        Args:
+            valor: Valor de la clave (ej: 2015)
+            destino: Carpeta a donde mover los archivos (None = quedan en su lugar)
+
+        Returns:
+            str: Ruta donde quedó la partición
+        """
+        carpeta = self._carpeta_de(valor)
+        with self._lock:
+            info = self.registro["particiones"][carpeta]
+            self._abiertas.pop(carpeta, None)
+
+            if destino:
+                nueva = os.path.join(destino, f"{self.nombre}_{carpeta}")
+                shutil.move(info["ruta"], nueva)
+                info["ruta"] = nueva
+
+            info["estado"] = "desconectada"
+            self._guardar_registro()
+            return info["ruta"]
+
+    def conectar(self, valor, origen=None):
+        """
+        Vuelve a incluir una partición en las búsquedas
+
+        Args:
+            valor: Valor de la clave
+            origen: Carpeta de la partición si se movió (se trae de vuelta)
+        """
+        carpeta = self._carpeta_de(valor)
+        with self._lock:
+            info = self.registro["particiones"].setdefault(
+                carpeta, {"valor": valor, "ruta": os.path.join(self.carpeta, carpeta)}
+            )
+            origen = origen or info["ruta"]
+            local = os.path.join(self.carpeta, carpeta)
+
+            if os.path.abspath(origen) != os.path.abspath(local):
+                shutil.move(origen, local)
+            info["ruta"] = local
+            info["estado"] = "conectada"
+            self._guardar_registro()
+
+    # ==========================================
+    # Interfaz de VectorStore
+    # ==========================================
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        grupos = {}
+        for i, doc_id in enumerate(ids):
+            metadata = dict(metadatas[i]) if metadatas else {}
+            valor = self._valor_de(metadata)
+            grupo = grupos.setdefault(self._carpeta_de(valor), {"valor": valor, "filas": []})
+            grupo["filas"].append((doc_id, embeddings[i], documents[i] if documents else None, metadata))
+
+        for carpeta, grupo in grupos.items():
+            with self._lock:
+                info = self.registro["particiones"].get(carpeta)
+                if info is None:
+                    info = {"valor": grupo["valor"], "estado": "conectada",
+                            "ruta": os.path.join(self.carpeta, carpeta)}
+                    self.registro["particiones"][carpeta] = info
+                    self._guardar_registro()
+                if info["estado"] != "conectada":
+                    raise ValueError(f"La partición '{carpeta}' está desconectada: conéctala antes de agregar")
+
+            filas = grupo["filas"]
+            self._abrir(carpeta).add(
+                ids=[f[0] for f in filas],
+                embeddings=[f[1] for f in filas],
+                documents=[f[2] for f in filas] if documents else None,
+                metadatas=[f[3] for f in filas]
+            )
+
+    def _en_paralelo(self, funcion, carpetas):
+        """Ejecuta funcion(store) en cada partición, en paralelo"""
+        if len(carpetas) <= 1:
+            return [funcion(self._abrir(c)) for c in carpetas]
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="particion")
+
+        futuros = [self._pool.submit(lambda c=c: funcion(self._abrir(c))) for c in carpetas]
+        return [futuro.result() for futuro in futuros]
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("documents", "metadatas", "distances")):
+        carpetas = self._activas(where)
+        pedido = set(include) | {"distances"}  # Hacen falta para unir los resultados
+
+        parciales = self._en_paralelo(
+            lambda store: store.query(query_embeddings=query_embeddings, n_results=n_results,
+                                      where=where, include=list(pedido)),
+            carpetas
+        )
+
+        n_consultas = len(query_embeddings)
+        resultado = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for q in range(n_consultas):
+            # Top-k global: todos los candidatos de todas las particiones, por distancia
+            candidatos = [
+                (parcial["distances"][q][i], p, i)
+                for p, parcial in enumerate(parciales)
+                for i in range(len(parcial["ids"][q]))
+            ]
+            candidatos.sort(key=lambda c: c[0])
+            mejores = candidatos[:n_results]
+
+            for clave in resultado:
+                resultado[clave].append([
+                    parciales[p][clave][q][i] if parciales[p].get(clave) is not None else None
+                    for _, p, i in mejores
+                ])
+
+        return NumpyVectorStore._filtrar_include(resultado, include)
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        carpetas = self._activas(where)
+        tope = None if limit is None else (offset or 0) + limit
+
+        parciales = self._en_paralelo(
+            lambda store: store.get(ids=ids, where=where, limit=tope, include=list(include)),
+            carpetas
+        )
+
+        resultado = {"ids": []}
+        for parcial in parciales:
+            for clave in ("ids", "documents", "metadatas", "embeddings"):
+                if parcial.get(clave) is not None:
+                    resultado.setdefault(clave, []).extend(parcial[clave])
+
+        inicio = offset or 0
+        fin = None if limit is None else inicio + limit
+        return {clave: valores[inicio:fin] for clave, valores in resultado.items()}
+
+    def iterar(self, lote=1000, include=("embeddings", "documents", "metadatas")):
+        # Partición por partición: paginar sobre la unión sería cuadrático
+        for carpeta in self._activas():
+            yield from self._abrir(carpeta).iterar(lote, include)
+
+    def count(self):
+        return sum(self._en_paralelo(lambda store: store.count(), self._activas()))
+
+    def delete(self, ids):
+        self._en_paralelo(lambda store: store.delete(ids=ids), self._activas())
+
+
+# Backends disponibles por nombre
+BACKENDS = {
+    "chroma": ChromaVectorStore,
+    "numpy": NumpyVectorStore,
+}
+
+
+def crear_vector_store(backend, db_path, nombre="contratos", particion=None, **kwargs):
+    """
+    Crea el backend de vectores
+
+    Args:
+        backend: 'chroma' o 'numpy' (None = variable VECTOR_BACKEND o 'chroma')
+        db_path: Carpeta de la base de datos
+        nombre: Nombre de la colección
+        particion: Campo de metadata para particionar (ej: 'anio', 'contract_type');
+                   None = variable VECTOR_SHARD_KEY o sin particiones
+        **kwargs: Opciones del backend (ej: dtype='int8' para numpy)
+
+    Returns:
+        VectorStore
+    """
+    backend = backend or os.environ.get("VECTOR_BACKEND", "chroma")
+    particion = particion or os.environ.get("VECTOR_SHARD_KEY")
+
+    if particion:
+        return ShardedVectorStore(db_path, nombre=nombre, backend=backend, clave=particion, **kwargs)
+    return _crear_backend(backend, db_path, nombre, **kwargs)
+
+
+def _crear_backend(backend, db_path, nombre, **kwargs):
+    """Backend sin particiones (también se usa para cada partición)"""
+    if backend == "chroma":
+        return ChromaVectorStore(db_path, nombre=nombre)
+    if backend == "numpy":
+        return NumpyVectorStore(os.path.join(db_path, f"numpy_{nombre}"), **kwargs)
+
+    raise ValueError(f"Backend de vectores no soportado: {backend} (opciones: {', '.join(BACKENDS)})")
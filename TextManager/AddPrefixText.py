@@ -1,35 +1,33 @@
 import tkinter as tk
 from tkinter import filedialog
-import os
+
+from BulkTransform import Prefijo, mostrar, mostrar_resumen, transformar
 
 # --- CONFIGURACIÓN ---
 texto_a_agregar = "PiaAzure "
 
-# Crear ventana oculta
-root = tk.Tk()
-root.withdraw()
 
-# Abrir explorador para seleccionar múltiples archivos
-archivos = filedialog.askopenfilenames(
-    title="Selecciona los archivos a modificar",
-    filetypes=[("Archivos de texto", "*.txt"), ("Todos los archivos", "*.*")]
-)
+def main():
+    # Crear ventana oculta
+    root = tk.Tk()
+    root.withdraw()
 
-if not archivos:
-    print("No se seleccionaron archivos.")
-    exit()
+    # Abrir explorador para seleccionar múltiples archivos
+    archivos = filedialog.askopenfilenames(
+        title="Selecciona los archivos a modificar",
+        filetypes=[("Archivos de texto", "*.txt"), ("Todos los archivos", "*.*")]
+    )
 
-# Procesar cada archivo
-for archivo in archivos:
-    with open(archivo, "r", encoding="utf-8") as f:
-        contenido = f.read()
+    if not archivos:
+        print("No se seleccionaron archivos.")
+        exit()
 
-    # Añadir texto al inicio
-    contenido_nuevo = texto_a_agregar + contenido
+    # Procesar los archivos (sin ventanas: python BulkTransform.py --prefijo ...)
+    resumen = transformar(archivos, [Prefijo(texto_a_agregar)], al_terminar=mostrar)
+    mostrar_resumen(resumen)
 
-    with open(archivo, "w", encoding="utf-8") as f:
-        f.write(contenido_nuevo)
+    print("\n🎉 Texto agregado al inicio en todos los archivos.")
 
-    print(f"✅ Modificado: {os.path.basename(archivo)}")
 
-print("\n🎉 Texto agregado al inicio en todos los archivos.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Transformación masiva de archivos de texto, sin ventanas
+
+Uso:
+    python BulkTransform.py ./salida_ocr --recursivo --prefijo "PiaAzure "
+    python BulkTransform.py "./salida_ocr/**/*.txt" --reemplazar PiaAzure "PiaAzure, " --procesos 8
+    python BulkTransform.py ./paginas --patron "*" --renombrar .png_0001 "" --simular
+
+Las operaciones se aplican en el orden en que se escriben y todas en una sola
+lectura/escritura por archivo. Cada archivo se escribe en un temporal de la
+misma carpeta y se reemplaza con os.replace: si el proceso se corta, el
+archivo queda como estaba o ya transformado, nunca a medias. Los archivos
+que no cambian no se escriben.
+
+Un renombre nunca pisa otro archivo: el nombre nuevo se crea con os.link,
+que falla si ya existe (aunque otro proceso del pool lo haya creado un
+instante antes), y si dos archivos de la corrida quedarían con el mismo
+nombre, el segundo se marca como error antes de mandarlo al pool.
+"""
+import argparse
+import fnmatch
+import glob
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+
+# ==========================================
+# OPERACIONES
+# ==========================================
+# Cada operación es una clase chica (se mandan a otros procesos: tienen que
+# poder serializarse con pickle). aplicar_texto y aplicar_nombre devuelven
+# el valor sin cambios si la operación no lo toca.
+
+class Prefijo:
+    """Agrega texto al inicio del contenido"""
+
+    cambia_texto = True
+
+    def __init__(self, texto):
+        self.texto = texto
+
+    def aplicar_texto(self, contenido):
+        return self.texto + contenido
+
+    def aplicar_nombre(self, nombre):
+        return nombre
+
+
+class Reemplazo:
+    """Reemplaza una palabra por otra en el contenido"""
+
+    cambia_texto = True
+
+    def __init__(self, buscar, nuevo):
+        self.buscar = buscar
+        self.nuevo = nuevo
+
+    def aplicar_texto(self, contenido):
+        return contenido.replace(self.buscar, self.nuevo)
+
+    def aplicar_nombre(self, nombre):
+        return nombre
+
+
+class Renombrar:
+    """Reemplaza una parte del nombre del archivo (sin tocar la carpeta)"""
+
+    cambia_texto = False
+
+    def __init__(self, quitar, poner=""):
+        self.quitar = quitar
+        self.poner = poner
+
+    def aplicar_texto(self, contenido):
+        return contenido
+
+    def aplicar_nombre(self, nombre):
+        return nombre.replace(self.quitar, self.poner)
+
+
+# ==========================================
+# UN ARCHIVO
+# ==========================================
+
+def transformar_archivo(ruta, operaciones, encoding="utf-8", simular=False):
+    """
+    Aplica la cadena de operaciones a un archivo
+
+    Args:
+        ruta: Archivo a transformar
+        operaciones: Lista de operaciones (Prefijo, Reemplazo, Renombrar...)
+        encoding: Codificación del texto
+        simular: Calcular el resultado sin escribir nada
+
+    Returns:
+        dict con ruta, destino, estado ('modificado', 'renombrado',
+        'sin_cambios' o 'error'), bytes_leidos, bytes_escritos y error
+    """
+    resultado = {"ruta": ruta, "destino": ruta, "estado": "sin_cambios",
+                 "bytes_leidos": 0, "bytes_escritos": 0, "error": None}
+
+    try:
+        destino = destino_de(ruta, operaciones)
+        resultado["destino"] = destino
+
+        # Aviso temprano (antes de leer); lo que evita pisar es _mover_sin_pisar
+        if destino != ruta and os.path.exists(destino):
+            raise FileExistsError(f"ya existe {destino}")
+
+        # Solo se lee el archivo si alguna operación cambia el contenido
+        datos_nuevos = None
+        if any(operacion.cambia_texto for operacion in operaciones):
+            with open(ruta, "rb") as f:
+                datos = f.read()
+            resultado["bytes_leidos"] = len(datos)
+
+            contenido = datos.decode(encoding)
+            for operacion in operaciones:
+                contenido = operacion.aplicar_texto(contenido)
+            datos_nuevos = contenido.encode(encoding)
+            if datos_nuevos == datos:
+                datos_nuevos = None
+
+        if datos_nuevos is None and destino == ruta:
+            return resultado
+
+        resultado["estado"] = "modificado" if datos_nuevos is not None else "renombrado"
+        if simular:
+            return resultado
+
+        if datos_nuevos is None:
+            _mover_sin_pisar(ruta, destino)
+            return resultado
+
+        _escribir_atomico(ruta, destino, datos_nuevos)
+        resultado["bytes_escritos"] = len(datos_nuevos)
+
+    except (OSError, UnicodeError) as e:
+        resultado["estado"] = "error"
+        resultado["error"] = str(e)
+
+    return resultado
+
+
+def destino_de(ruta, operaciones):
+    """Ruta que va a tener el archivo después de las operaciones de nombre"""
+    carpeta, nombre = os.path.split(ruta)
+    for operacion in operaciones:
+        nombre = operacion.aplicar_nombre(nombre)
+    return os.path.join(carpeta, nombre)
+
+
+def _mover_sin_pisar(ruta, destino):
+    """
+    Renombra solo si destino no existe, sin carrera entre la verificación y
+    el renombre: os.link crea el nombre nuevo o falla con FileExistsError
+    """
+    try:
+        os.link(ruta, destino)
+    except FileExistsError:
+        raise FileExistsError(f"ya existe {destino}")
+    except (OSError, AttributeError):
+        # Sistema de archivos sin enlaces duros (FAT, algunos montajes de red)
+        if os.path.exists(destino):
+            raise FileExistsError(f"ya existe {destino}")
+        os.rename(ruta, destino)
+        return
+    os.remove(ruta)
+
+
+def _escribir_atomico(ruta, destino, datos):
+    """Escribe en un temporal de la misma carpeta y lo pone en lugar del original"""
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta) or ".", prefix=".bulk_", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(datos)
+        shutil.copymode(ruta, temporal)  # mkstemp crea el archivo con permisos 600
+        if destino == ruta:
+            os.replace(temporal, destino)
+        else:
+            _mover_sin_pisar(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+    if destino != ruta:
+        os.remove(ruta)
+
+
+def _transformar_lote(rutas, operaciones, encoding, simular):
+    """Un lote de archivos por tarea: menos idas y vueltas con el pool"""
+    return [transformar_archivo(ruta, operaciones, encoding, simular) for ruta in rutas]
+
+
+# ==========================================
+# MUCHOS ARCHIVOS
+# ==========================================
+
+def buscar_archivos(entradas, patron="*.txt", recursivo=False):
+    """
+    Expande carpetas y globs a una lista de archivos
+
+    Args:
+        entradas: Carpetas, archivos o patrones glob ('**' con recursivo)
+        patron: Patrón de nombre para los archivos de las carpetas
+        recursivo: Recorrer subcarpetas
+
+    Yields:
+        str: Ruta de cada archivo (sin repetir)
+    """
+    vistos = set()
+
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            rutas = _recorrer(entrada, patron, recursivo)
+        elif os.path.isfile(entrada):
+            rutas = [entrada]
+        else:
+            rutas = (r for r in glob.iglob(entrada, recursive=recursivo) if os.path.isfile(r))
+
+        for ruta in rutas:
+            if ruta not in vistos:
+                vistos.add(ruta)
+                yield ruta
+
+
+def _recorrer(carpeta, patron, recursivo):
+    """os.scandir en vez de os.walk + stat: una sola lectura por carpeta"""
+    pendientes = [carpeta]
+    while pendientes:
+        with os.scandir(pendientes.pop()) as entradas:
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    if recursivo:
+                        pendientes.append(entrada.path)
+                elif fnmatch.fnmatch(entrada.name, patron):
+                    yield entrada.path
+
+
+def transformar(rutas, operaciones, procesos=None, lote=256, encoding="utf-8", simular=False, al_terminar=None):
+    """
+    Aplica las operaciones a todos los archivos en un pool de procesos
+
+    Args:
+        rutas: Iterable de archivos
+        operaciones: Lista de operaciones
+        procesos: Procesos del pool (None = núcleos; 1 = sin pool)
+        lote: Archivos por tarea
+        encoding: Codificación del texto
+        simular: No escribir nada
+        al_terminar: Callback opcional con el dict de cada archivo
+
+    Returns:
+        dict con archivos, modificados, renombrados, sin_cambios, errores,
+        bytes_leidos, bytes_escritos, segundos, archivos_por_segundo y
+        bytes_por_segundo
+    """
+    resumen = {"archivos": 0, "modificado": 0, "renombrado": 0, "sin_cambios": 0, "error": 0,
+               "bytes_leidos": 0, "bytes_escritos": 0}
+
+    # Dos archivos con el mismo nombre final: el segundo no llega al pool
+    choques = []
+    lotes = en_lotes(_sin_choques(rutas, operaciones, choques), lote)
+    inicio = time.perf_counter()
+
+    if procesos == 1:
+        _contar((_transformar_lote(l, operaciones, encoding, simular) for l in lotes), resumen, al_terminar)
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = pool.map(_transformar_lote, lotes, repeat(operaciones), repeat(encoding), repeat(simular))
+            _contar(resultados, resumen, al_terminar)
+    _contar([choques], resumen, al_terminar)
+
+    segundos = time.perf_counter() - inicio
+    resumen.update({
+        "modificados": resumen.pop("modificado"),
+        "renombrados": resumen.pop("renombrado"),
+        "errores": resumen.pop("error"),
+        "segundos": segundos,
+        "archivos_por_segundo": resumen["archivos"] / segundos if segundos else 0.0,
+        "bytes_por_segundo": resumen["bytes_leidos"] / segundos if segundos else 0.0
+    })
+    return resumen
+
+
+def _sin_choques(rutas, operaciones, choques):
+    """
+    Deja pasar cada ruta salvo si su nombre nuevo ya lo reclamó otra de la
+    corrida; esas van a 'choques' como error (también al simular)
+    """
+    reclamados = set()
+    for ruta in rutas:
+        destino = destino_de(ruta, operaciones)
+        if destino == ruta:
+            yield ruta
+            continue
+        if destino in reclamados:
+            choques.append({"ruta": ruta, "destino": destino, "estado": "error", "bytes_leidos": 0,
+                            "bytes_escritos": 0, "error": f"otro archivo también quedaría como {destino}"})
+            continue
+        reclamados.add(destino)
+        yield ruta
+
+
+def _contar(resultados, resumen, al_terminar):
+    for lote in resultados:
+        for resultado in lote:
+            resumen["archivos"] += 1
+            resumen[resultado["estado"]] += 1
+            resumen["bytes_leidos"] += resultado["bytes_leidos"]
+            resumen["bytes_escritos"] += resultado["bytes_escritos"]
+            if al_terminar:
+                al_terminar(resultado)
+
+
+def en_lotes(rutas, tamano):
+    lote = []
+    for ruta in rutas:
+        lote.append(ruta)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def mostrar(resultado):
+    """Salida por archivo igual a la de los scripts con ventana"""
+    nombre = os.path.basename(resultado["ruta"])
+    if resultado["estado"] == "error":
+        print(f"❌ {nombre}: {resultado['error']}")
+    elif resultado["estado"] == "renombrado":
+        print(f"✅ Renombrado: {nombre} → {os.path.basename(resultado['destino'])}")
+    elif resultado["estado"] == "modificado":
+        if resultado["destino"] != resultado["ruta"]:
+            nombre += f" → {os.path.basename(resultado['destino'])}"
+        print(f"✅ Modificado: {nombre}")
+
+
+def mostrar_resumen(resumen):
+    print(f"\n📊 {resumen['archivos']} archivos en {resumen['segundos']:.1f}s "
+          f"({resumen['archivos_por_segundo']:.0f} archivos/s, "
+          f"{resumen['bytes_por_segundo'] / 1e6:.1f} MB/s)")
+    print(f"   Modificados: {resumen['modificados']} | Renombrados: {resumen['renombrados']} | "
+          f"Sin cambios: {resumen['sin_cambios']} | Errores: {resumen['errores']}")
+
+
+# ==========================================
+# LÍNEA DE COMANDOS
+# ==========================================
+
+class _AgregarOperacion(argparse.Action):
+    """Junta todas las operaciones en una sola lista, en el orden de la línea de comandos"""
+
+    def __call__(self, parser, namespace, valores, opcion=None):
+        operaciones = getattr(namespace, "operaciones", None) or []
+        valores = valores if isinstance(valores, list) else [valores]
+        operaciones.append(self.const(*valores))
+        namespace.operaciones = operaciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transformación masiva de archivos de texto")
+    parser.add_argument("entradas", nargs="+", help="Carpetas, archivos o patrones glob")
+    parser.add_argument("--patron", default="*.txt", help="Archivos a tomar dentro de las carpetas")
+    parser.add_argument("--recursivo", action="store_true")
+    parser.add_argument("--prefijo", action=_AgregarOperacion, const=Prefijo, metavar="TEXTO",
+                        dest="operaciones")
+    parser.add_argument("--reemplazar", action=_AgregarOperacion, const=Reemplazo, nargs=2,
+                        metavar=("BUSCAR", "NUEVO"), dest="operaciones")
+    parser.add_argument("--renombrar", action=_AgregarOperacion, const=Renombrar, nargs=2,
+                        metavar=("QUITAR", "PONER"), dest="operaciones")
+    parser.add_argument("--procesos", type=int, default=None, help="None = núcleos de la máquina")
+    parser.add_argument("--lote", type=int, default=256, help="Archivos por tarea del pool")
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--simular", action="store_true", help="Mostrar qué cambiaría sin escribir")
+    parser.add_argument("--silencioso", action="store_true", help="Solo el resumen")
+    args = parser.parse_args()
+
+    if not args.operaciones:
+        parser.error("Indica al menos una operación (--prefijo, --reemplazar o --renombrar)")
+
+    rutas = buscar_archivos(args.entradas, args.patron, args.recursivo)
+    resumen = transformar(rutas, args.operaciones, procesos=args.procesos, lote=args.lote,
+                          encoding=args.encoding, simular=args.simular,
+                          al_terminar=None if args.silencioso else mostrar)
+
+    mostrar_resumen(resumen)
+    if args.simular:
+        print("ℹ️ Simulación: no se escribió ningún archivo")
+
+
+if __name__ == "__main__":
+    main()
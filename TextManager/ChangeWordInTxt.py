@@ -1,35 +1,42 @@
 import tkinter as tk
 from tkinter import filedialog
-import os
+
+from MultiReplace import MultiReemplazo, cargar_tabla, mostrar, mostrar_resumen, reemplazar_archivos
 
 # --- CONFIGURACIÓN ---
 palabra_a_buscar = "PiaAzure"
 palabra_nueva = "PiaAzure, "
 
-# Crear ventana oculta
-root = tk.Tk()
-root.withdraw()
+# Tabla con muchos reemplazos (CSV o JSON); si se indica, reemplaza al par de arriba
+tabla_reemplazos = None
+palabras_completas = False
+ignorar_mayusculas = False
+
+
+def main():
+    # Crear ventana oculta
+    root = tk.Tk()
+    root.withdraw()
 
-# Abrir explorador para seleccionar múltiples archivos
-archivos = filedialog.askopenfilenames(
-    title="Selecciona los archivos a modificar",
-    filetypes=[("Archivos de texto", "*.txt"), ("Todos los archivos", "*.*")]
-)
+    # Abrir explorador para seleccionar múltiples archivos
+    archivos = filedialog.askopenfilenames(
+        title="Selecciona los archivos a modificar",
+        filetypes=[("Archivos de texto", "*.txt"), ("Todos los archivos", "*.*")]
+    )
 
-if not archivos:
-    print("No se seleccionaron archivos.")
-    exit()
+    if not archivos:
+        print("No se seleccionaron archivos.")
+        exit()
 
-# Procesar cada archivo
-for archivo in archivos:
-    with open(archivo, "r", encoding="utf-8") as f:
-        contenido = f.read()
+    tabla = cargar_tabla(tabla_reemplazos) if tabla_reemplazos else {palabra_a_buscar: palabra_nueva}
+    motor = MultiReemplazo(tabla, palabras_completas, ignorar_mayusculas)
 
-    contenido_nuevo = contenido.replace(palabra_a_buscar, palabra_nueva)
+    # Procesar los archivos (sin ventanas: python MultiReplace.py TABLA ARCHIVOS...)
+    resumen = reemplazar_archivos(archivos, motor, al_terminar=mostrar)
+    mostrar_resumen(resumen, motor)
 
-    with open(archivo, "w", encoding="utf-8") as f:
-        f.write(contenido_nuevo)
+    print("\n✅ Reemplazo terminado en todos los archivos.")
 
-    print(f"Modificado: {os.path.basename(archivo)}")
 
-print("\n✅ Reemplazo terminado en todos los archivos.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Reemplazo de muchas palabras a la vez, con una tabla CSV o JSON
+
+Uso:
+    python MultiReplace.py normalizacion.csv ./salida_ocr --recursivo
+    python MultiReplace.py normalizacion.json "./salida_ocr/**/*.txt" --palabras --ignorar-mayusculas
+    python MultiReplace.py normalizacion.csv ./salida_ocr --simular --procesos 8
+
+La tabla se compila en una sola expresión regular (una alternativa por
+palabra, las más largas primero): el archivo se recorre una sola vez sin
+importar cuántas palabras tenga la tabla, y donde empiezan dos palabras gana
+la más larga. Los archivos se leen por bloques, así que el tamaño del archivo
+no cambia la memoria usada, y las coincidencias que caen entre dos bloques se
+reemplazan igual.
+
+Tabla CSV: dos columnas (buscar, reemplazo), con o sin encabezado.
+Tabla JSON: {"buscar": "reemplazo", ...} o [["buscar", "reemplazo"], ...].
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from BulkTransform import buscar_archivos, en_lotes
+
+
+TAMANO_BLOQUE = 1024 * 1024  # Caracteres por lectura
+
+
+def cargar_tabla(ruta):
+    """
+    Lee una tabla de reemplazos
+
+    Args:
+        ruta: Archivo .csv o .json
+
+    Returns:
+        list de pares (buscar, reemplazo), en el orden del archivo
+    """
+    if ruta.lower().endswith(".json"):
+        with open(ruta, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+        pares = list(datos.items()) if isinstance(datos, dict) else [tuple(par) for par in datos]
+    else:
+        with open(ruta, "r", encoding="utf-8-sig", newline="") as f:
+            pares = [tuple(fila[:2]) for fila in csv.reader(f) if fila]
+        if pares and [c.strip().lower() for c in pares[0]] in (["buscar", "reemplazo"], ["search", "replace"]):
+            pares = pares[1:]
+
+    for par in pares:
+        if len(par) != 2:
+            raise ValueError(f"Fila inválida en {ruta}: {par}")
+    return pares
+
+
+class MultiReemplazo:
+    """
+    RESPONSABILIDAD: Aplicar una tabla de reemplazos en una sola pasada
+
+    ¿Qué hace?
+    - Compila la tabla en una expresión regular con una alternativa por palabra
+    - Ordena las palabras de la más larga a la más corta: en una misma posición
+      gana la más larga (el regex de Python prueba las alternativas en orden)
+    - Opcionalmente solo reemplaza palabras completas y/o ignora mayúsculas
+    - Reemplaza texto completo o un flujo de bloques
+    - Cuenta cuántas veces se reemplazó cada palabra
+
+    También sirve como operación de BulkTransform (aplicar_texto / aplicar_nombre).
+    """
+
+    cambia_texto = True
+
+    def __init__(self, tabla, palabras_completas=False, ignorar_mayusculas=False):
+        """
+        Args:
+            tabla: dict o lista de pares (buscar, reemplazo)
+            palabras_completas: No reemplazar dentro de otras palabras
+            ignorar_mayusculas: 'contrato' también encuentra 'CONTRATO'
+        """
+        pares = list(tabla.items()) if isinstance(tabla, dict) else list(tabla)
+        if not pares:
+            raise ValueError("La tabla de reemplazos está vacía")
+        if any(not buscar for buscar, _ in pares):
+            raise ValueError("La tabla tiene una palabra a buscar vacía")
+
+        # Si una palabra se repite, vale la primera fila
+        unicos = {}
+        for buscar, reemplazo in pares:
+            unicos.setdefault(buscar, reemplazo)
+
+        self.palabras = sorted(unicos, key=len, reverse=True)
+        self.reemplazos = [unicos[p] for p in self.palabras]
+        self.palabras_completas = palabras_completas
+        self.ignorar_mayusculas = ignorar_mayusculas
+        self.largo_maximo = len(self.palabras[0])
+        self.conteos = Counter()
+        self._compilar()
+
+    def _compilar(self):
+        # Un grupo por palabra: lastindex dice cuál coincidió sin buscarla en un dict
+        # (con ignorar_mayusculas el texto encontrado no es igual a la clave)
+        alternativas = "|".join(f"({re.escape(p)})" for p in self.palabras)
+        if self.palabras_completas:
+            alternativas = rf"(?<!\w)(?:{alternativas})(?!\w)"
+        self.patron = re.compile(alternativas, re.IGNORECASE if self.ignorar_mayusculas else 0)
+
+        # Caracteres que hay que esperar al final de un bloque antes de decidir
+        # (la palabra más larga, más uno para mirar el borde de palabra)
+        self._reserva = self.largo_maximo + (1 if self.palabras_completas else 0)
+
+    def __getstate__(self):
+        # El regex compilado se vuelve a armar en cada proceso (pickle de la tabla)
+        estado = self.__dict__.copy()
+        del estado["patron"]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._compilar()
+
+    def _sustituir(self, coincidencia):
+        indice = coincidencia.lastindex - 1
+        self.conteos[indice] += 1
+        return self.reemplazos[indice]
+
+    # ==========================================
+    # TEXTO COMPLETO
+    # ==========================================
+
+    def aplicar_texto(self, contenido):
+        """Reemplaza en un texto que ya está en memoria"""
+        return self.patron.sub(self._sustituir, contenido)
+
+    def aplicar_nombre(self, nombre):
+        return nombre
+
+    # ==========================================
+    # FLUJO DE BLOQUES
+    # ==========================================
+
+    def aplicar_stream(self, bloques):
+        """
+        Reemplaza sobre un flujo de bloques de texto
+
+        Al final de cada bloque se guardan los últimos caracteres hasta el
+        bloque siguiente: una coincidencia solo se acepta si todas las
+        palabras que podrían empezar en esa posición entran completas en lo
+        ya leído. Así el resultado es idéntico a aplicar_texto sobre el texto
+        entero.
+
+        Args:
+            bloques: Iterable de str
+
+        Yields:
+            str: Texto ya reemplazado
+        """
+        pendiente = ""
+        contexto = 0  # Caracteres al inicio de pendiente que ya se emitieron (para (?<!\w))
+
+        for bloque in bloques:
+            if not bloque:
+                continue
+            pendiente += bloque
+
+            limite = len(pendiente) - self._reserva
+            if limite <= contexto:
+                continue  # Todavía no alcanza para decidir nada
+
+            salida, corte = self._reemplazar_hasta(pendiente, contexto, limite)
+            yield salida
+
+            pendiente = pendiente[corte - 1:]
+            contexto = 1
+
+        if len(pendiente) > contexto:
+            salida, _ = self._reemplazar_hasta(pendiente, contexto, len(pendiente))
+            yield salida
+
+    def _reemplazar_hasta(self, texto, desde, limite):
+        """
+        Reemplaza las coincidencias que empiezan antes de limite
+
+        Returns:
+            tuple (texto reemplazado desde 'desde' hasta el corte, corte)
+        """
+        partes = []
+        posicion = desde
+
+        for coincidencia in self.patron.finditer(texto, desde):
+            if coincidencia.start() >= limite:
+                break
+            partes.append(texto[posicion:coincidencia.start()])
+            partes.append(self._sustituir(coincidencia))
+            posicion = coincidencia.end()
+
+        corte = max(limite, posicion)
+        partes.append(texto[posicion:corte])
+        return "".join(partes), corte
+
+    def resumen_conteos(self, conteos=None):
+        """Conteos por palabra, de la más reemplazada a la menos"""
+        conteos = self.conteos if conteos is None else conteos
+        return [(self.palabras[i], self.reemplazos[i], n) for i, n in conteos.most_common() if n]
+
+
+# ==========================================
+# ARCHIVOS
+# ==========================================
+
+def reemplazar_archivo(ruta, motor, encoding="utf-8", tamano_bloque=TAMANO_BLOQUE, simular=False):
+    """
+    Aplica la tabla a un archivo, por bloques, con escritura atómica
+
+    Returns:
+        dict con ruta, estado ('modificado', 'sin_cambios' o 'error'),
+        bytes_leidos, conteos (Counter por índice de palabra) y error
+    """
+    motor.conteos = Counter()
+    resultado = {"ruta": ruta, "estado": "sin_cambios", "bytes_leidos": 0, "conteos": motor.conteos, "error": None}
+
+    try:
+        resultado["bytes_leidos"] = os.path.getsize(ruta)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta) or ".", prefix=".reemplazo_",
+                                                suffix=".tmp")
+        try:
+            # newline="" para no convertir los fin de línea del archivo
+            with open(ruta, "r", encoding=encoding, newline="") as entrada, \
+                    os.fdopen(descriptor, "w", encoding=encoding, newline="") as salida:
+                bloques = iter(lambda: entrada.read(tamano_bloque), "")
+                for parte in motor.aplicar_stream(bloques):
+                    salida.write(parte)
+
+            if sum(motor.conteos.values()) and not simular:
+                shutil.copymode(ruta, temporal)
+                os.replace(temporal, ruta)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+        if sum(motor.conteos.values()):
+            resultado["estado"] = "modificado"
+
+    except (OSError, UnicodeError) as e:
+        resultado["estado"] = "error"
+        resultado["error"] = str(e)
+
+    return resultado
+
+
+def _reemplazar_lote(rutas, motor, encoding, tamano_bloque, simular):
+    return [reemplazar_archivo(ruta, motor, encoding, tamano_bloque, simular) for ruta in rutas]
+
+
+def reemplazar_archivos(rutas, motor, procesos=None, lote=64, encoding="utf-8", tamano_bloque=TAMANO_BLOQUE,
+                        simular=False, al_terminar=None):
+    """
+    Aplica la tabla a muchos archivos en un pool de procesos
+
+    Returns:
+        dict con archivos, modificados, sin_cambios, errores, reemplazos,
+        conteos (Counter por índice de palabra), segundos, archivos_por_segundo
+        y bytes_por_segundo
+    """
+    resumen = {"archivos": 0, "modificado": 0, "sin_cambios": 0, "error": 0, "bytes_leidos": 0}
+    conteos = Counter()
+
+    def contar(lotes_resultado):
+        for resultados in lotes_resultado:
+            for resultado in resultados:
+                resumen["archivos"] += 1
+                resumen[resultado["estado"]] += 1
+                resumen["bytes_leidos"] += resultado["bytes_leidos"]
+                conteos.update(resultado["conteos"])
+                if al_terminar:
+                    al_terminar(resultado)
+
+    lotes = en_lotes(rutas, lote)
+    inicio = time.perf_counter()
+
+    if procesos == 1:
+        contar(_reemplazar_lote(l, motor, encoding, tamano_bloque, simular) for l in lotes)
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            contar(pool.map(_reemplazar_lote, lotes, repeat(motor), repeat(encoding), repeat(tamano_bloque),
+                            repeat(simular)))
+
+    segundos = time.perf_counter() - inicio
+    motor.conteos = conteos
+    resumen.update({
+        "modificados": resumen.pop("modificado"),
+        "errores": resumen.pop("error"),
+        "reemplazos": sum(conteos.values()),
+        "conteos": conteos,
+        "segundos": segundos,
+        "archivos_por_segundo": resumen["archivos"] / segundos if segundos else 0.0,
+        "bytes_por_segundo": resumen["bytes_leidos"] / segundos if segundos else 0.0
+    })
+    return resumen
+
+
+def mostrar(resultado):
+    nombre = os.path.basename(resultado["ruta"])
+    if resultado["estado"] == "error":
+        print(f"❌ {nombre}: {resultado['error']}")
+    elif resultado["estado"] == "modificado":
+        print(f"Modificado: {nombre} ({sum(resultado['conteos'].values())} reemplazos)")
+
+
+def mostrar_resumen(resumen, motor, maximo=20):
+    print(f"\n📊 {resumen['archivos']} archivos en {resumen['segundos']:.1f}s "
+          f"({resumen['archivos_por_segundo']:.0f} archivos/s, "
+          f"{resumen['bytes_por_segundo'] / 1e6:.1f} MB/s)")
+    print(f"   Modificados: {resumen['modificados']} | Sin cambios: {resumen['sin_cambios']} | "
+          f"Errores: {resumen['errores']} | Reemplazos: {resumen['reemplazos']}")
+
+    filas = motor.resumen_conteos(resumen["conteos"])
+    if filas:
+        print("\n🔍 Reemplazos por palabra:")
+        for buscar, reemplazo, n in filas[:maximo]:
+            print(f"   {n:>8}  {buscar!r} → {reemplazo!r}")
+        if len(filas) > maximo:
+            print(f"   ... y {len(filas) - maximo} palabras más")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reemplazo de muchas palabras con una tabla CSV/JSON")
+    parser.add_argument("tabla", help="Archivo .csv o .json con (buscar, reemplazo)")
+    parser.add_argument("entradas", nargs="+", help="Carpetas, archivos o patrones glob")
+    parser.add_argument("--patron", default="*.txt")
+    parser.add_argument("--recursivo", action="store_true")
+    parser.add_argument("--palabras", action="store_true", help="Solo palabras completas")
+    parser.add_argument("--ignorar-mayusculas", action="store_true")
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE, help="Caracteres por lectura")
+    parser.add_argument("--procesos", type=int, default=None, help="None = núcleos de la máquina")
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--simular", action="store_true", help="Contar sin escribir")
+    parser.add_argument("--silencioso", action="store_true", help="Solo el resumen")
+    args = parser.parse_args()
+
+    motor = MultiReemplazo(cargar_tabla(args.tabla), args.palabras, args.ignorar_mayusculas)
+    print(f"📋 {len(motor.palabras)} palabras en la tabla")
+
+    rutas = buscar_archivos(args.entradas, args.patron, args.recursivo)
+    resumen = reemplazar_archivos(rutas, motor, procesos=args.procesos, encoding=args.encoding,
+                                  tamano_bloque=args.bloque, simular=args.simular,
+                                  al_terminar=None if args.silencioso else mostrar)
+
+    mostrar_resumen(resumen, motor)
+    if args.simular:
+        print("ℹ️ Simulación: no se escribió ningún archivo")
+
+
+if __name__ == "__main__":
+    main()
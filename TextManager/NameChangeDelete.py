@@ -1,29 +1,40 @@
 import tkinter as tk
 from tkinter import filedialog
-import os
+
+from BulkTransform import Renombrar
+from RenamePlanner import ejecutar, mostrar_plan, mostrar_resultado, planificar
 
 # --- PARTE A ELIMINAR DEL NOMBRE ---
 parte_a_borrar = ".png_0001"
 
-# Crear ventana oculta
-root = tk.Tk()
-root.withdraw()
+# Incluir subcarpetas
+recursivo = False
+
+
+def main():
+    # Crear ventana oculta
+    root = tk.Tk()
+    root.withdraw()
+
+    # Seleccionar carpeta
+    carpeta = filedialog.askdirectory(title="Selecciona la carpeta con los archivos")
+
+    if not carpeta:
+        print("No se seleccionó ninguna carpeta.")
+        exit()
+
+    # Armar el plan completo antes de renombrar (sin ventanas: python RenamePlanner.py CARPETA --quitar ...)
+    plan = planificar(carpeta, [Renombrar(parte_a_borrar)], recursivo=recursivo)
+    mostrar_plan(plan)
 
-# Seleccionar carpeta
-carpeta = filedialog.askdirectory(title="Selecciona la carpeta con los archivos")
+    if plan.conflictos:
+        print("❌ Hay nombres que chocan: no se renombró nada.")
+        exit()
 
-if not carpeta:
-    print("No se seleccionó ninguna carpeta.")
-    exit()
+    mostrar_resultado(ejecutar(plan))
 
-# Procesar archivos
-for nombre_archivo in os.listdir(carpeta):
-    if parte_a_borrar in nombre_archivo:
-        nombre_nuevo = nombre_archivo.replace(parte_a_borrar, "")
-        ruta_vieja = os.path.join(carpeta, nombre_archivo)
-        ruta_nueva = os.path.join(carpeta, nombre_nuevo)
+    print("\n🎉 Renombrado terminado.")
 
-        os.rename(ruta_vieja, ruta_nueva)
-        print(f"✅ Renombrado: {nombre_archivo} → {nombre_nuevo}")
 
-print("\n🎉 Renombrado terminado.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Renombrado masivo planificado, sin choques y con deshacer
+
+Uso:
+    python RenamePlanner.py ./paginas --recursivo --quitar .png_0001 --simular
+    python RenamePlanner.py ./paginas --recursivo --quitar .png_0001 --poner _p --hilos 16
+    python RenamePlanner.py --deshacer renombres_20260101_120000.jsonl
+
+Cada carpeta se lee una sola vez con os.scandir y el plan completo (nombre
+viejo → nombre nuevo) se arma antes de tocar nada. Así se detectan de entrada:
+- dos archivos que quedarían con el mismo nombre
+- un nombre nuevo que ya existe y no se va a mover
+- cadenas (a → b mientras b → c) y ciclos (a → b, b → a), que se ordenan o
+  se resuelven con un nombre temporal
+
+Las carpetas se renombran en paralelo (dentro de una carpeta, en el orden del
+plan). Cada renombre queda en un diario JSON Lines apenas se hace: si la
+corrida se corta, el diario sigue sirviendo para deshacer lo hecho.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from BulkTransform import Renombrar
+
+
+FORMATO = "renombres"
+VERSION = 1
+
+
+class PlanRenombre:
+    """
+    RESPONSABILIDAD: Guardar el plan de renombres, ya validado y ordenado
+
+    ¿Qué hace?
+    - movimientos: {carpeta: [(nombre_viejo, nombre_nuevo), ...]} en el orden
+      en que hay que ejecutarlos (incluye los pasos por nombres temporales)
+    - conflictos: renombres que no se pueden hacer, con el motivo
+    """
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+        self.movimientos = {}
+        self.conflictos = []
+        self.archivos_revisados = 0
+        self.carpetas_revisadas = 0
+
+    @property
+    def total(self):
+        return sum(len(pasos) for pasos in self.movimientos.values())
+
+
+# ==========================================
+# PLANIFICAR
+# ==========================================
+
+def planificar(raiz, operaciones, patron="*", recursivo=False, omitir_conflictos=False):
+    """
+    Recorre las carpetas una vez y arma el plan completo
+
+    Args:
+        raiz: Carpeta de inicio
+        operaciones: Operaciones de nombre (Renombrar de BulkTransform u otras
+                     con aplicar_nombre)
+        patron: Archivos a considerar
+        recursivo: Recorrer subcarpetas
+        omitir_conflictos: Dejar afuera los renombres con conflicto y seguir
+                           con el resto (si no, el plan con conflictos no se ejecuta)
+
+    Returns:
+        PlanRenombre
+    """
+    plan = PlanRenombre(raiz)
+    pendientes = [raiz]
+
+    while pendientes:
+        carpeta = pendientes.pop()
+        existentes = {}
+        propuestos = []
+
+        # ==========================================
+        # PASO 1: Una sola lectura de la carpeta
+        # ==========================================
+        with os.scandir(carpeta) as entradas:
+            for entrada in entradas:
+                existentes[os.path.normcase(entrada.name)] = entrada.name
+
+                if entrada.is_dir(follow_symlinks=False):
+                    if recursivo:
+                        pendientes.append(entrada.path)
+                    continue
+
+                if not fnmatch.fnmatch(entrada.name, patron):
+                    continue
+                plan.archivos_revisados += 1
+
+                nuevo = entrada.name
+                for operacion in operaciones:
+                    nuevo = operacion.aplicar_nombre(nuevo)
+                if nuevo != entrada.name:
+                    propuestos.append((entrada.name, nuevo))
+
+        plan.carpetas_revisadas += 1
+        if not propuestos:
+            continue
+
+        # ==========================================
+        # PASO 2: Validar y ordenar
+        # ==========================================
+        validos, conflictos = _validar(propuestos, existentes, omitir_conflictos)
+        plan.conflictos.extend(dict(carpeta=carpeta, **c) for c in conflictos)
+        if validos:
+            plan.movimientos[carpeta] = _ordenar(validos, existentes)
+
+    return plan
+
+
+def _validar(propuestos, existentes, omitir_conflictos):
+    """
+    Separa los renombres posibles de los que chocan
+
+    Returns:
+        tuple (lista de (viejo, nuevo) válidos, lista de conflictos)
+    """
+    conflictos = []
+    validos = []
+
+    for viejo, nuevo in propuestos:
+        if not nuevo or nuevo in (".", "..") or "/" in nuevo or os.sep in nuevo:
+            conflictos.append({"origen": viejo, "destino": nuevo, "motivo": "nombre inválido"})
+        else:
+            validos.append((viejo, nuevo))
+
+    # Sacar un renombre puede dejar en su lugar un nombre que choca con otro:
+    # se repite hasta que no aparecen conflictos nuevos
+    while True:
+        origenes = {os.path.normcase(viejo) for viejo, _ in validos}
+        por_destino = {}
+        for viejo, nuevo in validos:
+            por_destino.setdefault(os.path.normcase(nuevo), []).append(viejo)
+
+        nuevos_conflictos = []
+        for viejo, nuevo in validos:
+            clave = os.path.normcase(nuevo)
+            if len(por_destino[clave]) > 1:
+                otros = [o for o in por_destino[clave] if o != viejo]
+                nuevos_conflictos.append({"origen": viejo, "destino": nuevo,
+                                          "motivo": f"mismo nombre nuevo que {', '.join(otros)}"})
+            elif clave in existentes and clave not in origenes:
+                nuevos_conflictos.append({"origen": viejo, "destino": nuevo,
+                                          "motivo": f"ya existe {existentes[clave]}"})
+
+        if not nuevos_conflictos:
+            return validos, conflictos
+
+        conflictos.extend(nuevos_conflictos)
+        if not omitir_conflictos:
+            return [], conflictos
+
+        descartados = {c["origen"] for c in nuevos_conflictos}
+        validos = [(viejo, nuevo) for viejo, nuevo in validos if viejo not in descartados]
+
+
+def _ordenar(movimientos, existentes):
+    """
+    Ordena los renombres de una carpeta para que ninguno pise a otro
+
+    Un renombre está listo cuando su nombre nuevo no es el nombre viejo de
+    otro renombre pendiente. Si no queda ninguno listo, hay un ciclo: uno de
+    sus archivos pasa por un nombre temporal y el ciclo se abre.
+
+    Returns:
+        list de (viejo, nuevo) en orden de ejecución
+    """
+    pendientes = {os.path.normcase(viejo): (viejo, nuevo) for viejo, nuevo in movimientos}
+    # Nombre nuevo → clave del renombre que lo necesita libre
+    esperando = {os.path.normcase(nuevo): clave for clave, (_, nuevo) in pendientes.items()}
+    ocupados = set(existentes) | set(esperando)
+    temporales = 0
+
+    def listo(clave):
+        destino = os.path.normcase(pendientes[clave][1])
+        # destino == clave: solo cambian mayúsculas en un sistema que no las distingue
+        return destino == clave or destino not in pendientes
+
+    orden = []
+    listos = [clave for clave in pendientes if listo(clave)]
+
+    while pendientes:
+        if not listos:
+            # Ciclo: el primer pendiente pasa por un nombre temporal
+            clave, (viejo, nuevo) = next(iter(pendientes.items()))
+            temporal = viejo
+            while os.path.normcase(temporal) in ocupados:
+                temporales += 1
+                temporal = f".renombre_{temporales}_{viejo}"
+            ocupados.add(os.path.normcase(temporal))
+
+            orden.append((viejo, temporal))
+            del pendientes[clave]
+            clave_temporal = os.path.normcase(temporal)
+            pendientes[clave_temporal] = (temporal, nuevo)
+            esperando[os.path.normcase(nuevo)] = clave_temporal
+
+            # El nombre viejo quedó libre: el renombre que lo esperaba ya puede ir
+            siguiente = esperando.get(clave)
+            if siguiente is not None and siguiente in pendientes:
+                listos.append(siguiente)
+            continue
+
+        clave = listos.pop()
+        viejo, nuevo = pendientes.pop(clave)
+        orden.append((viejo, nuevo))
+
+        # El nombre viejo quedó libre: el renombre que lo esperaba ya puede ir
+        siguiente = esperando.get(clave)
+        if siguiente is not None and siguiente != clave and siguiente in pendientes:
+            listos.append(siguiente)
+
+    return orden
+
+
+# ==========================================
+# EJECUTAR Y DESHACER
+# ==========================================
+
+class _Diario:
+    """Diario JSON Lines: una línea por carpeta y una por renombre hecho"""
+
+    def __init__(self, ruta, raiz, deshace=None):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._carpetas = {}
+        self._archivo = open(ruta, "w", encoding="utf-8")
+        self._escribir({"formato": FORMATO, "version": VERSION, "raiz": raiz,
+                        "fecha": datetime.now().isoformat(), "deshace": deshace})
+
+    def _escribir(self, registro):
+        self._archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def registrar(self, carpeta, hechos):
+        """Anota los renombres ya hechos de una carpeta"""
+        if not hechos:
+            return
+        with self._lock:
+            if carpeta not in self._carpetas:
+                self._carpetas[carpeta] = len(self._carpetas)
+                self._escribir({"carpeta": self._carpetas[carpeta], "ruta": carpeta})
+            indice = self._carpetas[carpeta]
+            for viejo, nuevo in hechos:
+                self._escribir([indice, viejo, nuevo])
+            self._archivo.flush()
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+def _renombrar_carpeta(carpeta, pasos, diario, lote=256):
+    """
+    Ejecuta los renombres de una carpeta en orden
+
+    Returns:
+        tuple (renombrados, error o None)
+    """
+    hechos = []
+    renombrados = 0
+    try:
+        for viejo, nuevo in pasos:
+            os.rename(os.path.join(carpeta, viejo), os.path.join(carpeta, nuevo))
+            hechos.append((viejo, nuevo))
+            if len(hechos) >= lote:
+                diario.registrar(carpeta, hechos)
+                renombrados += len(hechos)
+                hechos = []
+        return renombrados + len(hechos), None
+    except OSError as e:
+        # Los pasos siguientes dependen del orden: la carpeta se deja a medias
+        # (lo hecho queda en el diario y se puede deshacer)
+        return renombrados + len(hechos), f"{carpeta}: {e}"
+    finally:
+        diario.registrar(carpeta, hechos)
+
+
+def ejecutar(plan, ruta_diario=None, hilos=8, deshace=None):
+    """
+    Ejecuta un plan, con las carpetas en paralelo
+
+    Args:
+        plan: PlanRenombre sin conflictos (o planificado con omitir_conflictos)
+        ruta_diario: Archivo del diario (None = renombres_<fecha>.jsonl)
+        hilos: Carpetas a la vez (el tiempo es casi todo espera del disco o la red)
+        deshace: Diario que esta corrida deshace (queda anotado)
+
+    Returns:
+        dict con renombrados, errores, diario y segundos
+    """
+    if plan.conflictos and not plan.movimientos:
+        raise ValueError(f"El plan tiene {len(plan.conflictos)} conflictos y ningún renombre posible")
+
+    ruta_diario = ruta_diario or f"renombres_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+    diario = _Diario(ruta_diario, plan.raiz, deshace)
+    inicio = time.perf_counter()
+    renombrados = 0
+    errores = []
+
+    try:
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            futuros = [pool.submit(_renombrar_carpeta, carpeta, pasos, diario)
+                       for carpeta, pasos in plan.movimientos.items()]
+            for futuro in futuros:
+                hechos, error = futuro.result()
+                renombrados += hechos
+                if error:
+                    errores.append(error)
+    finally:
+        diario.cerrar()
+
+    return {"renombrados": renombrados, "errores": errores, "diario": ruta_diario,
+            "segundos": time.perf_counter() - inicio}
+
+
+def leer_diario(ruta):
+    """
+    Lee un diario de renombres
+
+    Returns:
+        tuple (encabezado, {carpeta: [(viejo, nuevo), ...]} en orden de ejecución)
+    """
+    carpetas = {}
+    movimientos = {}
+
+    with open(ruta, "r", encoding="utf-8") as f:
+        encabezado = json.loads(f.readline())
+        if encabezado.get("formato") != FORMATO:
+            raise ValueError(f"{ruta} no es un diario de renombres")
+
+        for linea in f:
+            if not linea.strip():
+                continue
+            registro = json.loads(linea)
+            if isinstance(registro, dict):
+                carpetas[registro["carpeta"]] = registro["ruta"]
+                movimientos[registro["ruta"]] = []
+            else:
+                indice, viejo, nuevo = registro
+                movimientos[carpetas[indice]].append((viejo, nuevo))
+
+    return encabezado, movimientos
+
+
+def deshacer(ruta_diario, ruta_nuevo_diario=None, hilos=8):
+    """
+    Deshace una corrida: los mismos renombres, al revés y en orden inverso
+
+    El deshacer también escribe su diario, así que se puede volver a aplicar.
+
+    Returns:
+        dict igual al de ejecutar
+    """
+    encabezado, movimientos = leer_diario(ruta_diario)
+
+    plan = PlanRenombre(encabezado["raiz"])
+    plan.movimientos = {
+        carpeta: [(nuevo, viejo) for viejo, nuevo in reversed(pasos)]
+        for carpeta, pasos in movimientos.items() if pasos
+    }
+
+    ruta_nuevo_diario = ruta_nuevo_diario or ruta_diario.replace(".jsonl", "") + "_deshecho.jsonl"
+    return ejecutar(plan, ruta_nuevo_diario, hilos, deshace=ruta_diario)
+
+
+# ==========================================
+# LÍNEA DE COMANDOS
+# ==========================================
+
+def mostrar_plan(plan, maximo=20):
+    print(f"📋 {plan.archivos_revisados} archivos en {plan.carpetas_revisadas} carpetas: "
+          f"{plan.total} renombres, {len(plan.conflictos)} conflictos")
+
+    for conflicto in plan.conflictos[:maximo]:
+        print(f"⚠️ {os.path.join(conflicto['carpeta'], conflicto['origen'])} → {conflicto['destino']}: "
+              f"{conflicto['motivo']}")
+    if len(plan.conflictos) > maximo:
+        print(f"   ... y {len(plan.conflictos) - maximo} conflictos más")
+
+
+def mostrar_resultado(resultado):
+    print(f"\n📊 {resultado['renombrados']} archivos renombrados en {resultado['segundos']:.1f}s")
+    for error in resultado["errores"]:
+        print(f"❌ {error}")
+    print(f"📝 Diario: {resultado['diario']} (python RenamePlanner.py --deshacer {resultado['diario']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renombrado masivo planificado, con deshacer")
+    parser.add_argument("carpeta", nargs="?")
+    parser.add_argument("--quitar", help="Parte del nombre a reemplazar")
+    parser.add_argument("--poner", default="", help="Texto que va en su lugar")
+    parser.add_argument("--patron", default="*")
+    parser.add_argument("--recursivo", action="store_true")
+    parser.add_argument("--omitir-conflictos", action="store_true",
+                        help="Renombrar lo que no choca en vez de cancelar todo")
+    parser.add_argument("--simular", action="store_true", help="Solo mostrar el plan")
+    parser.add_argument("--diario", default=None)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--deshacer", metavar="DIARIO", help="Deshacer una corrida anterior")
+    args = parser.parse_args()
+
+    if args.deshacer:
+        mostrar_resultado(deshacer(args.deshacer, args.diario, args.hilos))
+        return
+
+    if not args.carpeta or not args.quitar:
+        parser.error("Indica la carpeta y --quitar (o --deshacer DIARIO)")
+
+    inicio = time.perf_counter()
+    plan = planificar(args.carpeta, [Renombrar(args.quitar, args.poner)], args.patron, args.recursivo,
+                      args.omitir_conflictos)
+    print(f"🔍 Plan armado en {time.perf_counter() - inicio:.1f}s")
+    mostrar_plan(plan)
+
+    if args.simular:
+        print("ℹ️ Simulación: no se renombró nada")
+        return
+    if plan.conflictos and not args.omitir_conflictos:
+        print("❌ Hay conflictos: no se renombró nada (usa --omitir-conflictos para seguir con el resto)")
+        return
+
+    mostrar_resultado(ejecutar(plan, args.diario, args.hilos))
+
+
+if __name__ == "__main__":
+    main()
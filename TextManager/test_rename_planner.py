@@ -0,0 +1,93 @@
+# test_rename_planner.py
+
+import os
+
+from BulkTransform import Renombrar
+from RenamePlanner import deshacer, ejecutar, planificar
+
+
+def _crear(carpeta, nombres):
+    for nombre in nombres:
+        with open(os.path.join(carpeta, nombre), "w", encoding="utf-8") as f:
+            f.write(nombre)
+
+
+def _contenidos(carpeta):
+    """nombre → contenido (el contenido es el nombre original del archivo)"""
+    resultado = {}
+    for nombre in os.listdir(carpeta):
+        if nombre.endswith(".jsonl") or os.path.isdir(os.path.join(carpeta, nombre)):
+            continue
+        with open(os.path.join(carpeta, nombre), encoding="utf-8") as f:
+            resultado[nombre] = f.read()
+    return resultado
+
+
+class _Mapa:
+    """Operación de nombre con un diccionario fijo (para armar cadenas y ciclos)"""
+
+    cambia_texto = False
+
+    def __init__(self, cambios):
+        self.cambios = cambios
+
+    def aplicar_texto(self, contenido):
+        return contenido
+
+    def aplicar_nombre(self, nombre):
+        return self.cambios.get(nombre, nombre)
+
+
+def test_renombre_simple_y_deshacer(tmp_path):
+    """Quita un sufijo en varias carpetas y el diario lo deja como estaba"""
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    _crear(tmp_path, ["a.png_0001.txt", "b.png_0001.txt", "otro.txt"])
+    _crear(sub, ["c.png_0001.txt"])
+    antes = {**_contenidos(tmp_path), **_contenidos(sub)}
+
+    plan = planificar(str(tmp_path), [Renombrar(".png_0001")], recursivo=True)
+    assert plan.total == 3 and not plan.conflictos
+
+    diario = str(tmp_path / "renombres.jsonl")
+    resultado = ejecutar(plan, diario, hilos=2)
+    assert resultado["renombrados"] == 3 and not resultado["errores"]
+    assert _contenidos(tmp_path) == {"a.txt": "a.png_0001.txt", "b.txt": "b.png_0001.txt", "otro.txt": "otro.txt"}
+    assert _contenidos(sub) == {"c.txt": "c.png_0001.txt"}
+
+    deshacer(diario, str(tmp_path / "deshecho.jsonl"))
+    assert {**_contenidos(tmp_path), **_contenidos(sub)} == antes
+
+
+def test_cadena_y_ciclo(tmp_path):
+    """a → b mientras b → c se ordena; x ↔ y pasa por un nombre temporal"""
+    _crear(tmp_path, ["a", "b", "x", "y"])
+    plan = planificar(str(tmp_path), [_Mapa({"a": "b", "b": "c", "x": "y", "y": "x"})])
+    assert not plan.conflictos
+
+    ejecutar(plan, str(tmp_path / "diario.jsonl"))
+    assert _contenidos(tmp_path) == {"b": "a", "c": "b", "y": "x", "x": "y"}
+
+
+def test_conflictos(tmp_path):
+    """Dos archivos al mismo nombre o a un nombre que ya existe no se ejecutan"""
+    _crear(tmp_path, ["uno_v1", "uno_v2", "dos_v1", "dos", "tres_v1"])
+    operaciones = [_Mapa({"uno_v1": "uno", "uno_v2": "uno", "dos_v1": "dos", "tres_v1": "tres"})]
+
+    plan = planificar(str(tmp_path), operaciones)
+    assert plan.total == 0
+    assert {c["origen"] for c in plan.conflictos} == {"uno_v1", "uno_v2", "dos_v1"}
+
+    # Omitiendo los conflictos, el resto sí se hace
+    plan = planificar(str(tmp_path), operaciones, omitir_conflictos=True)
+    assert plan.movimientos == {str(tmp_path): [("tres_v1", "tres")]}
+    ejecutar(plan, str(tmp_path / "diario.jsonl"))
+    assert "tres" in _contenidos(tmp_path) and "dos_v1" in _contenidos(tmp_path)
+
+
+def test_nombre_invalido(tmp_path):
+    """Un nombre vacío o con separador queda como conflicto"""
+    _crear(tmp_path, ["borrar", "a_b"])
+    plan = planificar(str(tmp_path), [_Mapa({"borrar": "", "a_b": "a" + os.sep + "b"})])
+    assert plan.total == 0
+    assert all(c["motivo"] == "nombre inválido" for c in plan.conflictos)